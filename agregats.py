@@ -0,0 +1,240 @@
+import re
+import sqlite3
+
+# Colonnes communes à toutes les tables d'agrégats (la moyenne se déduit de somme / nb)
+COLONNES_STATS = """
+    nb INTEGER NOT NULL,
+    somme_distance REAL,
+    max_distance REAL,
+    somme_hauteur REAL,
+    max_hauteur REAL
+"""
+
+# Agrégats de simulations.db : une ligne de `simulation` par lancer.
+# "index" : index servant au recalcul du maximum d'une clé (retrait d'une ligne), sans parcourir la table
+AGREGATS_SIMULATIONS = [
+    {
+        "table": "stats_jour",
+        "cles": [("jour", "TEXT", "IFNULL(substr({r}.date_simulation, 1, 10), '')")],
+        "index": ["CREATE INDEX IF NOT EXISTS idx_simulation_jour ON simulation (IFNULL(substr(date_simulation, 1, 10), ''))"],
+    },
+    {
+        # simulation ne référence pas le projectile : il est identifié par (masse, rayon)
+        "table": "stats_projectile",
+        "cles": [("masse", "REAL", "IFNULL({r}.masse, 0)"), ("rayon", "REAL", "IFNULL({r}.rayon, 0)")],
+        "index": ["CREATE INDEX IF NOT EXISTS idx_simulation_masse_rayon ON simulation (IFNULL(masse, 0), IFNULL(rayon, 0))"],
+    },
+    {
+        "table": "stats_utilisateur",
+        "parent": {"table": "session", "lien": "session_id",
+                   "cles": [("utilisateur_id", "INTEGER", "{s}.utilisateur_id", "0")]},
+        "requiert": [("session", "utilisateur_id"), ("simulation", "session_id")],
+        "index": ["CREATE INDEX IF NOT EXISTS idx_session_utilisateur ON session (utilisateur_id)",
+                  "CREATE INDEX IF NOT EXISTS idx_simulation_session ON simulation (session_id)"],
+    },
+]
+for agregat in AGREGATS_SIMULATIONS:
+    agregat.update(base="simulation", distance="{r}.distance_max", hauteur="{r}.hauteur_max")
+
+# Agrégats de projectile_simulation.db : un Resultat par Simulation, pas de hauteur stockée.
+# Les clés sont des colonnes de Simulation (le parent) : les déclencheurs suivent aussi ses modifications.
+AGREGATS_RESULTATS = [
+    {
+        "table": "stats_jour",
+        "parent": {"table": "Simulation", "lien": "simulation_id",
+                   "cles": [("jour", "TEXT", "substr({s}.date_lancement, 1, 10)", "''")]},
+        "index": ["CREATE INDEX IF NOT EXISTS idx_simulation_jour_lancement ON Simulation (substr(date_lancement, 1, 10))"],
+    },
+    {
+        "table": "stats_projectile",
+        "parent": {"table": "Simulation", "lien": "simulation_id",
+                   "cles": [("projectile_id", "INTEGER", "{s}.projectile_id", "0")]},
+        "index": ["CREATE INDEX IF NOT EXISTS idx_simulation_projectile ON Simulation (projectile_id)"],
+    },
+    {
+        "table": "stats_utilisateur",
+        "parent": {"table": "Simulation", "lien": "simulation_id",
+                   "cles": [("utilisateur_id", "INTEGER", "{s}.utilisateur_id", "0")]},
+        "index": ["CREATE INDEX IF NOT EXISTS idx_simulation_utilisateur ON Simulation (utilisateur_id)"],
+    },
+]
+for agregat in AGREGATS_RESULTATS:
+    agregat.update(base="Resultat", distance="{r}.distance_max", hauteur=None)
+    agregat["index"].append("CREATE INDEX IF NOT EXISTS idx_resultat_simulation ON Resultat (simulation_id)")
+
+# Clés lues dans le parent : IFNULL(valeur du parent, défaut), le défaut couvrant aussi une ligne sans parent
+for agregat in AGREGATS_SIMULATIONS + AGREGATS_RESULTATS:
+    parent = agregat.get("parent")
+    if parent:
+        agregat["cles"] = [(nom, type_sql, f"IFNULL((SELECT {expr.format(s=parent['table'])} FROM {parent['table']} "
+                                           f"WHERE id = {{r}}.{parent['lien']}), {defaut})")
+                           for nom, type_sql, expr, defaut in parent["cles"]]
+
+
+# Fonction pour vérifier qu'une table (et éventuellement une colonne) existe
+def existe(connexion, table, colonne=None):
+    colonnes = [ligne[1] for ligne in connexion.execute(f"PRAGMA table_info({table})")]
+    return bool(colonnes) and (colonne is None or colonne in colonnes)
+
+
+# Fonction pour générer les instructions SQL (table, remplissage, déclencheurs nommés) d'un agrégat
+def sql_agregat(agregat):
+    table, base, parent = agregat["table"], agregat["base"], agregat.get("parent")
+    noms = [nom for nom, _, _ in agregat["cles"]]
+    distance = agregat["distance"]
+    hauteur = agregat["hauteur"] or "NULL"
+
+    def cle(r):
+        return [expr.format(r=r) for _, _, expr in agregat["cles"]]
+
+    def condition_cle(valeurs):
+        return " AND ".join(f"{nom} = {valeur}" for nom, valeur in zip(noms, valeurs))
+
+    creation = (f"CREATE TABLE IF NOT EXISTS {table} ("
+                + ", ".join(f"{nom} {type_sql} NOT NULL" for nom, type_sql, _ in agregat["cles"])
+                + f", {COLONNES_STATS}, PRIMARY KEY ({', '.join(noms)}))")
+
+    colonnes = f"{', '.join(noms)}, nb, somme_distance, max_distance, somme_hauteur, max_hauteur"
+    remplissage = (f"INSERT INTO {table} ({colonnes}) "
+                   f"SELECT {', '.join(cle('b'))}, COUNT(*), SUM({distance.format(r='b')}), "
+                   f"MAX({distance.format(r='b')}), SUM({hauteur.format(r='b')}), "
+                   f"MAX({hauteur.format(r='b')}) FROM {base} b GROUP BY {', '.join(cle('b'))}")
+
+    fusion = (f"ON CONFLICT({', '.join(noms)}) DO UPDATE SET nb = nb + excluded.nb, "
+              f"somme_distance = IFNULL(somme_distance, 0) + IFNULL(excluded.somme_distance, 0), "
+              f"max_distance = COALESCE(MAX(max_distance, excluded.max_distance), max_distance, excluded.max_distance), "
+              f"somme_hauteur = CASE WHEN excluded.somme_hauteur IS NULL THEN somme_hauteur "
+              f"ELSE IFNULL(somme_hauteur, 0) + excluded.somme_hauteur END, "
+              f"max_hauteur = COALESCE(MAX(max_hauteur, excluded.max_hauteur), max_hauteur, excluded.max_hauteur);")
+
+    def maximum(colonne, valeurs):
+        # Le maximum ne se décrémente pas : il est recalculé pour la seule clé touchée, par index
+        # (voir "index") ; avec un parent, par jointure, la clé par défaut reprenant aussi les lignes orphelines
+        if colonne == "NULL":
+            return "NULL"
+        valeur_b = colonne.format(r="b")
+        if parent is None:
+            egalites = " AND ".join(f"{expr_b} = {valeur}" for expr_b, valeur in zip(cle("b"), valeurs))
+            return f"(SELECT MAX({valeur_b}) FROM {base} b WHERE {egalites})"
+        egalites = " AND ".join(f"{expr.format(s='s')} = {valeur}"
+                                for (_, _, expr, _), valeur in zip(parent["cles"], valeurs))
+        # Clé portée par une ligne g : SQLite teste la clé par défaut avant de parcourir la table de base
+        cle_g = ", ".join(f"{valeur} AS k{i}" for i, valeur in enumerate(valeurs))
+        defaut = " OR ".join(f"g.k{i} = {d}" for i, (_, _, _, d) in enumerate(parent["cles"]))
+        orphelines = " AND ".join(f"{expr_b} = g.k{i}" for i, expr_b in enumerate(cle("b")))
+        return (f"(SELECT MAX(m) FROM (SELECT {valeur_b} AS m FROM {parent['table']} s "
+                f"JOIN {base} b ON b.{parent['lien']} = s.id WHERE {egalites} "
+                f"UNION ALL SELECT {valeur_b} FROM (SELECT {cle_g}) g JOIN {base} b ON ({defaut}) "
+                f"WHERE {orphelines}))")
+
+    def ajout(r):
+        d, h = distance.format(r=r), hauteur.format(r=r)
+        return f"INSERT INTO {table} ({colonnes}) VALUES ({', '.join(cle(r))}, 1, {d}, {d}, {h}, {h}) {fusion}"
+
+    def retrait(r):
+        valeurs = cle(r)
+        return (f"UPDATE {table} SET nb = nb - 1, "
+                f"somme_distance = somme_distance - IFNULL({distance.format(r=r)}, 0), "
+                f"somme_hauteur = somme_hauteur - IFNULL({hauteur.format(r=r)}, 0), "
+                f"max_distance = {maximum(distance, valeurs)}, max_hauteur = {maximum(hauteur, valeurs)} "
+                f"WHERE {condition_cle(valeurs)}; "
+                f"DELETE FROM {table} WHERE nb <= 0;")
+
+    declencheurs = [
+        (f"{table}_ai", f"AFTER INSERT ON {base} BEGIN {ajout('NEW')} END"),
+        (f"{table}_ad", f"AFTER DELETE ON {base} BEGIN {retrait('OLD')} END"),
+        (f"{table}_au", f"AFTER UPDATE ON {base} BEGIN {retrait('OLD')} {ajout('NEW')} END"),
+    ]
+
+    if parent is not None:
+        # Lignes de base d'un parent, déplacées en bloc d'une clé à l'autre quand le parent change
+        lignes = f"FROM {base} b WHERE b.{parent['lien']} = {{p}}.id"
+
+        def valeurs_parent(p):
+            return [f"IFNULL({expr.format(s=p)}, {d})" for _, _, expr, d in parent["cles"]]
+
+        def retrait_groupe(p, valeurs):
+            return (f"UPDATE {table} SET nb = nb - (SELECT COUNT(*) {lignes.format(p=p)}), "
+                    f"somme_distance = somme_distance - (SELECT IFNULL(SUM({distance.format(r='b')}), 0) {lignes.format(p=p)}), "
+                    f"somme_hauteur = somme_hauteur - (SELECT IFNULL(SUM({hauteur.format(r='b')}), 0) {lignes.format(p=p)}), "
+                    f"max_distance = {maximum(distance, valeurs)}, max_hauteur = {maximum(hauteur, valeurs)} "
+                    f"WHERE {condition_cle(valeurs)}; "
+                    f"DELETE FROM {table} WHERE nb <= 0;")
+
+        def ajout_groupe(p, valeurs):
+            return (f"INSERT INTO {table} ({colonnes}) "
+                    f"SELECT {', '.join(valeurs)}, COUNT(*), SUM({distance.format(r='b')}), MAX({distance.format(r='b')}), "
+                    f"SUM({hauteur.format(r='b')}), MAX({hauteur.format(r='b')}) {lignes.format(p=p)} "
+                    f"HAVING COUNT(*) > 0 {fusion}")
+
+        suivies = sorted({colonne for _, _, expr, _ in parent["cles"]
+                          for colonne in re.findall(r"\{s\}\.(\w+)", expr)})
+        change = " OR ".join(f"{a} IS NOT {n}" for a, n in zip(valeurs_parent("OLD"), valeurs_parent("NEW")))
+        defauts = [d for _, _, _, d in parent["cles"]]
+        declencheurs += [
+            (f"{table}_{parent['table'].lower()}_au",
+             f"AFTER UPDATE OF {', '.join(suivies)} ON {parent['table']} WHEN {change} "
+             f"BEGIN {retrait_groupe('OLD', valeurs_parent('OLD'))} {ajout_groupe('NEW', valeurs_parent('NEW'))} END"),
+            # Parent supprimé : ses lignes passent sous la clé par défaut, comme au remplissage
+            (f"{table}_{parent['table'].lower()}_ad",
+             f"AFTER DELETE ON {parent['table']} "
+             f"BEGIN {retrait_groupe('OLD', valeurs_parent('OLD'))} {ajout_groupe('OLD', defauts)} END"),
+        ]
+    return creation, remplissage, declencheurs
+
+
+# Fonction pour choisir les agrégats applicables au schéma présent dans la base
+def agregats_applicables(connexion):
+    # Les noms de tables SQLite ne tiennent pas compte de la casse : simulation == Simulation
+    if existe(connexion, "Resultat") and existe(connexion, "Simulation", "date_lancement"):
+        return AGREGATS_RESULTATS
+    if existe(connexion, "simulation", "date_simulation"):
+        return [a for a in AGREGATS_SIMULATIONS if "requiert" not in a or all(existe(connexion, *r) for r in a["requiert"])]
+    return []
+
+
+# Fonction pour installer les tables d'agrégats et leurs déclencheurs (idempotente)
+def installer_agregats(bdd="simulations.db", reconstruire=False):
+    connexion = sqlite3.connect(bdd, isolation_level=None)
+    try:
+        connexion.execute("BEGIN IMMEDIATE")
+        for agregat in agregats_applicables(connexion):
+            creation, remplissage, declencheurs = sql_agregat(agregat)
+            nouvelle = not existe(connexion, agregat["table"])
+            if reconstruire and not nouvelle:
+                connexion.execute(f"DELETE FROM {agregat['table']}")
+            connexion.execute(creation)
+            if nouvelle or reconstruire:
+                # Remplissage initial à partir de l'historique existant, une seule fois
+                connexion.execute(remplissage)
+            for index in agregat["index"]:
+                connexion.execute(index)
+            # Déclencheurs recréés à chaque installation : une base existante reçoit leur version courante
+            for nom, corps in declencheurs:
+                connexion.execute(f"DROP TRIGGER IF EXISTS {nom}")
+                connexion.execute(f"CREATE TRIGGER {nom} {corps}")
+        connexion.execute("COMMIT")
+    finally:
+        connexion.close()
+
+
+# Fonction pour lire un agrégat avec ses moyennes, sans toucher aux tables de base
+# (sur un instantané en mémoire s'il est fourni, voir instantane.py : le fichier n'est alors pas lu)
+def lire_agregats(bdd, table, tri="nb DESC", limite=None, instantane=None):
+    connexion = sqlite3.connect(bdd) if instantane is None else None
+
+    def executer(requete):
+        if instantane is not None:
+            return instantane.requete(requete)[1]
+        return connexion.execute(requete).fetchall()
+    try:
+        cles = [ligne[1] for ligne in executer(f"PRAGMA table_info({table})") if ligne[5]]
+        requete = (f"SELECT {', '.join(cles)}, nb, somme_distance / nb, max_distance, "
+                   f"somme_hauteur / nb, max_hauteur FROM {table} ORDER BY {tri}")
+        if limite:
+            requete += f" LIMIT {int(limite)}"
+        lignes = executer(requete)
+    finally:
+        if connexion is not None:
+            connexion.close()
+    return cles + ["nb", "moyenne_distance", "max_distance", "moyenne_hauteur", "max_hauteur"], lignes
@@ -0,0 +1,144 @@
+import sqlite3
+from functools import lru_cache
+
+import numpy as np
+
+# Atmosphère standard (ISA) et constantes de l'air
+TEMPERATURE_STANDARD = 15.0        # °C au sol
+PRESSION_STANDARD = 1013.25        # hPa au sol
+GRADIENT_TEMPERATURE = 0.0065      # K/m dans la troposphère
+CONSTANTE_AIR_SEC = 287.058        # J/(kg·K)
+CONSTANTE_VAPEUR = 461.495         # J/(kg·K)
+EXPOSANT_BAROMETRIQUE = 9.80665 / (CONSTANTE_AIR_SEC * GRADIENT_TEMPERATURE)
+
+# Vent : profil en loi de puissance u(h) = u_ref (h / h_ref)^α, mesuré à h_ref
+HAUTEUR_VENT = 10.0
+EXPOSANT_VENT = 1 / 7
+HAUTEUR_MIN_VENT = 0.5
+
+# Tables précalculées : pas et hauteur couverte (au-delà, la dernière valeur est conservée)
+PAS_ALTITUDE = 5.0
+ALTITUDE_MAX = 5000.0
+
+
+# Fonction pour calculer la masse volumique de l'air humide (kg/m³)
+def masse_volumique(temperature_c, pression_hpa, humidite=0.0):
+    temperature_k = np.asarray(temperature_c, dtype=float) + 273.15
+    # Pression de vapeur saturante (formule de Magnus), en Pa
+    saturation = 610.94 * np.exp(17.625 * np.asarray(temperature_c) / (np.asarray(temperature_c) + 243.04))
+    vapeur = humidite * saturation
+    seche = np.asarray(pression_hpa, dtype=float) * 100 - vapeur
+    return seche / (CONSTANTE_AIR_SEC * temperature_k) + vapeur / (CONSTANTE_VAPEUR * temperature_k)
+
+
+# Tables de masse volumique et de vent en fonction de l'altitude, sur une grille régulière, rangées en un
+# seul tableau (ordonnée, pente) x champ x cellule : une valeur vaut a[i] + b[i]·y. Les coefficients de
+# tous les champs se lisent en une fois par lancer (un indice par pas, voir coefficients) ; au-delà de la
+# table, une cellule de pente nulle conserve la dernière valeur.
+class Atmosphere:
+    CHAMPS = ("densite", "vent_x", "vent_z")
+
+    def __init__(self, densite, vent_x, vent_z, pas_altitude=PAS_ALTITUDE):
+        self.pas_altitude = pas_altitude
+        self.inverse_pas = 1.0 / pas_altitude
+        self.densite_sol = float(densite[0])
+        valeurs = np.stack([densite, vent_x, vent_z])
+        altitudes = np.arange(valeurs.shape[1]) * pas_altitude
+        pentes = np.diff(valeurs, axis=1) * self.inverse_pas
+        ordonnees = valeurs[:, :-1] - pentes * altitudes[:-1]
+        tables = np.stack([np.concatenate([ordonnees, valeurs[:, -1:]], axis=1),
+                           np.concatenate([pentes, np.zeros((len(valeurs), 1))], axis=1)])
+        # Une copie contiguë par nombre de champs lus (densité seule, + vent x, + vent z)
+        self.tables = {nb: np.ascontiguousarray(tables[:, :nb]) for nb in (1, 2, 3)}
+        self.dernier = tables.shape[2] - 1
+        self.avec_vent = bool(np.any(vent_x) or np.any(vent_z))
+
+    # Fonction pour lire les coefficients (a, b) des nb_champs premiers champs à ces altitudes : (2, nb_champs, n)
+    def coefficients(self, altitudes, nb_champs=3):
+        indices = np.minimum((np.maximum(altitudes, 0) * self.inverse_pas).astype(np.intp), self.dernier)
+        return np.take(self.tables[nb_champs], indices, axis=2)
+
+    def valeur(self, nom, altitudes):
+        altitudes = np.asarray(altitudes, dtype=float)
+        ordonnee, pente = self.coefficients(altitudes)[:, self.CHAMPS.index(nom)]
+        return ordonnee + pente * altitudes
+
+
+# Construction des tables (mise en cache : une condition donnée n'est calculée qu'une fois)
+@lru_cache(maxsize=64)
+def construire_atmosphere(temperature=TEMPERATURE_STANDARD, pression=PRESSION_STANDARD, humidite=0.0,
+                          vent_vitesse=0.0, vent_direction=0.0, densite_sol=None,
+                          altitude_max=ALTITUDE_MAX, pas_altitude=PAS_ALTITUDE):
+    altitudes = np.arange(0.0, altitude_max + 2 * pas_altitude, pas_altitude)
+    temperature_k = temperature + 273.15
+    rapport = (temperature_k - GRADIENT_TEMPERATURE * altitudes) / temperature_k
+    temperatures = temperature_k * rapport - 273.15
+    pressions = pression * rapport ** EXPOSANT_BAROMETRIQUE
+    densite = masse_volumique(temperatures, pressions, humidite)
+    if densite_sol is not None:
+        # Masse volumique au sol imposée (colonne masse_volumique_air) : seul le profil est conservé
+        densite *= densite_sol / densite[0]
+    # Direction vers laquelle souffle le vent, en degrés depuis l'axe de tir x :
+    # 0 = vent arrière, 180 = vent de face, 90 = vent traversier vers +z (la droite du tireur)
+    profil = vent_vitesse * (np.maximum(altitudes, HAUTEUR_MIN_VENT) / HAUTEUR_VENT) ** EXPOSANT_VENT
+    direction = np.radians(vent_direction)
+    return Atmosphere(densite, profil * np.cos(direction), profil * np.sin(direction), pas_altitude)
+
+
+# Colonnes reconnues dans les tables de conditions -> paramètres de construire_atmosphere
+COLONNES = {
+    "temperature": "temperature", "température": "temperature",
+    "pression": "pression",
+    "humidite": "humidite",
+    "vent": "vent_vitesse", "vent_vitesse": "vent_vitesse",
+    "vent_direction": "vent_direction",
+    "masse_volumique_air": "densite_sol",
+}
+
+
+# Tables de conditions lisibles (le nom est inséré dans la requête : jamais de nom venu de l'extérieur)
+TABLES_CONDITIONS = {"conditions", "Condition", "conditions_météo"}
+
+
+# Colonnes d'une condition reprises telles quelles comme options du moteur (simuler / simuler_lot)
+COLONNES_MOTEUR = {
+    "gravite": "gravité", "gravité": "gravité",
+    "coefficient_trainee": "coefficient_trainee", "coefficient_traînée": "coefficient_trainee",
+}
+
+
+# Fonction pour charger une condition enregistrée sous forme d'options du moteur : l'atmosphère
+# (conditions / Condition : temperature, vent, humidite ; conditions_météo : vent_vitesse,
+# vent_direction, température, pression ; les valeurs absentes prennent celles de l'ISA),
+# plus la gravité et le coefficient de traînée quand la table les fournit
+def charger_condition(condition_id, bdd="simulations.db", table="conditions"):
+    if table not in TABLES_CONDITIONS:
+        raise ValueError(f"Table de conditions inconnue : {table} ({', '.join(sorted(TABLES_CONDITIONS))})")
+    connexion = sqlite3.connect(bdd)
+    try:
+        curseur = connexion.execute(f'SELECT * FROM "{table}" WHERE id = ?', (condition_id,))
+        ligne = curseur.fetchone()
+        colonnes = [description[0] for description in curseur.description]
+    finally:
+        connexion.close()
+    if ligne is None:
+        raise ValueError(f"Condition {condition_id} introuvable dans {table}")
+    parametres = {COLONNES[colonne]: float(valeur) for colonne, valeur in zip(colonnes, ligne)
+                  if colonne in COLONNES and valeur is not None}
+    options = {COLONNES_MOTEUR[colonne]: float(valeur) for colonne, valeur in zip(colonnes, ligne)
+               if colonne in COLONNES_MOTEUR and valeur is not None}
+    # Humidité en % ou en fraction, pression en hPa ou en Pa
+    if parametres.get("humidite", 0) > 1:
+        parametres["humidite"] /= 100
+    if parametres.get("pression", 0) > 2000:
+        parametres["pression"] /= 100
+    # Une température ou une pression mesurée prime sur la masse volumique par défaut de la table
+    if "temperature" in parametres or "pression" in parametres:
+        parametres.pop("densite_sol", None)
+    options["atmosphere"] = construire_atmosphere(**parametres)
+    return options
+
+
+# Fonction pour charger seulement l'atmosphère d'une condition enregistrée
+def charger_atmosphere(condition_id, bdd="simulations.db", table="conditions"):
+    return charger_condition(condition_id, bdd, table)["atmosphere"]
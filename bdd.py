@@ -0,0 +1,84 @@
+import argparse
+import sqlite3
+from datetime import datetime
+
+from agregats import installer_agregats
+from instrumentation import chrono, compter
+from migration import VERSION_SCHEMA, creer_schema, schema_a_jour
+
+# Base partagée par les scripts (schéma unifié, voir migration.py)
+BDD = "simulations.db"
+
+
+# Fonction pour initialiser la base (utilisée par tous les scripts sur simulations.db) : rien à faire si
+# le schéma est déjà à jour, sinon création des tables et colonnes manquantes et des agrégats seulement
+# (idempotente, sûre entre processus concurrents). Le dédoublonnage, la fusion de projectile_simulation.db
+# et user_version restent à `python migration.py`, sauf pour une base migrée dans une version antérieure :
+# le nouveau schéma n'y demande que des ajouts, et sa version est relevée.
+def initialiser_bdd(bdd=BDD):
+    if schema_a_jour(bdd):
+        return
+    connexion = sqlite3.connect(bdd, timeout=30, isolation_level=None)
+    try:
+        connexion.execute("BEGIN IMMEDIATE")
+        creer_schema(connexion)
+        if connexion.execute("PRAGMA user_version").fetchone()[0] > 0:
+            connexion.execute(f"PRAGMA user_version = {VERSION_SCHEMA}")
+        connexion.execute("COMMIT")
+    finally:
+        connexion.close()
+    installer_agregats(bdd)
+
+
+# Enregistrement d'une simulation dans la BDD
+def enregistrer_simulation(vitesse, angle, masse, rayon, distance_max, hauteur_max, session_id=None, bdd=BDD):
+    enregistrer_simulations([(vitesse, angle, masse, rayon, distance_max, hauteur_max, session_id)], bdd)
+
+
+# Enregistrement d'un lot de simulations en une seule transaction
+def enregistrer_simulations(lignes, bdd=BDD):
+    date_actuelle = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    lignes = [(v, a, m, r, date_actuelle, d, h, s) for v, a, m, r, d, h, s in lignes]
+    with chrono("bdd.connexion"):
+        connexion = sqlite3.connect(bdd)
+    try:
+        with chrono("bdd.insertion"):
+            connexion.executemany("""
+                INSERT INTO simulation (
+                    vitesse_initiale, angle_deg, masse, rayon, date_simulation, distance_max, hauteur_max, session_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, lignes)
+        with chrono("bdd.commit"):
+            connexion.commit()
+    finally:
+        connexion.close()
+    compter("bdd.lignes_ecrites", len(lignes))
+
+
+# Fonction pour récupérer l'historique des simulations (les plus récentes d'abord si limite)
+def obtenir_historique(limite=None, bdd=BDD):
+    requete = ("SELECT id, vitesse_initiale, angle_deg, masse, rayon, date_simulation, distance_max, hauteur_max "
+               "FROM simulation")
+    if limite:
+        requete += f" ORDER BY id DESC LIMIT {int(limite)}"
+    connexion = sqlite3.connect(bdd)
+    try:
+        return connexion.execute(requete).fetchall()
+    finally:
+        connexion.close()
+
+
+# Point d'entrée sans interface : consultation de l'historique (ni numpy, ni matplotlib, ni tkinter)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Historique des simulations")
+    parser.add_argument("--limite", type=int, help="Nombre de simulations les plus récentes")
+    parser.add_argument("--bdd", default=BDD)
+    args = parser.parse_args(argv)
+    initialiser_bdd(args.bdd)
+    for ligne in obtenir_historique(args.limite, args.bdd):
+        print(f"ID: {ligne[0]} | Vitesse: {ligne[1]} m/s | Angle: {ligne[2]}° | Masse: {ligne[3]} kg | "
+              f"Distance max: {ligne[6]:.2f} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import io
+import json
+import os
+import platform
+import sqlite3
+import sys
+import time
+from contextlib import closing, contextmanager, redirect_stdout
+
+import numpy as np
+
+import IS
+import IS_simu
+import bdd
+import hafa
+import main2
+from moteur import GRAVITE
+
+TAILLE_LOT = 50000
+GRAINE = 2025
+
+
+# Générateur de lancers synthétiques : portée et hauteur approchées (formules sans frottement)
+def lancers_synthetiques(rng, n):
+    vitesses = rng.uniform(5, 120, n)
+    angles = rng.uniform(5, 85, n)
+    masses = rng.uniform(0.05, 10, n)
+    rayons = rng.uniform(0.01, 0.5, n)
+    angles_rad = np.radians(angles)
+    distances = vitesses**2 * np.sin(2 * angles_rad) / GRAVITE
+    hauteurs = (vitesses * np.sin(angles_rad))**2 / (2 * GRAVITE)
+    return vitesses, angles, masses, rayons, distances, hauteurs
+
+
+def dates_synthetiques(rng, n):
+    secondes = rng.integers(0, 365 * 86400, n)
+    return [time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1735689600 + int(s))) for s in secondes]
+
+
+def par_tranches(n, taille=TAILLE_LOT):
+    for debut in range(0, n, taille):
+        yield debut, min(n, debut + taille)
+
+
+# Remplit simulations.db (schéma unifié) avec n simulations
+def generer_simulations(chemin, n, nb_utilisateurs=100, nb_projectiles=50, graine=GRAINE):
+    rng = np.random.default_rng(graine)
+    bdd.initialiser_bdd(chemin)
+    connexion = sqlite3.connect(chemin)
+    connexion.execute("PRAGMA synchronous = OFF")
+    with connexion:
+        connexion.executemany("INSERT INTO utilisateur (nom, email) VALUES (?, ?)",
+                              [(f"Utilisateur {i}", f"synthetique{i}.{graine}@example.com") for i in range(nb_utilisateurs)])
+        connexion.executemany("INSERT INTO projectile (nom, masse, rayon) VALUES (?, ?, ?)",
+                              [(f"Projectile {i}", float(rng.uniform(0.05, 10)), float(rng.uniform(0.01, 0.5)))
+                               for i in range(nb_projectiles)])
+        connexion.execute("INSERT OR IGNORE INTO conditions (id, gravite, masse_volumique_air, coefficient_trainee) "
+                          "VALUES (1, 9.81, 1.225, 0.47)")
+        utilisateurs = [ligne[0] for ligne in connexion.execute("SELECT id FROM utilisateur")]
+        connexion.executemany("INSERT INTO session (utilisateur_id, date_session) VALUES (?, ?)",
+                              [(int(u), d) for u, d in zip(rng.choice(utilisateurs, max(1, n // 20)),
+                                                           dates_synthetiques(rng, max(1, n // 20)))])
+        sessions = [ligne[0] for ligne in connexion.execute("SELECT id FROM session")]
+    for debut, fin in par_tranches(n):
+        v, a, m, r, d, h = lancers_synthetiques(rng, fin - debut)
+        lignes = zip(v.tolist(), a.tolist(), m.tolist(), r.tolist(), dates_synthetiques(rng, fin - debut),
+                     d.tolist(), h.tolist(), rng.choice(sessions, fin - debut).tolist())
+        with connexion:
+            connexion.executemany("""
+                INSERT INTO simulation (vitesse_initiale, angle_deg, masse, rayon, date_simulation,
+                                        distance_max, hauteur_max, session_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, lignes)
+    connexion.close()
+
+
+# Remplit projectile_simulation.db (schéma de main2.py) avec n Simulation/Resultat
+def generer_resultats(chemin, n, nb_utilisateurs=100, nb_projectiles=50, graine=GRAINE):
+    rng = np.random.default_rng(graine)
+    with base_main2(chemin):
+        main2.create_tables()
+    connexion = sqlite3.connect(chemin)
+    connexion.execute("PRAGMA synchronous = OFF")
+    with connexion:
+        connexion.executemany("INSERT OR IGNORE INTO Utilisateur (nom, email) VALUES (?, ?)",
+                              [(f"Utilisateur {i}", f"synthetique{i}.{graine}@example.com") for i in range(nb_utilisateurs)])
+        connexion.executemany("INSERT OR IGNORE INTO Projectile (nom, masse, section, coefficient_frottement) "
+                              "VALUES (?, ?, ?, ?)",
+                              [(f"Projectile {i}", float(rng.uniform(0.05, 10)), main2.SECTION_DEFAUT,
+                                float(rng.uniform(0.01, 1))) for i in range(nb_projectiles)])
+        connexion.executemany("INSERT INTO Condition (temperature, vent, humidite) VALUES (?, ?, ?)",
+                              [(float(rng.uniform(-10, 40)), float(rng.uniform(0, 20)), float(rng.uniform(0, 100)))
+                               for _ in range(10)])
+        utilisateurs = [ligne[0] for ligne in connexion.execute("SELECT id FROM Utilisateur")]
+        projectiles = [ligne[0] for ligne in connexion.execute("SELECT id FROM Projectile")]
+        conditions = [ligne[0] for ligne in connexion.execute("SELECT id FROM Condition")]
+    for debut, fin in par_tranches(n):
+        taille = fin - debut
+        with connexion:
+            premier = connexion.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM Simulation").fetchone()[0]
+            connexion.executemany("""
+                INSERT INTO Simulation (id, utilisateur_id, projectile_id, condition_id, date_lancement)
+                VALUES (?, ?, ?, ?, ?)
+            """, zip(range(premier, premier + taille), rng.choice(utilisateurs, taille).tolist(),
+                     rng.choice(projectiles, taille).tolist(), rng.choice(conditions, taille).tolist(),
+                     dates_synthetiques(rng, taille)))
+            v, _, _, _, d, _ = lancers_synthetiques(rng, taille)
+            connexion.executemany("INSERT INTO Resultat (simulation_id, vitesse_max, distance_max) VALUES (?, ?, ?)",
+                                  zip(range(premier, premier + taille), v.tolist(), d.tolist()))
+    connexion.close()
+
+
+# Fonction pour faire travailler main2 sur une autre base le temps d'un bloc (DB_NAME rétabli ensuite)
+@contextmanager
+def base_main2(chemin):
+    precedente = main2.DB_NAME
+    main2.DB_NAME = chemin
+    try:
+        yield
+    finally:
+        main2.DB_NAME = precedente
+
+
+def chronometrer(fonction):
+    debut = time.perf_counter()
+    fonction()
+    return time.perf_counter() - debut
+
+
+# Fonction pour faire travailler les scripts (qui ouvrent "simulations.db" dans le dossier courant)
+# sur la base synthétique le temps d'un bloc : son dossier devient le dossier courant
+@contextmanager
+def dans_dossier(chemin):
+    precedent = os.getcwd()
+    os.chdir(os.path.dirname(os.path.abspath(chemin)))
+    try:
+        yield
+    finally:
+        os.chdir(precedent)
+
+
+# Temps d'exécution d'un afficher_historique de script (sortie texte écartée)
+def afficher_historique(fonction):
+    with redirect_stdout(io.StringIO()):
+        fonction()
+
+
+# Temps de chargement d'un Treeview par EntityTab.load_records (nécessite un affichage)
+def mesurer_treeview(chemin, table):
+    try:
+        import tkinter as tk
+        racine = tk.Tk()
+    except Exception:
+        return None
+    try:
+        racine.withdraw()
+        with closing(sqlite3.connect(chemin)) as connexion:
+            colonnes = [ligne[1] for ligne in connexion.execute(f"PRAGMA table_info({table})")][1:]
+        with base_main2(chemin):
+            onglet = main2.EntityTab(racine, table, main2.TABLES.get(table) or colonnes)
+            return chronometrer(onglet.load_records)
+    finally:
+        racine.destroy()
+
+
+def mesurer(chemin_simulations, chemin_resultats, nb_ecritures):
+    rng = np.random.default_rng(GRAINE + 1)
+    mesures = {}
+    v, a, m, r, d, h = lancers_synthetiques(rng, nb_ecritures)
+    lignes = list(zip(v.tolist(), a.tolist(), m.tolist(), r.tolist(), d.tolist(), h.tolist(), [None] * nb_ecritures))
+
+    # Écritures des scripts : un appel (connexion + commit) par ligne, puis en lot (service_http.py)
+    with dans_dossier(chemin_simulations):
+        for nom, enregistrer in (("IS", IS.enregistrer_simulation), ("IS_simu", IS_simu.enregistrer_simulation),
+                                 ("hafa", lambda *ligne: hafa.enregistrer_simulation(*ligne, None))):
+            duree = chronometrer(lambda: [enregistrer(*ligne[:6]) for ligne in lignes])
+            mesures[f"enregistrer_simulation_{nom}_lignes_s"] = nb_ecritures / duree
+    duree = chronometrer(lambda: bdd.enregistrer_simulations(lignes, chemin_simulations))
+    mesures["enregistrer_simulations_lot_lignes_s"] = nb_ecritures / duree
+
+    main2.SimulationTab.id_cache.clear()
+    onglet = main2.SimulationTab.__new__(main2.SimulationTab)
+    with base_main2(chemin_resultats):
+        duree = chronometrer(lambda: [onglet.store_simulation(f"Projectile {i % 50}", 1.0, 0.1, vi, di, vi)
+                                      for i, (vi, di) in enumerate(zip(v.tolist(), d.tolist()))])
+    mesures["save_simulation_lignes_s"] = nb_ecritures / duree
+
+    # Lectures de l'historique
+    mesures["historique_complet_s"] = chronometrer(lambda: bdd.obtenir_historique(bdd=chemin_simulations))
+    mesures["historique_100_derniers_s"] = chronometrer(lambda: bdd.obtenir_historique(100, chemin_simulations))
+    with dans_dossier(chemin_simulations):
+        mesures["afficher_historique_IS_s"] = chronometrer(lambda: afficher_historique(IS.afficher_historique))
+        mesures["afficher_historique_hafa_s"] = chronometrer(lambda: afficher_historique(hafa.afficher_historique))
+        # IS_simu.py affiche dans une fenêtre Tk : seule sa lecture de l'historique est mesurée
+        mesures["obtenir_historique_IS_simu_s"] = chronometrer(IS_simu.obtenir_historique)
+    mesures["treeview_resultat_s"] = mesurer_treeview(chemin_resultats, "Resultat")
+    mesures["treeview_condition_s"] = mesurer_treeview(chemin_resultats, "Condition")
+
+    for chemin, table in ((chemin_simulations, "simulation"), (chemin_resultats, "Resultat")):
+        with closing(sqlite3.connect(chemin)) as connexion:
+            mesures[f"lignes_{table}"] = connexion.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return mesures
+
+
+# Les mesures *_s sont des durées (plus petit = mieux), les *_lignes_s des débits (plus grand = mieux)
+def comparer(actuel, precedent, seuil):
+    regressions = []
+    for nom, valeur in actuel["mesures"].items():
+        ancien = precedent["mesures"].get(nom)
+        if valeur is None or ancien is None or nom.startswith("lignes_"):
+            continue
+        if nom.endswith("_lignes_s"):
+            if valeur < ancien / (1 + seuil):
+                regressions.append(f"{nom} : {ancien:.0f} -> {valeur:.0f} lignes/s")
+        elif valeur > ancien * (1 + seuil):
+            regressions.append(f"{nom} : {ancien:.4f} -> {valeur:.4f} s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai base de données sur données synthétiques")
+    parser.add_argument("--dossier", default="bench_bdd", help="Dossier des bases synthétiques")
+    parser.add_argument("--lignes", type=int, default=100000, help="Nombre de simulations générées par base")
+    parser.add_argument("--ecritures", type=int, default=1000, help="Nombre de lignes écrites pendant la mesure")
+    parser.add_argument("--regenerer", action="store_true", help="Recréer les bases même si elles existent")
+    parser.add_argument("--sortie", help="Fichier JSON des résultats")
+    parser.add_argument("--comparer", help="Résultats JSON d'une exécution précédente")
+    parser.add_argument("--seuil", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.dossier, exist_ok=True)
+    # Les scripts ouvrent "simulations.db" : un dossier par taille de base
+    chemin_simulations = os.path.join(args.dossier, f"simulations_{args.lignes}", "simulations.db")
+    os.makedirs(os.path.dirname(chemin_simulations), exist_ok=True)
+    chemin_resultats = os.path.join(args.dossier, f"projectile_simulation_{args.lignes}.db")
+    for chemin, generer in ((chemin_simulations, generer_simulations), (chemin_resultats, generer_resultats)):
+        if args.regenerer and os.path.exists(chemin):
+            os.remove(chemin)
+        if not os.path.exists(chemin):
+            duree = chronometrer(lambda: generer(chemin, args.lignes))
+            print(f"{chemin} : {args.lignes} lignes générées en {duree:.1f} s ({args.lignes / duree:.0f} lignes/s)")
+
+    mesures = mesurer(chemin_simulations, chemin_resultats, args.ecritures)
+    for nom, valeur in mesures.items():
+        print(f"{nom:40s} " + ("indisponible (pas d'affichage)" if valeur is None else f"{valeur:.4f}"))
+
+    resultats = {"machine": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version},
+                 "lignes": args.lignes, "ecritures": args.ecritures, "mesures": mesures}
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as fichier:
+            json.dump(resultats, fichier, indent=2)
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as fichier:
+            regressions = comparer(resultats, json.load(fichier), args.seuil)
+        for regression in regressions:
+            print(f"Régression : {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
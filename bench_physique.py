@@ -0,0 +1,221 @@
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+
+import numpy as np
+
+import moteur
+from main import SimulationTab
+
+# Lancers de référence (graine fixe pour des mesures reproductibles)
+GRAINE = 2025
+NB_LANCERS = 8
+PAS_TESTES = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05]
+TAILLES_LOT = [1, 10, 100, 1000, 10000]
+# Instant de comparaison des états (tous les lancers de référence sont encore en vol)
+TEMPS_COMPARAISON = 1.0
+PAS_REFERENCE = 1e-4
+
+
+def lancers_reference(nb=NB_LANCERS, graine=GRAINE):
+    rng = np.random.default_rng(graine)
+    return [(rng.uniform(20, 100), rng.uniform(25, 75), rng.uniform(0.2, 5), rng.uniform(0.02, 0.2))
+            for _ in range(nb)]
+
+
+def resistance_sur_masse(masse, rayon):
+    return float(moteur.coefficient_resistance(rayon)) / masse
+
+
+# Intégrateurs des scripts : IS.py, IS2.py, hafa.py et simu_is.py appellent moteur.simuler (RK4),
+# IS_simu.simuler_projectile l'appelle avec méthode="euler". Renvoie les n + 1 positions (x, y)
+# (moins si le lancer touche le sol avant).
+def integrer_moteur(méthode, vitesse, angle, masse, rayon, h, n):
+    _, _, x, y = moteur.simuler(vitesse, angle, masse, rayon, pas_temps=h, temps_max=(n + 1.5) * h, méthode=méthode)
+    return np.column_stack([x, y])
+
+
+def integrer_rk4(vitesse, angle, masse, rayon, h, n):
+    return integrer_moteur("rk4", vitesse, angle, masse, rayon, h, n)
+
+
+def integrer_euler(vitesse, angle, masse, rayon, h, n):
+    return integrer_moteur("euler", vitesse, angle, masse, rayon, h, n)
+
+
+# Intégrateur de main.py : SimulationTab.runge_kutta_4 sur des listes
+def integrer_rk4_listes(vitesse, angle, masse, rayon, h, n):
+    k = resistance_sur_masse(masse, rayon)
+
+    def equations(t, y):
+        x, y_pos, vx, vy = y
+        v = math.sqrt(vx**2 + vy**2)
+        return [vx, vy, -k * v * vx, -moteur.GRAVITE - k * v * vy]
+
+    y0 = list(moteur.état_initial_lot([vitesse], [angle])[:, 0])
+    _, ys = SimulationTab.runge_kutta_4(None, equations, 0, y0, h, n)
+    return np.array(ys)
+
+
+INTEGRATEURS = {
+    "rk4 (IS.py, hafa.py...)": integrer_rk4,
+    "euler (IS_simu.py)": integrer_euler,
+    "rk4_listes (main.py)": integrer_rk4_listes,
+}
+
+
+# Portée au sens des scripts : arrêt au premier y < 0 puis max(x)
+def portee_scripts(états):
+    sous_sol = np.nonzero(états[1:, 1] < 0)[0]
+    fin = sous_sol[0] + 2 if len(sous_sol) else len(états)
+    return états[:fin, 0].max()
+
+
+# Référence haute précision : RK4 vectorisé à très petit pas, impact interpolé
+def reference(lancers):
+    vitesses, angles, masses, rayons = map(np.array, zip(*lancers))
+    k = moteur.coefficient_resistance(rayons) / masses
+    modèle = moteur.modèle_projectile_lot(k)
+    état = moteur.état_initial_lot(vitesses, angles)
+    n_comparaison = round(TEMPS_COMPARAISON / PAS_REFERENCE)
+    états_t = None
+    portees = np.full(len(lancers), np.nan)
+    durees = np.full(len(lancers), np.nan)
+    i = 0
+    while np.isnan(portees).any():
+        nouvel = moteur.pas_rk4(modèle, i * PAS_REFERENCE, état, PAS_REFERENCE)
+        i += 1
+        if i == n_comparaison:
+            états_t = nouvel.copy()
+        impact = np.isnan(portees) & (nouvel[1] < 0)
+        fraction = état[1, impact] / (état[1, impact] - nouvel[1, impact])
+        portees[impact] = état[0, impact] + fraction * (nouvel[0, impact] - état[0, impact])
+        durees[impact] = (i - 1 + fraction) * PAS_REFERENCE
+        état = nouvel
+    return états_t, portees, durees
+
+
+def chronometrer(fonction, repetitions=3):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur
+
+
+def mesurer_integrateurs(lancers, pas_testes, repetitions):
+    états_ref, portees_ref, durees_ref = reference(lancers)
+    resultats = []
+    for nom, integrer in INTEGRATEURS.items():
+        for h in pas_testes:
+            temps_total, pas_total, erreurs_etat, erreurs_portee = 0.0, 0, [], []
+            for j, lancer in enumerate(lancers):
+                n = math.ceil(durees_ref[j] / h) + 1
+                états = integrer(*lancer, h, n)
+                temps_total += chronometrer(lambda: integrer(*lancer, h, n), repetitions)
+                pas_total += n
+                i_t = round(TEMPS_COMPARAISON / h)
+                erreurs_etat.append(float(np.abs(états[i_t, :2] - états_ref[:2, j]).max()))
+                erreurs_portee.append(abs(portee_scripts(états) - portees_ref[j]))
+            resultats.append({
+                "integrateur": nom, "pas": h,
+                "temps_par_pas_us": temps_total / pas_total * 1e6,
+                "temps_par_lancer_ms": temps_total / len(lancers) * 1e3,
+                "erreur_position_m": max(erreurs_etat),
+                "erreur_portee_m": max(erreurs_portee),
+            })
+            print(f"{nom:24s} pas={h:<6} {resultats[-1]['temps_par_pas_us']:8.2f} µs/pas "
+                  f"{resultats[-1]['temps_par_lancer_ms']:8.2f} ms/lancer "
+                  f"erreur position {resultats[-1]['erreur_position_m']:.2e} m "
+                  f"portée {resultats[-1]['erreur_portee_m']:.2e} m")
+    return resultats
+
+
+def mesurer_lots(tailles, repetitions):
+    resultats = []
+    for méthode in moteur.INTEGRATEURS:
+        for taille in tailles:
+            lancers = lancers_reference(taille, GRAINE + taille)
+            colonnes = [np.array(c) for c in zip(*lancers)]
+            duree = chronometrer(lambda: moteur.simuler_lot(*colonnes, méthode=méthode), repetitions)
+            resultats.append({"methode": méthode, "taille": taille, "temps_par_lancer_us": duree / taille * 1e6})
+            print(f"simuler_lot {méthode:6s} lot={taille:<6d} {resultats[-1]['temps_par_lancer_us']:10.1f} µs/lancer")
+    return resultats
+
+
+def tracer(resultats, chemin):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    for nom in INTEGRATEURS:
+        points = [r for r in resultats if r["integrateur"] == nom]
+        plt.loglog([r["temps_par_lancer_ms"] for r in points], [r["erreur_position_m"] for r in points],
+                   "o-", label=nom)
+        for r in points:
+            plt.annotate(f"{r['pas']}", (r["temps_par_lancer_ms"], r["erreur_position_m"]), fontsize=7)
+    plt.title(f"Précision (t = {TEMPS_COMPARAISON} s) en fonction du temps de calcul")
+    plt.xlabel("Temps par lancer (ms)")
+    plt.ylabel("Erreur de position (m)")
+    plt.grid(True, which="both")
+    plt.legend()
+    plt.savefig(chemin, dpi=120)
+    plt.close()
+
+
+# Compare les temps à une exécution précédente : renvoie la liste des régressions
+def comparer(actuel, precedent, seuil):
+    regressions = []
+    anciens = {(r["integrateur"], r["pas"]): r for r in precedent["integrateurs"]}
+    for r in actuel["integrateurs"]:
+        ancien = anciens.get((r["integrateur"], r["pas"]))
+        if ancien and r["temps_par_pas_us"] > ancien["temps_par_pas_us"] * (1 + seuil):
+            regressions.append(f"{r['integrateur']} pas={r['pas']} : "
+                               f"{ancien['temps_par_pas_us']:.2f} -> {r['temps_par_pas_us']:.2f} µs/pas")
+    anciens = {(r["methode"], r["taille"]): r for r in precedent["lots"]}
+    for r in actuel["lots"]:
+        ancien = anciens.get((r["methode"], r["taille"]))
+        if ancien and r["temps_par_lancer_us"] > ancien["temps_par_lancer_us"] * (1 + seuil):
+            regressions.append(f"simuler_lot {r['methode']} lot={r['taille']} : "
+                               f"{ancien['temps_par_lancer_us']:.1f} -> {r['temps_par_lancer_us']:.1f} µs/lancer")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai des intégrateurs (coût et précision)")
+    parser.add_argument("--sortie", help="Fichier JSON des résultats")
+    parser.add_argument("--graphique", help="Image précision / temps (PNG)")
+    parser.add_argument("--comparer", help="Résultats JSON d'une exécution précédente")
+    parser.add_argument("--seuil", type=float, default=0.2, help="Ralentissement toléré (0.2 = 20 %%)")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--pas", type=float, nargs="+", default=PAS_TESTES)
+    parser.add_argument("--tailles", type=int, nargs="+", default=TAILLES_LOT)
+    args = parser.parse_args(argv)
+
+    resultats = {
+        "machine": {"python": platform.python_version(), "numpy": np.__version__,
+                    "processeur": platform.processor() or platform.machine()},
+        "integrateurs": mesurer_integrateurs(lancers_reference(), args.pas, args.repetitions),
+        "lots": mesurer_lots(args.tailles, args.repetitions),
+    }
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as fichier:
+            json.dump(resultats, fichier, indent=2)
+    if args.graphique:
+        tracer(resultats["integrateurs"], args.graphique)
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as fichier:
+            regressions = comparer(resultats, json.load(fichier), args.seuil)
+        for regression in regressions:
+            print(f"Régression : {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import argparse
+import json
+import math
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+import moteur
+from bdd import initialiser_bdd
+from file_travaux import DELAI_VERROU, lancers, lire_valeurs
+from instrumentation import chrono, compter
+from journal import journaliser
+
+TAILLE_MORCEAU = 1000
+TIRAGES_MAX = 100   # nouveaux tirages d'un échantillon hors domaine avant d'abandonner
+
+# Exécutions reprenables : une exécution (balayage ou Monte-Carlo) est découpée en morceaux numérotés ;
+# chaque morceau terminé laisse, dans une seule transaction, ses lancers dans `simulation` et une ligne
+# dans execution_morceau (marqueur et agrégats partiels). Une exécution relancée sous le même nom saute
+# les morceaux marqués ; les agrégats finaux sont toujours recombinés dans l'ordre des morceaux.
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS execution (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nom TEXT UNIQUE NOT NULL,
+        type TEXT NOT NULL,
+        parametres TEXT NOT NULL,
+        nb_lancers INTEGER NOT NULL,
+        taille_morceau INTEGER NOT NULL,
+        etat TEXT NOT NULL DEFAULT 'en_cours',
+        date_debut TEXT,
+        date_fin TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS execution_morceau (
+        execution_id INTEGER NOT NULL,
+        morceau INTEGER NOT NULL,
+        nb INTEGER NOT NULL,
+        somme_distance REAL,
+        somme_carres_distance REAL,
+        min_distance REAL,
+        max_distance REAL,
+        somme_hauteur REAL,
+        max_hauteur REAL,
+        date_fin TEXT,
+        PRIMARY KEY (execution_id, morceau),
+        FOREIGN KEY(execution_id) REFERENCES execution(id)
+    )""",
+]
+
+
+def connecter(bdd):
+    initialiser_bdd(bdd)
+    connexion = sqlite3.connect(bdd, timeout=DELAI_VERROU)
+    for instruction in SCHEMA:
+        connexion.execute(instruction)
+    connexion.commit()
+    return connexion
+
+
+# Fonction pour créer une exécution, ou retrouver celle du même nom (mêmes paramètres exigés)
+def ouvrir_execution(connexion, nom, type_execution, parametres, nb_lancers, taille_morceau=TAILLE_MORCEAU):
+    texte = json.dumps(parametres, sort_keys=True)
+    ligne = connexion.execute("SELECT id, type, parametres, nb_lancers, taille_morceau FROM execution WHERE nom = ?",
+                              (nom,)).fetchone()
+    if ligne is not None:
+        if ligne[1:] != (type_execution, texte, nb_lancers, taille_morceau):
+            raise ValueError(f"L'exécution « {nom} » existe déjà avec d'autres paramètres")
+        return ligne[0]
+    with connexion:
+        return connexion.execute(
+            "INSERT INTO execution (nom, type, parametres, nb_lancers, taille_morceau, date_debut) VALUES (?, ?, ?, ?, ?, ?)",
+            (nom, type_execution, texte, nb_lancers, taille_morceau,
+             datetime.now().strftime("%Y-%m-%d %H:%M:%S"))).lastrowid
+
+
+# Échantillons sans sens physique : vitesse ou masse <= 0, angle hors de ]0, 90[, rayon < 0
+def hors_domaine(nom, valeurs):
+    if nom == "angle":
+        return ~((valeurs > 0) & (valeurs < 90))
+    if nom == "rayon":
+        return ~(valeurs >= 0)
+    return ~(valeurs > 0)
+
+
+# Lancers d'un morceau, fonction de (paramètres, numéro) seulement : identiques à chaque reprise.
+# Monte-Carlo : générateur propre au morceau, initialisé par (graine, morceau) ; loi normale tronquée
+# au domaine physique (les échantillons hors domaine sont tirés à nouveau).
+def lancers_morceau(type_execution, parametres, debut, fin, morceau):
+    if type_execution == "balayage":
+        return lancers(parametres, debut, fin)
+    generateur = np.random.default_rng([parametres["graine"], morceau])
+    noms = ("vitesse", "angle", "masse", "rayon")
+    colonnes = [generateur.normal(parametres[nom], parametres["ecarts"][i], fin - debut) for i, nom in enumerate(noms)]
+    for i, nom in enumerate(noms):
+        for _ in range(TIRAGES_MAX):
+            hors = hors_domaine(nom, colonnes[i])
+            if not hors.any():
+                break
+            colonnes[i][hors] = generateur.normal(parametres[nom], parametres["ecarts"][i], hors.sum())
+        else:
+            raise ValueError(f"Écart-type de {nom} trop grand : trop d'échantillons hors domaine")
+    return colonnes
+
+
+# Fonction pour exécuter (ou reprendre) une exécution ; morceaux_max limite le nombre de morceaux
+# traités par cet appel. Renvoie les agrégats recombinés (voir resultats).
+def executer(bdd, execution_id, enregistrer=True, morceaux_max=None):
+    connexion = connecter(bdd)
+    try:
+        type_execution, parametres, nb_lancers, taille_morceau = connexion.execute(
+            "SELECT type, parametres, nb_lancers, taille_morceau FROM execution WHERE id = ?", (execution_id,)).fetchone()
+        parametres = json.loads(parametres)
+        faits = {ligne[0] for ligne in connexion.execute(
+            "SELECT morceau FROM execution_morceau WHERE execution_id = ?", (execution_id,))}
+        nb_morceaux = math.ceil(nb_lancers / taille_morceau)
+        a_faire = [morceau for morceau in range(nb_morceaux) if morceau not in faits]
+        if faits:
+            journaliser("execution.reprise", execution_id=execution_id, morceaux_faits=len(faits),
+                        morceaux_restants=len(a_faire))
+        for morceau in a_faire[:morceaux_max]:
+            debut, fin = morceau * taille_morceau, min((morceau + 1) * taille_morceau, nb_lancers)
+            colonnes = lancers_morceau(type_execution, parametres, debut, fin, morceau)
+            with chrono("execution.simulation"):
+                distances, hauteurs = moteur.simuler_lot(*colonnes, **parametres.get("options", {}))
+            date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            try:
+                with chrono("execution.enregistrement"), connexion:
+                    if enregistrer:
+                        connexion.executemany("""
+                            INSERT INTO simulation (
+                                vitesse_initiale, angle_deg, masse, rayon, date_simulation, distance_max, hauteur_max
+                            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """, zip(*(c.tolist() for c in colonnes), [date] * len(distances), distances.tolist(),
+                                 hauteurs.tolist()))
+                    connexion.execute("INSERT INTO execution_morceau VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                      (execution_id, morceau, len(distances), float(distances.sum()),
+                                       float(np.sum(distances**2)), float(distances.min()), float(distances.max()),
+                                       float(hauteurs.sum()), float(hauteurs.max()), date))
+            except sqlite3.IntegrityError:
+                # Morceau marqué entre-temps par une autre reprise du même nom : rien n'a été écrit
+                continue
+            compter("execution.lancers", len(distances))
+        if morceaux_max is None or len(a_faire) <= morceaux_max:
+            with connexion:
+                connexion.execute("UPDATE execution SET etat = 'termine', date_fin = ? WHERE id = ? AND etat != 'termine'",
+                                  (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), execution_id))
+        return resultats(connexion, execution_id)
+    finally:
+        connexion.close()
+
+
+# Agrégats d'une exécution, recombinés dans l'ordre des morceaux (même résultat, interrompue ou non)
+def resultats(connexion, execution_id):
+    morceaux = connexion.execute("""
+        SELECT nb, somme_distance, somme_carres_distance, min_distance, max_distance, somme_hauteur, max_hauteur
+        FROM execution_morceau WHERE execution_id = ? ORDER BY morceau
+    """, (execution_id,)).fetchall()
+    nom, etat, nb_lancers = connexion.execute("SELECT nom, etat, nb_lancers FROM execution WHERE id = ?",
+                                              (execution_id,)).fetchone()
+    nb = somme = carres = somme_hauteur = 0.0
+    minimum, maximum, max_hauteur = math.inf, -math.inf, -math.inf
+    for n, s, c, mini, maxi, sh, mh in morceaux:
+        nb += n
+        somme += s
+        carres += c
+        somme_hauteur += sh
+        minimum, maximum, max_hauteur = min(minimum, mini), max(maximum, maxi), max(max_hauteur, mh)
+    moyenne = somme / nb if nb else math.nan
+    return {"execution_id": execution_id, "nom": nom, "etat": etat, "lancers": int(nb), "nb_lancers": nb_lancers,
+            "morceaux": len(morceaux), "distance_moyenne": moyenne,
+            "distance_ecart_type": math.sqrt(max(carres / nb - moyenne**2, 0)) if nb else math.nan,
+            "distance_min": minimum, "distance_max": maximum,
+            "hauteur_moyenne": somme_hauteur / nb if nb else math.nan, "hauteur_max": max_hauteur}
+
+
+# Balayage reprenable sur la grille vitesses x angles x masses x rayons
+def balayage(bdd, nom, vitesses, angles, masses, rayons, taille_morceau=TAILLE_MORCEAU, enregistrer=True,
+             morceaux_max=None, **options):
+    parametres = {"vitesses": [float(v) for v in np.atleast_1d(vitesses)],
+                  "angles": [float(a) for a in np.atleast_1d(angles)],
+                  "masses": [float(m) for m in np.atleast_1d(masses)],
+                  "rayons": [float(r) for r in np.atleast_1d(rayons)],
+                  "options": options}
+    nb_lancers = int(np.prod([len(parametres[cle]) for cle in ("vitesses", "angles", "masses", "rayons")]))
+    connexion = connecter(bdd)
+    try:
+        execution_id = ouvrir_execution(connexion, nom, "balayage", parametres, nb_lancers, taille_morceau)
+    finally:
+        connexion.close()
+    return executer(bdd, execution_id, enregistrer, morceaux_max)
+
+
+# Monte-Carlo reprenable : lancers tirés autour de (vitesse, angle, masse, rayon) avec les écarts-types donnés
+def monte_carlo(bdd, nom, vitesse, angle, masse, rayon, ecarts, nb_lancers, graine=0,
+                taille_morceau=TAILLE_MORCEAU, enregistrer=True, morceaux_max=None, **options):
+    parametres = {"vitesse": float(vitesse), "angle": float(angle), "masse": float(masse), "rayon": float(rayon),
+                  "ecarts": [float(e) for e in ecarts], "graine": int(graine), "options": options}
+    if len(parametres["ecarts"]) != 4 or not all(math.isfinite(e) and e >= 0 for e in parametres["ecarts"]):
+        raise ValueError("ecarts : quatre écarts-types finis et positifs (vitesse, angle, masse, rayon)")
+    for parametre in ("vitesse", "angle", "masse", "rayon"):
+        if hors_domaine(parametre, np.array([parametres[parametre]]))[0]:
+            raise ValueError(f"{parametre} nominal hors domaine : {parametres[parametre]}")
+    connexion = connecter(bdd)
+    try:
+        execution_id = ouvrir_execution(connexion, nom, "monte_carlo", parametres, int(nb_lancers), taille_morceau)
+    finally:
+        connexion.close()
+    return executer(bdd, execution_id, enregistrer, morceaux_max)
+
+
+def afficher(resultat):
+    print(f"Exécution {resultat['execution_id']} « {resultat['nom']} » ({resultat['etat']}) : "
+          f"{resultat['lancers']}/{resultat['nb_lancers']} lancers en {resultat['morceaux']} morceaux")
+    if resultat["lancers"]:
+        print(f"  distance : moyenne {resultat['distance_moyenne']:.3f} m, écart-type {resultat['distance_ecart_type']:.3f} m, "
+              f"min {resultat['distance_min']:.3f} m, max {resultat['distance_max']:.3f} m")
+        print(f"  hauteur : moyenne {resultat['hauteur_moyenne']:.3f} m, max {resultat['hauteur_max']:.3f} m")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Balayages et Monte-Carlo reprenables après interruption")
+    parser.add_argument("--bdd", default="simulations.db")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    p_balayage = sous.add_parser("balayage", help="Balayage de grille (relancer le même nom pour reprendre)")
+    p_monte_carlo = sous.add_parser("monte-carlo", help="Monte-Carlo (relancer le même nom pour reprendre)")
+    for p in (p_balayage, p_monte_carlo):
+        p.add_argument("nom")
+        p.add_argument("--taille", type=int, default=TAILLE_MORCEAU, help="Lancers par morceau")
+        p.add_argument("--sans-enregistrer", action="store_true", help="Ne garder que les agrégats")
+        p.add_argument("--methode", default="rk4", choices=sorted(moteur.INTEGRATEURS) + ["auto"])
+    for nom in ("vitesses", "angles", "masses", "rayons"):
+        p_balayage.add_argument(f"--{nom}", required=True, help="debut:fin:pas, a,b,c ou valeur")
+    for nom in ("vitesse", "angle", "masse", "rayon"):
+        p_monte_carlo.add_argument(f"--{nom}", type=float, required=True)
+    p_monte_carlo.add_argument("--ecarts", required=True, help="Écarts-types de vitesse, angle, masse, rayon : a,b,c,d")
+    p_monte_carlo.add_argument("--lancers", type=int, required=True)
+    p_monte_carlo.add_argument("--graine", type=int, default=0)
+    p_etat = sous.add_parser("etat", help="Avancement et agrégats des exécutions")
+    p_etat.add_argument("nom", nargs="?")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.commande == "balayage":
+            afficher(balayage(args.bdd, args.nom, *(lire_valeurs(getattr(args, nom)) for nom in
+                                                   ("vitesses", "angles", "masses", "rayons")),
+                              taille_morceau=args.taille, enregistrer=not args.sans_enregistrer, méthode=args.methode))
+            return
+        if args.commande == "monte-carlo":
+            afficher(monte_carlo(args.bdd, args.nom, args.vitesse, args.angle, args.masse, args.rayon,
+                                 lire_valeurs(args.ecarts), args.lancers, args.graine, taille_morceau=args.taille,
+                                 enregistrer=not args.sans_enregistrer, méthode=args.methode))
+            return
+    except ValueError as erreur:
+        parser.error(str(erreur))
+    connexion = connecter(args.bdd)
+    try:
+        requete, valeurs = "SELECT id FROM execution ORDER BY id", ()
+        if args.nom:
+            requete, valeurs = "SELECT id FROM execution WHERE nom = ?", (args.nom,)
+        for (execution_id,) in connexion.execute(requete, valeurs).fetchall():
+            afficher(resultats(connexion, execution_id))
+    finally:
+        connexion.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+# Nombre de lignes lues par appel à fetchmany
+TAILLE_LOT = 5000
+
+# Jointure Simulation ⋈ Resultat ⋈ Projectile ⋈ Condition (projectile_simulation.db)
+REQUETE_JOINTURE = """
+    SELECT s.id, s.date_lancement, s.utilisateur_id,
+           p.nom, p.masse, p.section, p.coefficient_frottement,
+           c.temperature, c.vent, c.humidite,
+           r.vitesse_max, r.distance_max
+    FROM Simulation s
+    JOIN Resultat r ON r.simulation_id = s.id
+    JOIN Projectile p ON p.id = s.projectile_id
+    JOIN Condition c ON c.id = s.condition_id
+    ORDER BY s.id
+"""
+
+COLONNES_JOINTURE = [
+    ("id", "INTEGER"),
+    ("date_lancement", "TEXT"),
+    ("utilisateur_id", "INTEGER"),
+    ("nom", "TEXT"),
+    ("masse", "REAL"),
+    ("section", "REAL"),
+    ("coefficient_frottement", "REAL"),
+    ("temperature", "REAL"),
+    ("vent", "REAL"),
+    ("humidite", "REAL"),
+    ("vitesse_max", "REAL"),
+    ("distance_max", "REAL"),
+]
+
+# Sources exportables : nom -> base par défaut
+SOURCES = {
+    "simulation": "simulations.db",
+    "jointure": "projectile_simulation.db",
+}
+
+
+# Fonction pour décrire une source : requête SQL et colonnes typées
+def decrire_source(connexion, source):
+    if source == "simulation":
+        colonnes = [(ligne[1], (ligne[2] or "REAL").upper())
+                    for ligne in connexion.execute("PRAGMA table_info(simulation)")]
+        if not colonnes:
+            raise ValueError("La table simulation n'existe pas dans cette base")
+        noms = ", ".join(nom for nom, _ in colonnes)
+        return f"SELECT {noms} FROM simulation ORDER BY id", colonnes
+    if source == "jointure":
+        return REQUETE_JOINTURE, COLONNES_JOINTURE
+    raise ValueError(f"Source inconnue : {source}")
+
+
+# Fonction pour parcourir une requête par lots bornés (mémoire constante)
+def lire_par_lots(curseur, taille_lot=TAILLE_LOT):
+    while True:
+        lot = curseur.fetchmany(taille_lot)
+        if not lot:
+            break
+        yield lot
+
+
+# Fonction pour choisir le dtype NumPy d'une colonne
+def dtype_colonne(connexion, requete, nom, type_sql):
+    if type_sql.startswith("INT"):
+        return np.dtype(np.int64)
+    if type_sql in ("REAL", "FLOAT", "DOUBLE", "NUMERIC"):
+        return np.dtype(np.float64)
+    # Texte : largeur fixe calculée par SQLite, sans charger les données
+    largeur = connexion.execute(
+        f"SELECT MAX(LENGTH({nom})) FROM ({requete})").fetchone()[0] or 1
+    return np.dtype(f"U{largeur}")
+
+
+# Fonction pour convertir une valeur SQL (éventuellement NULL) vers le dtype cible
+def valeur_colonne(valeur, dtype):
+    if valeur is None:
+        if dtype.kind == "f":
+            return np.nan
+        if dtype.kind == "i":
+            return -1
+        return ""
+    return valeur
+
+
+def exporter_csv(curseur, colonnes, chemin, taille_lot):
+    total = 0
+    with open(chemin, "w", newline="", encoding="utf-8") as fichier:
+        ecrivain = csv.writer(fichier)
+        ecrivain.writerow([nom for nom, _ in colonnes])
+        for lot in lire_par_lots(curseur, taille_lot):
+            ecrivain.writerows(lot)
+            total += len(lot)
+    return total
+
+
+# Écrit chaque colonne dans un fichier .npy projeté en mémoire (np.load(..., mmap_mode='r'))
+def ecrire_colonnes_npy(connexion, curseur, requete, colonnes, dossier, nb_lignes, taille_lot):
+    dtypes = [dtype_colonne(connexion, requete, nom, type_sql) for nom, type_sql in colonnes]
+    tableaux = [np.lib.format.open_memmap(os.path.join(dossier, f"{nom}.npy"), mode="w+",
+                                          dtype=dtype, shape=(nb_lignes,))
+                for (nom, _), dtype in zip(colonnes, dtypes)]
+    position = 0
+    for lot in lire_par_lots(curseur, taille_lot):
+        # Des lignes insérées après le comptage ne sont pas exportées
+        lot = lot[:nb_lignes - position]
+        if not lot:
+            break
+        fin = position + len(lot)
+        for j, (tableau, dtype) in enumerate(zip(tableaux, dtypes)):
+            tableau[position:fin] = [valeur_colonne(ligne[j], dtype) for ligne in lot]
+        position = fin
+    for tableau in tableaux:
+        tableau.flush()
+    del tableaux
+    with open(os.path.join(dossier, "schema.json"), "w", encoding="utf-8") as fichier:
+        json.dump({"lignes": position,
+                   "colonnes": [{"nom": nom, "type": type_sql, "dtype": dtype.str}
+                                for (nom, type_sql), dtype in zip(colonnes, dtypes)]},
+                  fichier, indent=2)
+    return position
+
+
+def exporter_colonnes(connexion, curseur, requete, colonnes, chemin, nb_lignes, taille_lot):
+    os.makedirs(chemin, exist_ok=True)
+    return ecrire_colonnes_npy(connexion, curseur, requete, colonnes, chemin, nb_lignes, taille_lot)
+
+
+def exporter_npz(connexion, curseur, requete, colonnes, chemin, nb_lignes, taille_lot):
+    dossier = tempfile.mkdtemp(prefix="export_npz_")
+    try:
+        total = ecrire_colonnes_npy(connexion, curseur, requete, colonnes, dossier, nb_lignes, taille_lot)
+        # Copie en flux des .npy dans l'archive, sans les recharger en mémoire
+        with zipfile.ZipFile(chemin, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for nom, _ in colonnes:
+                with open(os.path.join(dossier, f"{nom}.npy"), "rb") as source, \
+                        archive.open(f"{nom}.npy", "w", force_zip64=True) as cible:
+                    shutil.copyfileobj(source, cible, 1 << 20)
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+    return total
+
+
+def exporter_parquet(curseur, colonnes, chemin, taille_lot):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Le format parquet nécessite pyarrow (utiliser 'colonnes' ou 'npz' sinon)")
+    types = {"INTEGER": pa.int64(), "REAL": pa.float64(), "TEXT": pa.string()}
+    schema = pa.schema([(nom, types.get(type_sql, pa.float64())) for nom, type_sql in colonnes])
+    total = 0
+    with pq.ParquetWriter(chemin, schema) as ecrivain:
+        # Un groupe de lignes par lot
+        for lot in lire_par_lots(curseur, taille_lot):
+            ecrivain.write_table(pa.Table.from_pylist(
+                [dict(zip(schema.names, ligne)) for ligne in lot], schema=schema))
+            total += len(lot)
+    return total
+
+
+# Fonction principale d'export : renvoie (nombre de lignes, lignes par seconde)
+def exporter(source, format_sortie, chemin, bdd=None, taille_lot=TAILLE_LOT):
+    bdd = bdd or SOURCES[source]
+    debut = time.perf_counter()
+    connexion = sqlite3.connect(bdd, isolation_level=None)
+    try:
+        requete, colonnes = decrire_source(connexion, source)
+        # Transaction de lecture : comptage et lecture voient le même instantané
+        connexion.execute("BEGIN")
+        curseur = connexion.cursor()
+        if format_sortie == "csv":
+            total = exporter_csv(curseur.execute(requete), colonnes, chemin, taille_lot)
+        elif format_sortie == "parquet":
+            total = exporter_parquet(curseur.execute(requete), colonnes, chemin, taille_lot)
+        elif format_sortie in ("npz", "colonnes"):
+            nb_lignes = connexion.execute(f"SELECT COUNT(*) FROM ({requete})").fetchone()[0]
+            exporteur = exporter_npz if format_sortie == "npz" else exporter_colonnes
+            total = exporteur(connexion, curseur.execute(requete), requete, colonnes,
+                              chemin, nb_lignes, taille_lot)
+        else:
+            raise ValueError(f"Format inconnu : {format_sortie}")
+        connexion.execute("COMMIT")
+    finally:
+        connexion.close()
+    duree = time.perf_counter() - debut
+    return total, total / duree if duree > 0 else float("inf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export en flux de l'historique des simulations")
+    parser.add_argument("sortie", help="Fichier (csv, npz, parquet) ou dossier (colonnes) de sortie")
+    parser.add_argument("--source", choices=sorted(SOURCES), default="simulation")
+    parser.add_argument("--format", dest="format_sortie", default="csv",
+                        choices=["csv", "npz", "colonnes", "parquet"])
+    parser.add_argument("--bdd", help="Base SQLite (par défaut selon la source)")
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT)
+    args = parser.parse_args(argv)
+
+    try:
+        total, debit = exporter(args.source, args.format_sortie, args.sortie, args.bdd, args.taille_lot)
+    except (ValueError, RuntimeError, sqlite3.Error) as e:
+        parser.exit(1, f"Erreur : {e}\n")
+    print(f"{total} lignes exportées vers {args.sortie} ({debit:.0f} lignes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+import moteur
+from bdd import initialiser_bdd
+from instrumentation import chrono, compter
+from journal import journaliser
+
+# Paramètres par défaut de la file
+TAILLE_TRAVAIL = 1000     # lancers par travail
+BAIL = 60.0               # durée (s) d'un bail, prolongé tant que le travailleur calcule
+TENTATIVES_MAX = 3        # au-delà, le travail est marqué en échec
+ATTENTE = 0.5             # pause (s) d'un travailleur sans travail disponible
+DELAI_VERROU = 30.0       # attente maximale (s) du verrou d'écriture SQLite
+
+# File de travaux : un balayage (grille vitesses x angles x masses x rayons) est découpé en travaux
+# [debut, fin) de la grille aplatie ; chaque travail passe en_attente -> en_cours (bail) -> termine,
+# ou revient en_attente après une erreur ou un bail expiré, jusqu'à tentatives_max (echoue).
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS balayage (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nom TEXT,
+        parametres TEXT NOT NULL,
+        date_creation TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS travail (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        balayage_id INTEGER NOT NULL,
+        debut INTEGER NOT NULL,
+        fin INTEGER NOT NULL,
+        etat TEXT NOT NULL DEFAULT 'en_attente',
+        tentatives INTEGER NOT NULL DEFAULT 0,
+        tentatives_max INTEGER NOT NULL,
+        travailleur TEXT,
+        bail_expire REAL,
+        erreur TEXT,
+        date_debut TEXT,
+        date_fin TEXT,
+        FOREIGN KEY(balayage_id) REFERENCES balayage(id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS travail_etat ON travail (etat, id)",
+    """CREATE VIEW IF NOT EXISTS progression_balayage AS
+        SELECT b.id AS balayage_id, b.nom AS nom, count(t.id) AS travaux,
+               sum(t.etat = 'termine') AS termines, sum(t.etat = 'en_cours') AS en_cours,
+               sum(t.etat = 'en_attente') AS en_attente, sum(t.etat = 'echoue') AS echoues,
+               sum(max(t.tentatives - 1, 0)) AS reprises,
+               sum(CASE WHEN t.etat = 'termine' THEN t.fin - t.debut ELSE 0 END) AS lancers_termines,
+               sum(t.fin - t.debut) AS lancers
+        FROM balayage b JOIN travail t ON t.balayage_id = b.id
+        GROUP BY b.id""",
+]
+
+
+# Connexion en mode autocommit : les transactions sont ouvertes explicitement (BEGIN IMMEDIATE)
+def connecter(bdd):
+    connexion = sqlite3.connect(bdd, timeout=DELAI_VERROU, isolation_level=None)
+    for instruction in SCHEMA:
+        connexion.execute(instruction)
+    return connexion
+
+
+# Fonction pour exécuter fonction(connexion) dans une transaction qui prend d'emblée le verrou d'écriture
+def transaction(connexion, fonction):
+    connexion.execute("BEGIN IMMEDIATE")
+    try:
+        resultat = fonction(connexion)
+    except BaseException:
+        connexion.execute("ROLLBACK")
+        raise
+    connexion.execute("COMMIT")
+    return resultat
+
+
+# Fonction pour retrouver les lancers [debut, fin) de la grille aplatie (sans construire la grille)
+def lancers(parametres, debut, fin):
+    axes = [np.asarray(parametres[nom], dtype=float) for nom in ("vitesses", "angles", "masses", "rayons")]
+    indices = np.unravel_index(np.arange(debut, fin), [len(axe) for axe in axes])
+    return [axe[i] for axe, i in zip(axes, indices)]
+
+
+# Coordinateur : enregistre le balayage et le découpe en travaux
+def enfiler_balayage(bdd, vitesses, angles, masses, rayons, taille_travail=TAILLE_TRAVAIL, nom=None,
+                     tentatives_max=TENTATIVES_MAX, **options):
+    initialiser_bdd(bdd)
+    parametres = {"vitesses": [float(v) for v in np.atleast_1d(vitesses)],
+                  "angles": [float(a) for a in np.atleast_1d(angles)],
+                  "masses": [float(m) for m in np.atleast_1d(masses)],
+                  "rayons": [float(r) for r in np.atleast_1d(rayons)],
+                  "options": options}
+    total = int(np.prod([len(parametres[nom_axe]) for nom_axe in ("vitesses", "angles", "masses", "rayons")]))
+
+    def enfiler(connexion):
+        balayage_id = connexion.execute(
+            "INSERT INTO balayage (nom, parametres, date_creation) VALUES (?, ?, ?)",
+            (nom, json.dumps(parametres), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))).lastrowid
+        connexion.executemany(
+            "INSERT INTO travail (balayage_id, debut, fin, tentatives_max) VALUES (?, ?, ?, ?)",
+            [(balayage_id, debut, min(debut + taille_travail, total), tentatives_max)
+             for debut in range(0, total, taille_travail)])
+        return balayage_id
+
+    connexion = connecter(bdd)
+    try:
+        return transaction(connexion, enfiler)
+    finally:
+        connexion.close()
+
+
+# Fonction pour réserver le prochain travail : en attente, ou en cours avec un bail expiré
+# (travailleur arrêté ou injoignable). Renvoie (id, balayage_id, debut, fin) ou None.
+def reserver(connexion, travailleur, bail=BAIL):
+    def reserver_travail(connexion):
+        maintenant = time.time()
+        connexion.execute("UPDATE travail SET etat = 'echoue', erreur = 'bail expiré', travailleur = NULL "
+                          "WHERE etat = 'en_cours' AND bail_expire < ? AND tentatives >= tentatives_max",
+                          (maintenant,))
+        ligne = connexion.execute(
+            "SELECT id, balayage_id, debut, fin FROM travail WHERE etat = 'en_attente' "
+            "OR (etat = 'en_cours' AND bail_expire < ?) ORDER BY id LIMIT 1", (maintenant,)).fetchone()
+        if ligne is not None:
+            connexion.execute(
+                "UPDATE travail SET etat = 'en_cours', travailleur = ?, bail_expire = ?, "
+                "tentatives = tentatives + 1, date_debut = ? WHERE id = ?",
+                (travailleur, maintenant + bail, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), ligne[0]))
+        return ligne
+    return transaction(connexion, reserver_travail)
+
+
+# Fonction pour prolonger un bail ; False si le travail a été repris par un autre travailleur
+def prolonger(connexion, travail_id, travailleur, bail=BAIL):
+    curseur = connexion.execute("UPDATE travail SET bail_expire = ? WHERE id = ? AND travailleur = ? AND etat = 'en_cours'",
+                                (time.time() + bail, travail_id, travailleur))
+    return curseur.rowcount == 1
+
+
+# Fil de prolongation du bail pendant le calcul (connexion propre au fil)
+def entretenir_bail(bdd, travail_id, travailleur, bail, arret):
+    connexion = sqlite3.connect(bdd, timeout=DELAI_VERROU, isolation_level=None)
+    try:
+        while not arret.wait(bail / 3):
+            if not prolonger(connexion, travail_id, travailleur, bail):
+                return
+    finally:
+        connexion.close()
+
+
+# Fonction pour écrire les résultats et clore le travail dans la même transaction, à condition de
+# détenir encore le bail : un travail repris ailleurs n'est jamais enregistré deux fois
+def terminer(connexion, travail_id, travailleur, lignes):
+    def enregistrer(connexion):
+        curseur = connexion.execute(
+            "UPDATE travail SET etat = 'termine', bail_expire = NULL, erreur = NULL, date_fin = ? "
+            "WHERE id = ? AND travailleur = ? AND etat = 'en_cours'",
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), travail_id, travailleur))
+        if curseur.rowcount != 1:
+            return False
+        connexion.executemany("""
+            INSERT INTO simulation (
+                vitesse_initiale, angle_deg, masse, rayon, date_simulation, distance_max, hauteur_max
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, lignes)
+        return True
+    return transaction(connexion, enregistrer)
+
+
+# Fonction pour rendre un travail après une erreur : nouvelle tentative, ou échec définitif
+def echouer(connexion, travail_id, travailleur, erreur):
+    connexion.execute(
+        "UPDATE travail SET etat = CASE WHEN tentatives >= tentatives_max THEN 'echoue' ELSE 'en_attente' END, "
+        "erreur = ?, travailleur = NULL, bail_expire = NULL WHERE id = ? AND travailleur = ?",
+        (erreur, travail_id, travailleur))
+
+
+# Travailleur : réserve, calcule (moteur.simuler_lot) et enregistre jusqu'à ce qu'il ne reste plus rien
+# à faire (ou indéfiniment si attendre). Les travaux en cours ailleurs sont attendus : leur bail peut expirer.
+def travailler(bdd, nom=None, bail=BAIL, attendre=False, travaux_max=None):
+    nom = nom or f"{socket.gethostname()}:{os.getpid()}"
+    initialiser_bdd(bdd)
+    connexion = connecter(bdd)
+    parametres_balayage = {}
+    nb_travaux = 0
+    try:
+        while travaux_max is None or nb_travaux < travaux_max:
+            travail = reserver(connexion, nom, bail)
+            if travail is None:
+                restants = connexion.execute(
+                    "SELECT count(*) FROM travail WHERE etat IN ('en_attente', 'en_cours')").fetchone()[0]
+                if restants == 0 and not attendre:
+                    break
+                time.sleep(ATTENTE)
+                continue
+
+            travail_id, balayage_id, debut, fin = travail
+            if balayage_id not in parametres_balayage:
+                parametres_balayage[balayage_id] = json.loads(connexion.execute(
+                    "SELECT parametres FROM balayage WHERE id = ?", (balayage_id,)).fetchone()[0])
+            parametres = parametres_balayage[balayage_id]
+            arret = threading.Event()
+            battement = threading.Thread(target=entretenir_bail, args=(bdd, travail_id, nom, bail, arret), daemon=True)
+            battement.start()
+            try:
+                colonnes = lancers(parametres, debut, fin)
+                with chrono("travail.simulation"):
+                    distances, hauteurs = moteur.simuler_lot(*colonnes, **parametres["options"])
+                date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                lignes = [(v, a, m, r, date, d, h) for v, a, m, r, d, h
+                          in zip(*(c.tolist() for c in colonnes), distances.tolist(), hauteurs.tolist())]
+                with chrono("travail.enregistrement"):
+                    enregistre = terminer(connexion, travail_id, nom, lignes)
+                if enregistre:
+                    compter("travail.lancers", len(lignes))
+                journaliser("travail.termine" if enregistre else "travail.bail_perdu", travail_id=travail_id,
+                            travailleur=nom, lancers=len(lignes))
+            except Exception as e:
+                echouer(connexion, travail_id, nom, repr(e))
+                journaliser("travail.erreur", travail_id=travail_id, travailleur=nom, erreur=repr(e))
+            finally:
+                arret.set()
+                battement.join()
+            nb_travaux += 1
+    finally:
+        connexion.close()
+    return nb_travaux
+
+
+# Vue d'avancement : une ligne par balayage
+def progression(bdd):
+    connexion = connecter(bdd)
+    try:
+        curseur = connexion.execute("SELECT * FROM progression_balayage ORDER BY balayage_id")
+        colonnes = [description[0] for description in curseur.description]
+        return [dict(zip(colonnes, ligne)) for ligne in curseur.fetchall()]
+    finally:
+        connexion.close()
+
+
+def afficher_progression(bdd):
+    for p in progression(bdd):
+        print(f"Balayage {p['balayage_id']} {p['nom'] or ''} : {p['lancers_termines']}/{p['lancers']} lancers "
+              f"({100 * p['lancers_termines'] / max(p['lancers'], 1):.1f} %) | travaux : {p['termines']} terminés, "
+              f"{p['en_cours']} en cours, {p['en_attente']} en attente, {p['echoues']} en échec, "
+              f"{p['reprises']} reprises")
+
+
+# Fonction pour lire une liste de valeurs : "debut:fin:pas" (fin incluse), "a,b,c" ou une valeur
+def lire_valeurs(texte):
+    if ":" in texte:
+        debut, fin, pas = (float(v) for v in texte.split(":"))
+        return np.arange(debut, fin + pas / 2, pas)
+    return np.array([float(v) for v in texte.split(",")])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="File de travaux SQLite pour les balayages")
+    parser.add_argument("--bdd", default="simulations.db")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    p_enfiler = sous.add_parser("enfiler", help="Découper un balayage en travaux")
+    for nom in ("vitesses", "angles", "masses", "rayons"):
+        p_enfiler.add_argument(f"--{nom}", required=True, help="debut:fin:pas, a,b,c ou valeur")
+    p_enfiler.add_argument("--taille", type=int, default=TAILLE_TRAVAIL, help="Lancers par travail")
+    p_enfiler.add_argument("--nom")
+    p_enfiler.add_argument("--tentatives", type=int, default=TENTATIVES_MAX)
+    p_enfiler.add_argument("--methode", default="rk4", choices=sorted(moteur.INTEGRATEURS) + ["auto"])
+    p_travailler = sous.add_parser("travailler", help="Traiter des travaux")
+    p_local = sous.add_parser("local", help="Lancer des travailleurs locaux et suivre l'avancement")
+    for p in (p_travailler, p_local):
+        p.add_argument("--bail", type=float, default=BAIL)
+    p_travailler.add_argument("--nom")
+    p_travailler.add_argument("--attendre", action="store_true", help="Attendre de nouveaux travaux")
+    p_local.add_argument("--travailleurs", type=int, default=os.cpu_count())
+    sous.add_parser("progression", help="Afficher l'avancement des balayages")
+    args = parser.parse_args(argv)
+
+    if args.commande == "enfiler":
+        balayage_id = enfiler_balayage(args.bdd, *(lire_valeurs(getattr(args, nom)) for nom in
+                                                   ("vitesses", "angles", "masses", "rayons")),
+                                       taille_travail=args.taille, nom=args.nom, tentatives_max=args.tentatives,
+                                       méthode=args.methode)
+        print(f"Balayage {balayage_id} enfilé")
+        afficher_progression(args.bdd)
+    elif args.commande == "travailler":
+        print(f"{travailler(args.bdd, args.nom, args.bail, args.attendre)} travaux traités")
+    elif args.commande == "local":
+        debut = time.perf_counter()
+        # Sans --nom : chaque travailleur prend le nom par défaut hôte:pid, unique entre machines
+        processus = [subprocess.Popen([sys.executable, __file__, "--bdd", args.bdd, "travailler",
+                                       "--bail", str(args.bail)], stdout=subprocess.DEVNULL)
+                     for _ in range(args.travailleurs)]
+        try:
+            while any(p.poll() is None for p in processus):
+                time.sleep(1)
+                afficher_progression(args.bdd)
+        finally:
+            for p in processus:
+                if p.poll() is None:
+                    p.terminate()
+                p.wait()
+        print(f"{args.travailleurs} travailleurs, {time.perf_counter() - debut:.1f} s")
+        afficher_progression(args.bdd)
+    else:
+        afficher_progression(args.bdd)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,12 @@
-import numpy as np
-import matplotlib.pyplot as plt
 import sqlite3
 from datetime import datetime
+import bdd
+import moteur
+from instrumentation import chrono
 
-# Fonction pour initialiser la base de données
+# Fonction pour initialiser la base de données (schéma partagé, voir bdd.py)
 def initialiser_bdd():
-    connexion = sqlite3.connect("simulations.db")
-    curseur = connexion.cursor()
-
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS utilisateur (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nom TEXT NOT NULL,
-            email TEXT UNIQUE
-        )
-    """)
-
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS projectile (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nom TEXT NOT NULL,
-            masse REAL,
-            rayon REAL
-        )
-    """)
-
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS conditions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            gravite REAL,
-            masse_volumique_air REAL,
-            coefficient_trainee REAL
-        )
-    """)
-
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS session (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            utilisateur_id INTEGER,
-            date_session TEXT,
-            FOREIGN KEY(utilisateur_id) REFERENCES utilisateur(id)
-        )
-    """)
-
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS simulation (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            vitesse_initiale REAL,
-            angle_deg REAL,
-            masse REAL,
-            rayon REAL,
-            date_simulation TEXT,
-            distance_max REAL,
-            hauteur_max REAL,
-            session_id INTEGER,
-            FOREIGN KEY(session_id) REFERENCES session(id)
-        )
-    """)
-    connexion.commit()
-    connexion.close()
+    bdd.initialiser_bdd("simulations.db")
 
 def ajouter_utilisateur(nom, email):
     connexion = sqlite3.connect("simulations.db")
@@ -91,24 +39,6 @@ def creer_session(utilisateur_id):
     connexion.close()
     return session_id
 
-# Fonction RK4
-def pas_rk4(fonction, t, état, pas_temps):
-    k1 = fonction(t, état)
-    k2 = fonction(t + pas_temps/2, état + pas_temps/2 * k1)
-    k3 = fonction(t + pas_temps/2, état + pas_temps/2 * k2)
-    k4 = fonction(t + pas_temps, état + pas_temps * k3)
-    return état + pas_temps/6 * (k1 + 2*k2 + 2*k3 + k4)
-
-# Modèle physique du projectile
-def modèle_projectile(t, état):
-    x, y, vx, vy = état
-    vitesse = np.sqrt(vx**2 + vy**2)
-    dxdt = vx
-    dydt = vy
-    dvxdt = -(coeff_resistance/masse) * vx * vitesse
-    dvydt = -gravité - (coeff_resistance/masse) * vy * vitesse
-    return np.array([dxdt, dydt, dvxdt, dvydt])
-
 # Saisie utilisateur
 def saisie_utilisateur():
     print("\n=== Nouvelle Simulation ===")
@@ -120,16 +50,7 @@ def saisie_utilisateur():
 
 # Enregistrement dans la BDD
 def enregistrer_simulation(vitesse, angle, masse, rayon, distance_max, hauteur_max, session_id):
-    connexion = sqlite3.connect("simulations.db")
-    curseur = connexion.cursor()
-    date_actuelle = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    curseur.execute("""
-        INSERT INTO simulation (
-            vitesse_initiale, angle_deg, masse, rayon, date_simulation, distance_max, hauteur_max, session_id
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (vitesse, angle, masse, rayon, date_actuelle, distance_max, hauteur_max, session_id))
-    connexion.commit()
-    connexion.close()
+    bdd.enregistrer_simulation(vitesse, angle, masse, rayon, distance_max, hauteur_max, session_id, bdd="simulations.db")
 
 # Affichage des simulations passées
 def afficher_historique():
@@ -141,81 +62,83 @@ def afficher_historique():
         print(f"ID: {ligne[0]} | Vitesse: {ligne[1]} m/s | Angle: {ligne[2]}° | Masse: {ligne[3]} kg | Distance max: {ligne[6]:.2f} m")
     connexion.close()
 
-# Paramètres fixes
-gravité = 9.81
-masse_volumique_air = 1.225
-coefficient_traînée = 0.47
-
-# Initialisation de la BDD
-initialiser_bdd()
-
-# Menu principal
-while True:
-    print("\n=== Menu Principal ===")
-    print("1. Lancer une nouvelle simulation")
-    print("2. Afficher l'historique")
-    print("3. Quitter")
-    choix = input("Choix : ")
-
-    if choix == "1":
-        connexion = sqlite3.connect("simulations.db")
-        curseur = connexion.cursor()
-        curseur.execute("SELECT id, nom FROM utilisateur")
-        utilisateurs = curseur.fetchall()
-        connexion.close()
-
-        print("\n=== Sélectionnez un utilisateur ===")
-        for user in utilisateurs:
-            print(f"{user[0]}. {user[1]}")
-        utilisateur_id = int(input("Entrez l'ID utilisateur : "))
-        session_id = creer_session(utilisateur_id)
-
-        vitesse_initiale, angle_deg, masse, rayon = saisie_utilisateur()
-
-        angle_rad = np.radians(angle_deg)
-        section_transversale = np.pi * rayon**2
-        coeff_resistance = 0.5 * masse_volumique_air * coefficient_traînée * section_transversale
-        vx0 = vitesse_initiale * np.cos(angle_rad)
-        vy0 = vitesse_initiale * np.sin(angle_rad)
-        état_initial = np.array([0, 0, vx0, vy0])
-
-        pas_temps = 0.01
-        temps_max = 10
-        steps = int(temps_max / pas_temps)
-        temps = np.linspace(0, temps_max, steps)
-        états = np.zeros((steps, 4))
-        états[0] = état_initial
-
-        for i in range(1, steps):
-            états[i] = pas_rk4(modèle_projectile, temps[i-1], états[i-1], pas_temps)
-            if états[i, 1] < 0:
-                états[i, 1] = 0
-                break
-
-        x = états[:i+1, 0]
-        y = états[:i+1, 1]
-        distance_max = max(x)
-        hauteur_max = max(y)
-
-        enregistrer_simulation(vitesse_initiale, angle_deg, masse, rayon, distance_max, hauteur_max, session_id)
-        print(f"\nRésultats : Distance max = {distance_max:.2f} m | Hauteur max = {hauteur_max:.2f} m")
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(x, y, label=f"Vitesse = {vitesse_initiale} m/s, Angle = {angle_deg}°")
-        plt.title("Trajectoire d'un projectile")
-        plt.xlabel("Distance (m)")
-        plt.ylabel("Hauteur (m)")
-        plt.grid(True)
-        plt.legend()
-        plt.axhline(0, color='black', linewidth=0.5)
-        plt.show()
-
-    elif choix == "2":
-        afficher_historique()
-
-    elif choix == "3":
-        print("Au revoir !")
-        break
-
-    else:
-        print("Choix invalide.")
+# Mode direct : fenêtre à curseurs, la session n'est créée qu'au premier enregistrement
+def lancer_mode_direct():
+    from mode_direct import ModeDirect
+
+    utilisateur_id = int(input("Entrez l'ID utilisateur : "))
+    session = {}
+
+    def enregistrer(vitesse, angle, masse, rayon, distance_max, hauteur_max):
+        if "id" not in session:
+            session["id"] = creer_session(utilisateur_id)
+        enregistrer_simulation(vitesse, angle, masse, rayon, distance_max, hauteur_max, session["id"])
+        print(f"Enregistré : Distance max = {distance_max:.2f} m | Hauteur max = {hauteur_max:.2f} m")
+    fenetre = ModeDirect(None, enregistrer).fenetre
+    fenetre.mainloop()
+
+# Point d'entrée : menu en console (matplotlib n'est importé qu'ici)
+def main():
+    import matplotlib.pyplot as plt
+
+    # Initialisation de la BDD
+    initialiser_bdd()
+
+    # Menu principal
+    while True:
+        print("\n=== Menu Principal ===")
+        print("1. Lancer une nouvelle simulation")
+        print("2. Afficher l'historique")
+        print("3. Quitter")
+        print("4. Mode direct (curseurs)")
+        choix = input("Choix : ")
+
+        if choix == "1":
+            connexion = sqlite3.connect("simulations.db")
+            curseur = connexion.cursor()
+            curseur.execute("SELECT id, nom FROM utilisateur")
+            utilisateurs = curseur.fetchall()
+            connexion.close()
+
+            print("\n=== Sélectionnez un utilisateur ===")
+            for user in utilisateurs:
+                print(f"{user[0]}. {user[1]}")
+            utilisateur_id = int(input("Entrez l'ID utilisateur : "))
+            session_id = creer_session(utilisateur_id)
+
+            vitesse_initiale, angle_deg, masse, rayon = saisie_utilisateur()
+
+            # Simulation (moteur.py : RK4, pas de 0.01 s, arrêt au sol)
+            distance_max, hauteur_max, x, y = moteur.simuler(vitesse_initiale, angle_deg, masse, rayon)
+
+            with chrono("bdd.enregistrement"):
+                enregistrer_simulation(vitesse_initiale, angle_deg, masse, rayon, distance_max, hauteur_max, session_id)
+            print(f"\nRésultats : Distance max = {distance_max:.2f} m | Hauteur max = {hauteur_max:.2f} m")
+
+            with chrono("trace"):
+                plt.figure(figsize=(10, 6))
+                plt.plot(x, y, label=f"Vitesse = {vitesse_initiale} m/s, Angle = {angle_deg}°")
+                plt.title("Trajectoire d'un projectile")
+                plt.xlabel("Distance (m)")
+                plt.ylabel("Hauteur (m)")
+                plt.grid(True)
+                plt.legend()
+                plt.axhline(0, color='black', linewidth=0.5)
+            plt.show()
+
+        elif choix == "2":
+            afficher_historique()
+
+        elif choix == "3":
+            print("Au revoir !")
+            break
+
+        elif choix == "4":
+            lancer_mode_direct()
+
+        else:
+            print("Choix invalide.")
+
+
+if __name__ == "__main__":
+    main()
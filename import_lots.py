@@ -0,0 +1,128 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import time
+
+# Nombre de lignes envoyées par appel à executemany
+TAILLE_LOT = 10000
+
+
+# Fonction pour lire le schéma d'une table : [(colonne, type, non_nul)] hors clé primaire
+def colonnes_table(connexion, table):
+    tables = {ligne[0] for ligne in connexion.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if table not in tables:
+        raise ValueError(f"Table inconnue : {table}")
+    return [(ligne[1], (ligne[2] or "").upper(), bool(ligne[3]))
+            for ligne in connexion.execute(f"PRAGMA table_info({table})") if not ligne[5]]
+
+
+# Fonction pour convertir une valeur lue dans le fichier vers le type de la colonne
+def convertir(valeur, type_sql):
+    if valeur is None or valeur == "":
+        return None
+    if type_sql.startswith("INT"):
+        if isinstance(valeur, float) or (isinstance(valeur, str) and "." in valeur):
+            nombre = float(valeur)
+            if not nombre.is_integer():
+                raise ValueError(f"entier attendu, reçu {valeur!r}")
+            return int(nombre)
+        return int(valeur)
+    if type_sql in ("REAL", "FLOAT", "DOUBLE", "NUMERIC"):
+        if isinstance(valeur, bool):
+            raise ValueError(f"nombre attendu, reçu {valeur!r}")
+        return float(valeur)
+    return str(valeur)
+
+
+# Fonction pour lire les enregistrements d'un fichier CSV ou JSONL (une ligne = un objet)
+def lire_enregistrements(chemin):
+    extension = os.path.splitext(chemin)[1].lower()
+    with open(chemin, newline="", encoding="utf-8") as fichier:
+        if extension == ".csv":
+            for numero, enregistrement in enumerate(csv.DictReader(fichier), start=2):
+                yield numero, enregistrement
+        elif extension in (".jsonl", ".json"):
+            for numero, ligne in enumerate(fichier, start=1):
+                if ligne.strip():
+                    enregistrement = json.loads(ligne)
+                    if not isinstance(enregistrement, dict):
+                        raise ValueError(f"Ligne {numero} : objet JSON attendu")
+                    yield numero, enregistrement
+        else:
+            raise ValueError(f"Format de fichier non pris en charge : {extension}")
+
+
+# Fonction pour valider et convertir les enregistrements en tuples prêts pour executemany
+def valider(enregistrements, colonnes):
+    noms = {nom for nom, _, _ in colonnes}
+    for numero, enregistrement in enregistrements:
+        inconnues = set(enregistrement) - noms - {"id"}
+        if inconnues:
+            raise ValueError(f"Ligne {numero} : colonnes inconnues {sorted(inconnues)}")
+        ligne = []
+        for nom, type_sql, non_nul in colonnes:
+            try:
+                valeur = convertir(enregistrement.get(nom), type_sql)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Ligne {numero}, colonne {nom} : {e}")
+            if valeur is None and non_nul:
+                raise ValueError(f"Ligne {numero} : la colonne {nom} est obligatoire")
+            ligne.append(valeur)
+        yield tuple(ligne)
+
+
+# Fonction pour découper un flux de lignes en lots bornés
+def par_lots(lignes, taille_lot):
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) >= taille_lot:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+# Fonction principale d'import : tout ou rien, dans une seule transaction
+def importer_fichier(chemin, table, bdd="simulations.db", taille_lot=TAILLE_LOT):
+    connexion = sqlite3.connect(bdd, isolation_level=None)
+    try:
+        colonnes = colonnes_table(connexion, table)
+        requete = (f"INSERT INTO {table} ({', '.join(nom for nom, _, _ in colonnes)}) "
+                   f"VALUES ({', '.join('?' * len(colonnes))})")
+        total = 0
+        connexion.execute("BEGIN IMMEDIATE")
+        try:
+            for lot in par_lots(valider(lire_enregistrements(chemin), colonnes), taille_lot):
+                connexion.executemany(requete, lot)
+                total += len(lot)
+            connexion.execute("COMMIT")
+        except BaseException:
+            connexion.execute("ROLLBACK")
+            raise
+    finally:
+        connexion.close()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import en masse de fichiers CSV/JSONL dans une table")
+    parser.add_argument("fichier", help="Fichier .csv (avec en-tête) ou .jsonl (un objet par ligne)")
+    parser.add_argument("table", help="Table cible (projectile, utilisateur, conditions, Condition...)")
+    parser.add_argument("--bdd", default="simulations.db")
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT)
+    args = parser.parse_args(argv)
+
+    debut = time.perf_counter()
+    try:
+        total = importer_fichier(args.fichier, args.table, args.bdd, args.taille_lot)
+    except (ValueError, OSError, sqlite3.Error) as e:
+        parser.exit(1, f"Erreur : {e}\n")
+    duree = time.perf_counter() - debut
+    print(f"{total} lignes importées dans {args.table} en {duree:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import argparse
+import sqlite3
+
+import numpy as np
+
+import moteur
+from agregats import existe
+from instrumentation import compter
+from terrain import Terrain
+
+# Nombre de points de trajectoire couverts par une boîte de segment
+TAILLE_SEGMENT = 32
+# Simulations indexées par transaction lors du rattrapage
+TAILLE_LOT = 1000
+# Version du calcul des trajectoires indexées : un index plus ancien est vidé puis reconstruit
+# (2 : impact interpolé en y = 0, aucun impact pour un lancer encore en vol à temps_max)
+VERSION_INDEX = 2
+# Sol plat : les trajectoires s'arrêtent au point où elles coupent y = 0 (interpolé dans le pas)
+SOL = Terrain(np.zeros(2))
+
+# Retrait d'une simulation de l'index : ses segments sont retrouvés dans la boîte de sa trajectoire
+RETRAIT = """
+        DELETE FROM segment_boite WHERE id IN (
+            SELECT s.id FROM trajectoire_boite t, segment_boite s
+            WHERE t.id = OLD.id AND s.x_min >= t.x_min AND s.x_max <= t.x_max
+              AND s.y_min >= t.y_min AND s.y_max <= t.y_max AND s.simulation_id = OLD.id);
+        DELETE FROM trajectoire_boite WHERE id = OLD.id;
+        DELETE FROM impact_boite WHERE id = OLD.id;
+        DELETE FROM trajectoire WHERE simulation_id = OLD.id;
+"""
+
+# Colonnes de simulation dont dépend la trajectoire (condition_id seulement après migration)
+COLONNES_TRAJECTOIRE = ["vitesse_initiale", "angle_deg", "masse", "rayon"]
+
+# Index spatial des trajectoires, clé simulation.id :
+# - trajectoire : points (x, y) en float32, lus seulement pour les lancers candidats ;
+# - trajectoire_boite : boîte englobante de chaque trajectoire (R-tree) ;
+# - segment_boite : boîtes de TAILLE_SEGMENT points consécutifs (R-tree, simulation_id et premier point
+#   en colonnes auxiliaires) ;
+# - impact_boite : abscisse du point d'impact (R-tree à une dimension, valeur exacte en colonne auxiliaire),
+#   pour les seuls lancers retombés (y = 0) avant temps_max.
+# Une simulation supprimée, ou dont les paramètres du lancer changent, sort de l'index ;
+# mettre_a_jour_index la recalcule ensuite.
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS trajectoire (simulation_id INTEGER PRIMARY KEY, points BLOB NOT NULL)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS trajectoire_boite USING rtree(id, x_min, x_max, y_min, y_max)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS segment_boite USING rtree(id, x_min, x_max, y_min, y_max, "
+    "+simulation_id INTEGER, +debut INTEGER)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS impact_boite USING rtree(id, x_min, x_max, +x REAL)",
+    f"CREATE TRIGGER IF NOT EXISTS index_spatial_suppression AFTER DELETE ON simulation BEGIN {RETRAIT} END",
+    "CREATE TABLE IF NOT EXISTS index_spatial_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+]
+
+
+def installer_index(connexion):
+    for instruction in SCHEMA:
+        connexion.execute(instruction)
+    ligne = connexion.execute("SELECT version FROM index_spatial_version WHERE id = 1").fetchone()
+    if ligne is None or ligne[0] < VERSION_INDEX:
+        for table in ("trajectoire", "trajectoire_boite", "segment_boite", "impact_boite"):
+            connexion.execute(f"DELETE FROM {table}")
+        connexion.execute("INSERT OR REPLACE INTO index_spatial_version (id, version) VALUES (1, ?)", (VERSION_INDEX,))
+    colonnes = COLONNES_TRAJECTOIRE + (["condition_id"] if existe(connexion, "simulation", "condition_id") else [])
+    connexion.execute(f"CREATE TRIGGER IF NOT EXISTS index_spatial_modification "
+                      f"AFTER UPDATE OF {', '.join(colonnes)} ON simulation BEGIN {RETRAIT} END")
+
+
+# Fonction pour calculer les boîtes des segments d'une trajectoire : le segment k couvre les points
+# k·taille à (k+1)·taille inclus (le dernier point est partagé avec le segment suivant)
+def boites_segments(x, y, taille=TAILLE_SEGMENT):
+    debuts = np.arange(0, max(len(x) - 1, 1), taille)
+    suivants = np.minimum(debuts + taille, len(x) - 1)
+    boites = []
+    for valeurs in (x, y):
+        boites.append(np.minimum(np.minimum.reduceat(valeurs, debuts), valeurs[suivants]))
+        boites.append(np.maximum(np.maximum.reduceat(valeurs, debuts), valeurs[suivants]))
+    return debuts, boites
+
+
+# Fonction pour indexer des trajectoires (listes de tableaux x, y) avec les identifiants de leurs simulations ;
+# le dernier point n'est un impact que s'il est au sol (y = 0) : un lancer encore en vol n'en a pas
+def indexer(connexion, ids, trajectoires):
+    lignes, boites, segments, impacts = [], [], [], []
+    for simulation_id, (x, y) in zip(ids, trajectoires):
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        lignes.append((simulation_id, np.stack([x, y], axis=1).astype(np.float32).tobytes()))
+        boites.append((simulation_id, x.min(), x.max(), y.min(), y.max()))
+        debuts, (x_min, x_max, y_min, y_max) = boites_segments(x, y)
+        segments.extend(zip(x_min.tolist(), x_max.tolist(), y_min.tolist(), y_max.tolist(),
+                            [simulation_id] * len(debuts), debuts.tolist()))
+        if len(y) > 1 and y[-1] == 0:
+            impacts.append((simulation_id, x[-1], x[-1], x[-1]))
+    connexion.executemany("INSERT OR REPLACE INTO trajectoire (simulation_id, points) VALUES (?, ?)", lignes)
+    connexion.executemany("INSERT OR REPLACE INTO trajectoire_boite VALUES (?, ?, ?, ?, ?)", boites)
+    connexion.executemany("INSERT INTO segment_boite (x_min, x_max, y_min, y_max, simulation_id, debut) "
+                          "VALUES (?, ?, ?, ?, ?, ?)", segments)
+    connexion.executemany("INSERT OR REPLACE INTO impact_boite VALUES (?, ?, ?, ?)", impacts)
+
+
+# Fonction pour indexer les simulations qui ne le sont pas encore (écrites par n'importe quel script) :
+# les trajectoires sont recalculées par lots avec moteur.simuler_lot (RK4, arrêt au point interpolé où elles
+# coupent y = 0, voir SOL), avec la gravité, la masse volumique et la traînée de la condition de la ligne
+# (condition_id) si elle en a une, sinon les valeurs par défaut de moteur. Les scripts qui n'enregistrent pas leur condition, ou qui
+# intègrent autrement, peuvent donc avoir une distance_max légèrement différente du tracé indexé ; une
+# condition modifiée après coup n'est pas réindexée.
+def mettre_a_jour_index(bdd="simulations.db", taille_lot=TAILLE_LOT):
+    connexion = sqlite3.connect(bdd)
+    try:
+        installer_index(connexion)
+        connexion.commit()
+        if existe(connexion, "simulation", "condition_id") and existe(connexion, "conditions", "gravite"):
+            conditions = ("LEFT JOIN conditions c ON c.id = s.condition_id",
+                          "c.gravite, c.masse_volumique_air, c.coefficient_trainee")
+        else:
+            conditions = ("", "NULL, NULL, NULL")
+        dernier_id, nb = 0, 0
+        while True:
+            lignes = connexion.execute(f"""
+                SELECT s.id, s.vitesse_initiale, s.angle_deg, s.masse, s.rayon, {conditions[1]}
+                FROM simulation s {conditions[0]}
+                WHERE s.id > ? AND s.masse > 0 AND s.rayon >= 0
+                  AND s.vitesse_initiale IS NOT NULL AND s.angle_deg IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM trajectoire t WHERE t.simulation_id = s.id)
+                ORDER BY s.id LIMIT ?
+            """, (dernier_id, taille_lot)).fetchall()
+            if not lignes:
+                break
+            ids, *colonnes = (np.array(colonne, dtype=float) for colonne in zip(*lignes))
+            gravité, masse_volumique_air, coefficient_trainee = (
+                np.where(np.isnan(valeurs), defaut, valeurs) for valeurs, defaut in
+                zip(colonnes[4:], (moteur.GRAVITE, moteur.MASSE_VOLUMIQUE_AIR, moteur.COEFFICIENT_TRAINEE)))
+            _, _, xs, ys = moteur.simuler_lot(*colonnes[:4], trajectoires=True, gravité=gravité,
+                                              masse_volumique_air=masse_volumique_air,
+                                              coefficient_trainee=coefficient_trainee, terrain=SOL)
+            trajectoires = []
+            for j in range(len(lignes)):
+                points = ~np.isnan(xs[:, j])
+                trajectoires.append((xs[points, j], ys[points, j]))
+            with connexion:
+                indexer(connexion, ids.astype(int).tolist(), trajectoires)
+            dernier_id = int(ids[-1])
+            nb += len(lignes)
+        return nb
+    finally:
+        connexion.close()
+
+
+# Fonction vectorisée (Liang-Barsky) : le segment (x0, y0)-(x1, y1) coupe-t-il le rectangle ?
+def segments_dans_rectangle(x0, y0, x1, y1, x_min, x_max, y_min, y_max):
+    debut, fin = np.zeros(len(x0)), np.ones(len(x0))
+    dehors = np.zeros(len(x0), dtype=bool)
+    for p, q in ((x0 - x1, x0 - x_min), (x1 - x0, x_max - x0), (y0 - y1, y0 - y_min), (y1 - y0, y_max - y0)):
+        parallele = p == 0
+        rapport = q / np.where(parallele, 1.0, p)
+        debut = np.where(~parallele & (p < 0), np.maximum(debut, rapport), debut)
+        fin = np.where(~parallele & (p > 0), np.minimum(fin, rapport), fin)
+        dehors |= parallele & (q < 0)
+    return ~dehors & (debut <= fin)
+
+
+# Lancers dont la trajectoire passe par la fenêtre [x_min, x_max] x [y_min, y_max] :
+# le R-tree des segments donne les candidats, seuls leurs points sont lus et testés exactement
+def fenetre(bdd, x_min, x_max, y_min, y_max, rafraichir=True):
+    if rafraichir:
+        mettre_a_jour_index(bdd)
+    connexion = sqlite3.connect(bdd)
+    try:
+        candidats = {}
+        for simulation_id, debut in connexion.execute(
+                "SELECT simulation_id, debut FROM segment_boite "
+                "WHERE x_max >= ? AND x_min <= ? AND y_max >= ? AND y_min <= ?", (x_min, x_max, y_min, y_max)):
+            candidats.setdefault(simulation_id, []).append(debut)
+        compter("index.segments_candidats", sum(len(debuts) for debuts in candidats.values()))
+        compter("index.trajectoires_lues", len(candidats))
+        resultats = []
+        ids = list(candidats)
+        for i in range(0, len(ids), 500):
+            morceau = ids[i:i + 500]
+            for simulation_id, points in connexion.execute(
+                    f"SELECT simulation_id, points FROM trajectoire WHERE simulation_id IN ({','.join('?' * len(morceau))})",
+                    morceau):
+                points = np.frombuffer(points, dtype=np.float32).reshape(-1, 2).astype(float)
+                rangs = np.concatenate([np.arange(debut, min(debut + TAILLE_SEGMENT, len(points) - 1))
+                                        for debut in candidats[simulation_id]])
+                if segments_dans_rectangle(points[rangs, 0], points[rangs, 1], points[rangs + 1, 0],
+                                           points[rangs + 1, 1], x_min, x_max, y_min, y_max).any():
+                    resultats.append(simulation_id)
+        return sorted(resultats)
+    finally:
+        connexion.close()
+
+
+# Lancers dont le point d'impact est dans [x_min, x_max] (aucune trajectoire lue)
+def atterrissages(bdd, x_min, x_max, rafraichir=True):
+    if rafraichir:
+        mettre_a_jour_index(bdd)
+    connexion = sqlite3.connect(bdd)
+    try:
+        return [ligne[0] for ligne in connexion.execute(
+            "SELECT id FROM impact_boite WHERE x_max >= ? AND x_min <= ? AND x BETWEEN ? AND ? ORDER BY id",
+            (x_min, x_max, x_min, x_max))]
+    finally:
+        connexion.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index spatial (R-tree) des trajectoires")
+    parser.add_argument("--bdd", default="simulations.db")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    sous.add_parser("construire", help="Indexer les simulations qui ne le sont pas encore")
+    p_fenetre = sous.add_parser("fenetre", help="Lancers passés par une fenêtre")
+    for nom in ("x_min", "x_max", "y_min", "y_max"):
+        p_fenetre.add_argument(nom, type=float)
+    p_zone = sous.add_parser("atterrissage", help="Lancers tombés dans une zone")
+    for nom in ("x_min", "x_max"):
+        p_zone.add_argument(nom, type=float)
+    args = parser.parse_args(argv)
+
+    if args.commande == "construire":
+        print(f"{mettre_a_jour_index(args.bdd)} simulations indexées")
+    elif args.commande == "fenetre":
+        print(fenetre(args.bdd, args.x_min, args.x_max, args.y_min, args.y_max))
+    else:
+        print(atterrissages(args.bdd, args.x_min, args.x_max))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from agregats import existe
+from instrumentation import chrono, compter
+from journal import journaliser
+
+PERIODE = 60.0   # s entre deux rafraîchissements programmés
+
+# Rapports coûteux, exécutés sur l'instantané : nom -> ((table, colonne) requises, requête)
+RAPPORTS = {
+    "par_angle": ([("simulation", "angle_deg")], """
+        WITH classes AS (
+            SELECT CAST(angle_deg / 5 AS INTEGER) * 5 AS angle, distance_max,
+                   ROW_NUMBER() OVER (PARTITION BY CAST(angle_deg / 5 AS INTEGER) ORDER BY distance_max) AS rang,
+                   COUNT(*) OVER (PARTITION BY CAST(angle_deg / 5 AS INTEGER)) AS nb
+            FROM simulation WHERE angle_deg IS NOT NULL AND distance_max IS NOT NULL
+        )
+        SELECT angle, nb, AVG(distance_max) AS moyenne_distance,
+               MAX(CASE WHEN rang = (nb + 1) / 2 THEN distance_max END) AS mediane_distance,
+               MAX(distance_max) AS max_distance
+        FROM classes GROUP BY angle ORDER BY angle"""),
+    "par_jour": ([("simulation", "date_simulation")], """
+        SELECT substr(date_simulation, 1, 10) AS jour, COUNT(*) AS nb, AVG(distance_max) AS moyenne_distance,
+               MAX(distance_max) AS max_distance, AVG(hauteur_max) AS moyenne_hauteur
+        FROM simulation GROUP BY jour ORDER BY jour"""),
+    "par_projectile": ([("Resultat", "simulation_id"), ("Projectile", "nom")], """
+        SELECT p.nom, p.masse, p.coefficient_frottement, COUNT(*) AS nb,
+               AVG(r.distance_max) AS moyenne_distance, MAX(r.distance_max) AS max_distance,
+               AVG(r.vitesse_max) AS moyenne_vitesse
+        FROM Resultat r JOIN Simulation s ON s.id = r.simulation_id JOIN Projectile p ON p.id = s.projectile_id
+        GROUP BY p.id ORDER BY nb DESC"""),
+    # Même détail dans le schéma unifié de simulations.db (projectile_simulation.db migrée)
+    "par_projectile_unifie": ([("simulation", "projectile_id"), ("projectile", "coefficient_frottement")], """
+        SELECT p.nom, p.masse, p.coefficient_frottement, COUNT(*) AS nb,
+               AVG(s.distance_max) AS moyenne_distance, MAX(s.distance_max) AS max_distance,
+               AVG(s.vitesse_max) AS moyenne_vitesse
+        FROM simulation s JOIN projectile p ON p.id = s.projectile_id
+        GROUP BY p.id ORDER BY nb DESC"""),
+}
+
+
+# Fonction pour passer la base en journal WAL : les lecteurs (dont la copie) ne bloquent plus les écritures.
+# Le mode est persistant ; il n'est pas adapté aux bases sur un partage réseau.
+def activer_wal(bdd):
+    connexion = sqlite3.connect(bdd, timeout=5)
+    try:
+        return connexion.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        connexion.close()
+
+
+# Instantané en mémoire d'une base, en lecture seule, pour les analyses : copié par l'API de sauvegarde
+# de SQLite, puis remplacé d'un bloc à chaque rafraîchissement (à la demande ou programmé).
+# Les requêtes ne touchent jamais le fichier. Avec wal=True (à choisir explicitement : le mode est
+# persistant et exclu sur un partage réseau, comme celui de file_travaux.py), la base passe en journal
+# WAL et enregistrer_simulation et save_simulation n'attendent pas la copie ; sinon, au plus sa durée.
+class Instantane:
+    def __init__(self, bdd="simulations.db", wal=False):
+        self.bdd = bdd
+        self.mode = activer_wal(bdd) if wal else None
+        self.connexion = None
+        self.date = None
+        self.verrou = threading.Lock()
+        self.arret = threading.Event()
+        self.fil = None
+
+    # Fonction pour copier la base en une étape (une seule transaction de lecture, donc cohérente).
+    # En WAL, les écritures continuent pendant la copie ; en journal classique, elles attendent sa fin
+    # (une copie par étapes recommencerait à chaque écriture et pourrait ne jamais aboutir).
+    def rafraichir(self):
+        source = sqlite3.connect(self.bdd)
+        copie = sqlite3.connect(":memory:", check_same_thread=False)
+        try:
+            with chrono("instantane.copie"):
+                source.backup(copie)
+        except BaseException:
+            copie.close()
+            raise
+        finally:
+            source.close()
+        copie.execute("PRAGMA query_only = ON")
+        with self.verrou:
+            ancienne, self.connexion, self.date = self.connexion, copie, datetime.now()
+        if ancienne is not None:
+            ancienne.close()
+        compter("instantane.rafraichissements")
+        journaliser("instantane.rafraichissement", bdd=self.bdd)
+        return self
+
+    # Fonction pour rafraîchir toutes les `periode` secondes dans un fil d'arrière-plan
+    def demarrer(self, periode=PERIODE):
+        if self.connexion is None:
+            self.rafraichir()
+
+        def boucle():
+            while not self.arret.wait(periode):
+                try:
+                    self.rafraichir()
+                except sqlite3.Error as erreur:
+                    journaliser("instantane.erreur", bdd=self.bdd, erreur=str(erreur))
+        self.arret.clear()
+        self.fil = threading.Thread(target=boucle, name="instantane", daemon=True)
+        self.fil.start()
+        return self
+
+    def arreter(self):
+        self.arret.set()
+        if self.fil is not None:
+            self.fil.join()
+            self.fil = None
+
+    # Fonction pour exécuter une requête sur l'instantané (copié au premier appel) ;
+    # renvoie les noms de colonnes et les lignes
+    def requete(self, sql, parametres=()):
+        if self.connexion is None:
+            self.rafraichir()
+        with self.verrou, chrono("instantane.requete"):
+            curseur = self.connexion.execute(sql, parametres)
+            return [description[0] for description in curseur.description or ()], curseur.fetchall()
+
+    # Rapports applicables au schéma de la base copiée
+    def rapports(self):
+        if self.connexion is None:
+            self.rafraichir()
+        with self.verrou:
+            return [nom for nom, (requis, _) in RAPPORTS.items()
+                    if all(existe(self.connexion, table, colonne) for table, colonne in requis)]
+
+    def rapport(self, nom):
+        if nom not in RAPPORTS:
+            raise ValueError(f"Rapport inconnu : {nom} (disponibles : {', '.join(RAPPORTS)})")
+        if nom not in self.rapports():
+            requis = ", ".join(f"{table}.{colonne}" for table, colonne in RAPPORTS[nom][0])
+            raise ValueError(f"Le rapport « {nom} » demande {requis}")
+        return self.requete(RAPPORTS[nom][1])
+
+    def fermer(self):
+        self.arreter()
+        with self.verrou:
+            if self.connexion is not None:
+                self.connexion.close()
+                self.connexion = None
+
+
+def afficher(colonnes, lignes):
+    print(" | ".join(colonnes))
+    for ligne in lignes:
+        print(" | ".join(f"{v:.2f}" if isinstance(v, float) else str(v) for v in ligne))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapports sur un instantané en mémoire de la base")
+    parser.add_argument("--bdd", default="simulations.db")
+    parser.add_argument("--wal", action="store_true",
+                        help="Passer la base en journal WAL (persistant ; pas sur un partage réseau)")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    p_rapport = sous.add_parser("rapport", help="Rapports d'analyse (tous par défaut)")
+    p_rapport.add_argument("noms", nargs="*", help=", ".join(RAPPORTS))
+    p_rapport.add_argument("--periode", type=float, help="Répéter après chaque rafraîchissement (s)")
+    p_requete = sous.add_parser("requete", help="Requête SQL en lecture sur l'instantané")
+    p_requete.add_argument("sql")
+    args = parser.parse_args(argv)
+
+    instantane = Instantane(args.bdd, wal=args.wal).rafraichir()
+    try:
+        if args.commande == "requete":
+            afficher(*instantane.requete(args.sql))
+            return
+        while True:
+            print(f"Instantané du {instantane.date:%Y-%m-%d %H:%M:%S}")
+            for nom in args.noms or instantane.rapports():
+                print(f"\n[{nom}]")
+                try:
+                    afficher(*instantane.rapport(nom))
+                except ValueError as erreur:
+                    print(erreur)
+            if args.periode is None:
+                break
+            time.sleep(args.periode)
+            instantane.rafraichir()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        instantane.fermer()
+
+
+if __name__ == "__main__":
+    main()
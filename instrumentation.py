@@ -0,0 +1,129 @@
+import atexit
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+# Instrumentation désactivée par défaut : chrono() renvoie alors un objet inerte partagé.
+# MINI_IS_METRIQUES=1 l'active ; =fichier.json ou =logs exporte aussi les mesures à la sortie.
+ACTIF = False
+
+# nom -> [nombre d'appels, durée totale (s), durée max (s)]
+chronos = {}
+# nom -> valeur cumulée
+compteurs = {}
+
+
+class Chrono:
+    __slots__ = ("nom", "debut")
+
+    def __init__(self, nom):
+        self.nom = nom
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.arreter()
+        return False
+
+    def arreter(self):
+        enregistrer_duree(self.nom, time.perf_counter() - self.debut)
+
+
+class ChronoInactif:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+    def arreter(self):
+        pass
+
+
+CHRONO_INACTIF = ChronoInactif()
+
+
+# Fonction pour chronométrer une phase : with chrono("bdd.commit"): ...
+def chrono(nom):
+    return Chrono(nom) if ACTIF else CHRONO_INACTIF
+
+
+# Fonction pour une phase qui ne tient pas dans un bloc with (rappel Tk interrompu par une boîte modale)
+def demarrer(nom):
+    return chrono(nom).__enter__()
+
+
+def enregistrer_duree(nom, duree):
+    mesure = chronos.get(nom)
+    if mesure is None:
+        chronos[nom] = [1, duree, duree]
+    else:
+        mesure[0] += 1
+        mesure[1] += duree
+        if duree > mesure[2]:
+            mesure[2] = duree
+
+
+# Fonction pour incrémenter un compteur (pas, évaluations, lignes écrites...)
+def compter(nom, valeur=1):
+    if ACTIF:
+        compteurs[nom] = compteurs.get(nom, 0) + valeur
+
+
+def activer(actif=True):
+    global ACTIF
+    ACTIF = actif
+
+
+def reinitialiser():
+    chronos.clear()
+    compteurs.clear()
+
+
+# Fonction pour obtenir un instantané des mesures
+def metriques():
+    return {
+        "chronos": {nom: {"appels": nb, "total_s": total, "moyenne_s": total / nb, "max_s": maximum}
+                    for nom, (nb, total, maximum) in sorted(chronos.items())},
+        "compteurs": dict(sorted(compteurs.items())),
+    }
+
+
+def exporter_json(chemin):
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        json.dump(metriques(), fichier, indent=2)
+
+
+# Fonction pour écrire les mesures dans la table logs (une ligne JSON par mesure)
+def exporter_logs(bdd="simulations.db"):
+    date_actuelle = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    donnees = metriques()
+    lignes = [(json.dumps({"type": "chrono", "nom": nom, **valeurs}), date_actuelle)
+              for nom, valeurs in donnees["chronos"].items()]
+    lignes += [(json.dumps({"type": "compteur", "nom": nom, "valeur": valeur}), date_actuelle)
+               for nom, valeur in donnees["compteurs"].items()]
+    connexion = sqlite3.connect(bdd)
+    try:
+        with connexion:
+            connexion.execute("CREATE TABLE IF NOT EXISTS logs (id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT, date TEXT)")
+            connexion.executemany("INSERT INTO logs (message, date) VALUES (?, ?)", lignes)
+    finally:
+        connexion.close()
+
+
+def exporter_a_la_sortie(destination):
+    if destination == "logs":
+        atexit.register(exporter_logs)
+    elif destination.endswith(".json"):
+        atexit.register(exporter_json, destination)
+
+
+if os.environ.get("MINI_IS_METRIQUES"):
+    activer()
+    exporter_a_la_sortie(os.environ["MINI_IS_METRIQUES"])
@@ -0,0 +1,145 @@
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Paramètres par défaut du journal
+TAILLE_FILE = 10000
+TAILLE_LOT = 500
+# Délai maximal (s) entre deux validations quand des événements attendent
+INTERVALLE_COMMIT = 1.0
+# Écriture d'un lot refusée par SQLite (base verrouillée...) : nouvelles tentatives espacées de
+# ATTENTE_ERREUR, doublée à chaque fois, avant de compter le lot comme perdu
+TENTATIVES_ECRITURE = 5
+ATTENTE_ERREUR = 0.2
+
+# Politiques quand la file est pleine
+ABANDONNER = "abandonner"   # l'événement est perdu (et compté), l'appelant n'attend jamais
+ATTENDRE = "attendre"       # l'appelant attend au plus delai_attente, puis abandonne
+
+
+# Journal structuré : les événements (dictionnaires JSON) sont mis en file par l'appelant
+# puis écrits par lots dans la table logs par un fil d'écriture dédié
+class Journal:
+    def __init__(self, bdd="simulations.db", taille_file=TAILLE_FILE, taille_lot=TAILLE_LOT,
+                 intervalle=INTERVALLE_COMMIT, politique=ABANDONNER, delai_attente=0.005):
+        if politique not in (ABANDONNER, ATTENDRE):
+            raise ValueError(f"Politique inconnue : {politique}")
+        self.bdd = bdd
+        self.file = queue.Queue(maxsize=taille_file)
+        self.taille_lot = taille_lot
+        self.intervalle = intervalle
+        self.politique = politique
+        self.delai_attente = delai_attente
+        self.nb_ecrits = 0
+        self.nb_abandonnes = 0
+        self.nb_perdus = 0
+        self.derniere_erreur = None
+        self.fil = None
+        self.arret = threading.Event()
+
+    def demarrer(self):
+        if self.fil is None:
+            self.fil = threading.Thread(target=self.ecrire_en_continu, name="journal", daemon=True)
+            self.fil.start()
+        return self
+
+    # Fonction pour journaliser un événement : ne bloque jamais plus que delai_attente
+    def journaliser(self, evenement, **champs):
+        ligne = (json.dumps({"evenement": evenement, **champs}, default=str),
+                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        try:
+            if self.politique == ATTENDRE:
+                self.file.put(ligne, timeout=self.delai_attente)
+            else:
+                self.file.put_nowait(ligne)
+            return True
+        except queue.Full:
+            self.nb_abandonnes += 1
+            return False
+
+    # Boucle du fil d'écriture : un lot par transaction, validation au plus tard toutes les intervalle s.
+    # Une erreur SQLite n'arrête jamais le fil : le lot est retenté, puis compté dans nb_perdus.
+    def ecrire_en_continu(self):
+        connexion = sqlite3.connect(self.bdd)
+        try:
+            abandons_signales, perdus_signales = 0, 0
+            while not (self.arret.is_set() and self.file.empty()):
+                lot = self.lire_lot()
+                if self.nb_abandonnes > abandons_signales:
+                    perdus = self.nb_abandonnes - abandons_signales
+                    abandons_signales += perdus
+                    lot.append((json.dumps({"evenement": "journal.abandons", "nb": perdus}),
+                                datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                if self.nb_perdus > perdus_signales:
+                    perdus = self.nb_perdus - perdus_signales
+                    perdus_signales += perdus
+                    lot.append((json.dumps({"evenement": "journal.erreurs", "nb": perdus,
+                                            "erreur": self.derniere_erreur}),
+                                datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                if lot:
+                    self.ecrire_lot(connexion, lot)
+        finally:
+            connexion.close()
+
+    def ecrire_lot(self, connexion, lot):
+        attente = ATTENTE_ERREUR
+        for tentative in range(TENTATIVES_ECRITURE):
+            try:
+                with connexion:
+                    connexion.execute("CREATE TABLE IF NOT EXISTS logs "
+                                      "(id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT, date TEXT)")
+                    connexion.executemany("INSERT INTO logs (message, date) VALUES (?, ?)", lot)
+                self.nb_ecrits += len(lot)
+                return True
+            except sqlite3.Error as erreur:
+                self.derniere_erreur = str(erreur)
+                if tentative < TENTATIVES_ECRITURE - 1:
+                    time.sleep(attente)
+                    attente *= 2
+        self.nb_perdus += len(lot)
+        return False
+
+    # Fonction pour regrouper les événements arrivés pendant un intervalle (ou jusqu'à taille_lot)
+    def lire_lot(self):
+        lot = []
+        echeance = time.monotonic() + self.intervalle
+        while len(lot) < self.taille_lot:
+            restant = echeance - time.monotonic()
+            try:
+                if restant <= 0 or self.arret.is_set():
+                    lot.append(self.file.get_nowait())
+                else:
+                    lot.append(self.file.get(timeout=restant))
+            except queue.Empty:
+                if restant <= 0 or self.arret.is_set():
+                    break
+        return lot
+
+    # Fonction pour vider la file et arrêter le fil d'écriture
+    def arreter(self, delai=5.0):
+        self.arret.set()
+        if self.fil is not None:
+            self.fil.join(delai)
+            self.fil = None
+
+
+# Journal partagé par les scripts (aucun tant que demarrer_journal n'a pas été appelé)
+journal_global = None
+
+
+def demarrer_journal(bdd="simulations.db", **options):
+    global journal_global
+    if journal_global is None:
+        journal_global = Journal(bdd, **options).demarrer()
+        atexit.register(journal_global.arreter)
+    return journal_global
+
+
+def journaliser(evenement, **champs):
+    if journal_global is not None:
+        return journal_global.journaliser(evenement, **champs)
+    return False
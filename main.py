@@ -1,8 +1,11 @@
 import sqlite3
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import matplotlib.pyplot as plt
+from import_lots import importer_fichier
+from agregats import installer_agregats
+from bdd import BDD, initialiser_bdd
+from migration import TABLES_UNIFIEES, base_migree
 import math
 
 # Nom de la base de données
@@ -17,8 +20,19 @@ TABLES = {
     'Resultat': ['simulation_id', 'vitesse_max', 'distance_max']
 }
 
+# Fonction pour passer à simulations.db une fois migrée (python migration.py) : ses tables unifiées
+# remplacent celles de projectile_simulation.db, qui n'est plus écrite
+def choisir_base():
+    global DB_NAME, TABLES
+    if base_migree(BDD):
+        DB_NAME = BDD
+        TABLES = TABLES_UNIFIEES
+
 def create_tables():
     """Créer les tables dans la base de données"""
+    if DB_NAME == BDD:
+        initialiser_bdd(DB_NAME)
+        return
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
     cursor.execute("""
@@ -63,6 +77,7 @@ def create_tables():
         );""")
     conn.commit()
     conn.close()
+    installer_agregats(DB_NAME)
 
 class App(tk.Tk):
     def __init__(self):
@@ -102,6 +117,7 @@ class EntityTab(ttk.Frame):
         btn_frame.pack(fill='x', padx=10, pady=5)
         ttk.Button(btn_frame, text="Ajouter", command=self.add_record).pack(side='left', padx=5)
         ttk.Button(btn_frame, text="Mettre à jour", command=self.update_record).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Importer", command=self.import_records).pack(side='left', padx=5)
         
         self.tree = ttk.Treeview(self, columns=['id'] + fields, show='headings')
         for col in ['id'] + fields:
@@ -131,7 +147,7 @@ class EntityTab(ttk.Frame):
         values = []
         for field in self.fields:
             val = self.entries[field].get()
-            if field == 'date_lancement' and not val:
+            if field in ('date_lancement', 'date_simulation') and not val:
                 val = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             values.append(val)
         placeholders = ', '.join('?' * len(values))
@@ -142,6 +158,17 @@ class EntityTab(ttk.Frame):
         except Exception as e:
             messagebox.showerror("Erreur", str(e))
 
+    def import_records(self):
+        chemin = filedialog.askopenfilename(filetypes=[("CSV / JSONL", "*.csv *.jsonl *.json")])
+        if not chemin:
+            return
+        try:
+            total = importer_fichier(chemin, self.table, DB_NAME)
+            self.load_records()
+            messagebox.showinfo("Succès", f"{total} lignes importées dans {self.table}")
+        except Exception as e:
+            messagebox.showerror("Erreur", str(e))
+
     def on_select(self, event):
         selected = self.tree.selection()
         if selected:
@@ -159,7 +186,7 @@ class EntityTab(ttk.Frame):
         values = []
         for field in self.fields:
             val = self.entries[field].get()
-            if field == 'date_lancement' and not val:
+            if field in ('date_lancement', 'date_simulation') and not val:
                 val = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             values.append(val)
         assignments = ', '.join([f"{f}=?" for f in self.fields])
@@ -208,6 +235,8 @@ class SimulationTab(ttk.Frame):
         return ts, ys
 
     def launch_simulation(self):
+        import matplotlib.pyplot as plt
+
         try:
             masse = float(self.entries['Masse (kg)'].get())
             coeff_frottement = float(self.entries['Coeff_frottement'].get())
@@ -247,7 +276,13 @@ class SimulationTab(ttk.Frame):
         except Exception as e:
             messagebox.showerror("Erreur", str(e))
 
-if __name__ == "__main__":
+# Point d'entrée : schéma vérifié une seule fois au démarrage, puis interface
+def main():
+    choisir_base()
     create_tables()
     app = App()
     app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,56 @@
 import sqlite3
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import matplotlib.pyplot as plt
+from import_lots import importer_fichier
+from agregats import installer_agregats, lire_agregats
+from instantane import PERIODE, Instantane
+from instrumentation import chrono
+from atmosphere import charger_condition
+from bdd import BDD, initialiser_bdd
+from migration import CONDITIONS_DEFAUT, TABLES_UNIFIEES, base_migree
+import memoire
+import moteur
 import math
+import os
+import threading
+import numpy as np
 
 DB_NAME = 'projectile_simulation.db'
 
+# Section utilisée pour les projectiles créés depuis l'onglet Simulation
+SECTION_DEFAUT = 0.01
+
 # Définir uniquement les tables utiles
 TABLES = {
     'Condition': ['temperature', 'vent', 'humidite']
 }
 
+# Fonction pour passer à simulations.db une fois migrée (python migration.py) : son schéma unifié
+# remplace celui de projectile_simulation.db, qui n'est plus écrite
+def choisir_base():
+    global DB_NAME, TABLES
+    if base_migree(BDD):
+        DB_NAME = BDD
+        TABLES = {'conditions': TABLES_UNIFIEES['conditions']}
+
+# Table des conditions : Condition dans projectile_simulation.db, conditions dans le schéma unifié
+def table_condition():
+    return 'conditions' if DB_NAME == BDD else 'Condition'
+
+# Journal WAL pour l'onglet Analyses (sa copie ne retarde alors plus save_simulation) : par défaut pour
+# projectile_simulation.db, base locale de l'interface ; simulations.db, qui peut être partagée sur le
+# réseau (file_travaux.py), reste en journal classique sauf MINI_IS_WAL=1. MINI_IS_WAL=0 l'exclut partout.
+def wal_analyses():
+    choix = os.environ.get("MINI_IS_WAL")
+    if choix is not None:
+        return choix == "1"
+    return DB_NAME != BDD
+
 def create_tables():
+    if DB_NAME == BDD:
+        initialiser_bdd(DB_NAME)
+        return
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
     # Projectile
@@ -51,6 +89,11 @@ def create_tables():
             FOREIGN KEY(projectile_id) REFERENCES Projectile(id),
             FOREIGN KEY(condition_id) REFERENCES Condition(id)
         );""")
+    # Vitesse initiale et angle des lancers, repris par migration.py
+    colonnes = {ligne[1] for ligne in cursor.execute("PRAGMA table_info(Simulation)")}
+    for colonne in ('vitesse_initiale', 'angle_deg'):
+        if colonne not in colonnes:
+            cursor.execute(f"ALTER TABLE Simulation ADD COLUMN {colonne} REAL")
     # Resultat
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS Resultat (
@@ -60,8 +103,30 @@ def create_tables():
             distance_max REAL,
             FOREIGN KEY(simulation_id) REFERENCES Simulation(id)
         );""")
+    # Fusion des projectiles en double (un par lancer auparavant) avant l'index unique
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_projectile_identite'")
+    fusion = cursor.fetchone() is None
+    if fusion:
+        cursor.execute("""
+            UPDATE Simulation SET projectile_id = (
+                SELECT MIN(p2.id) FROM Projectile p1
+                JOIN Projectile p2 ON p2.nom = p1.nom AND p2.masse = p1.masse
+                    AND p2.section = p1.section AND p2.coefficient_frottement = p1.coefficient_frottement
+                WHERE p1.id = Simulation.projectile_id)
+            WHERE projectile_id IN (SELECT id FROM Projectile)""")
+        cursor.execute("""
+            DELETE FROM Projectile WHERE id NOT IN (
+                SELECT MIN(id) FROM Projectile GROUP BY nom, masse, section, coefficient_frottement)""")
+    # Index : identité des projectiles et clés de jointure
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_projectile_identite
+        ON Projectile (nom, masse, section, coefficient_frottement)""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_simulation_projectile ON Simulation (projectile_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_simulation_utilisateur ON Simulation (utilisateur_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resultat_simulation ON Resultat (simulation_id)")
     conn.commit()
     conn.close()
+    installer_agregats(DB_NAME, reconstruire=fusion)
 
 class App(tk.Tk):
     def __init__(self):
@@ -81,6 +146,10 @@ class App(tk.Tk):
         sim_tab = SimulationTab(self.notebook)
         self.notebook.add(sim_tab, text="Simulation Trajectoire")
 
+        # Onglet Analyses (lit uniquement les tables d'agrégats)
+        analyse_tab = AnalyseTab(self.notebook)
+        self.notebook.add(analyse_tab, text="Analyses")
+
 class EntityTab(ttk.Frame):
     def __init__(self, container, table, fields):
         super().__init__(container)
@@ -102,6 +171,7 @@ class EntityTab(ttk.Frame):
         btn_frame.pack(fill='x', padx=10, pady=5)
         ttk.Button(btn_frame, text="Ajouter Condition", command=self.add_record).pack(side='left', padx=5)
         ttk.Button(btn_frame, text="Mettre à jour", command=self.update_record).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Importer", command=self.import_records).pack(side='left', padx=5)
         
         self.tree = ttk.Treeview(self, columns=['id'] + fields, show='headings')
         for col in ['id'] + fields:
@@ -137,6 +207,17 @@ class EntityTab(ttk.Frame):
         except Exception as e:
             messagebox.showerror("Erreur", str(e))
 
+    def import_records(self):
+        chemin = filedialog.askopenfilename(filetypes=[("CSV / JSONL", "*.csv *.jsonl *.json")])
+        if not chemin:
+            return
+        try:
+            total = importer_fichier(chemin, self.table, DB_NAME)
+            self.load_records()
+            messagebox.showinfo("Succès", f"{total} lignes importées dans {self.table}")
+        except Exception as e:
+            messagebox.showerror("Erreur", str(e))
+
     def on_select(self, event):
         selected = self.tree.selection()
         if selected:
@@ -163,12 +244,112 @@ class EntityTab(ttk.Frame):
         except Exception as e:
             messagebox.showerror("Erreur", str(e))
 
+class AnalyseTab(ttk.Frame):
+    AGREGATS = {
+        'Par jour': 'stats_jour',
+        'Par projectile': 'stats_projectile',
+        'Par utilisateur': 'stats_utilisateur',
+    }
+    # Rapports calculés sur les tables de base (voir instantane.RAPPORTS) : projectile_simulation.db, schéma unifié
+    RAPPORTS = {
+        'Détail par projectile': ('par_projectile', 'par_projectile_unifie'),
+    }
+
+    def __init__(self, container):
+        super().__init__(container)
+
+        # Les analyses lisent un instantané en mémoire, copié en arrière-plan (voir wal_analyses : hors WAL,
+        # une copie peut retarder save_simulation de sa durée), rafraîchi seulement quand l'onglet est affiché
+        self.instantane = Instantane(DB_NAME, wal=wal_analyses())
+        self.copie_en_cours = False
+        self.planifie = False
+
+        btn_frame = ttk.Frame(self)
+        btn_frame.pack(fill='x', padx=10, pady=10)
+        self.combo = ttk.Combobox(btn_frame, values=list(self.AGREGATS) + list(self.RAPPORTS), state='readonly')
+        self.combo.current(0)
+        self.combo.pack(side='left', padx=5)
+        self.combo.bind('<<ComboboxSelected>>', lambda event: self.load_stats())
+        ttk.Button(btn_frame, text="Actualiser", command=self.refresh).pack(side='left', padx=5)
+        self.date_label = ttk.Label(btn_frame, text="")
+        self.date_label.pack(side='left', padx=5)
+
+        self.tree = ttk.Treeview(self, show='headings')
+        self.tree.pack(fill='both', expand=True, padx=10, pady=10)
+        self.bind('<Visibility>', self.on_visible)
+
+    # Retour sur l'onglet : nouvel instantané s'il a plus d'une période, sinon affichage de l'actuel
+    def on_visible(self, event=None):
+        if self.instantane.date is None or (datetime.now() - self.instantane.date).total_seconds() >= PERIODE:
+            self.refresh()
+        else:
+            self.load_stats()
+
+    # Rafraîchissement toutes les PERIODE secondes, sauté tant que l'onglet n'est pas affiché
+    def refresh_periodic(self):
+        if self.winfo_viewable():
+            self.refresh()
+        self.after(int(PERIODE * 1000), self.refresh_periodic)
+
+    # Nouvel instantané copié dans un fil d'arrière-plan, puis affichage (Tk n'attend jamais la copie)
+    def refresh(self):
+        if self.copie_en_cours:
+            return
+        self.copie_en_cours = True
+        erreurs = []
+
+        def copier():
+            try:
+                self.instantane.rafraichir()
+            except Exception as e:
+                erreurs.append(e)
+        fil = threading.Thread(target=copier, name="instantane", daemon=True)
+        fil.start()
+        self.after(50, self.wait_refresh, fil, erreurs)
+
+    def wait_refresh(self, fil, erreurs):
+        if fil.is_alive():
+            self.after(50, self.wait_refresh, fil, erreurs)
+            return
+        self.copie_en_cours = False
+        if erreurs:
+            messagebox.showerror("Erreur", str(erreurs[0]))
+            return
+        # Première copie faite : rafraîchissements programmés ensuite (onglet affiché seulement)
+        if not self.planifie:
+            self.planifie = True
+            self.after(int(PERIODE * 1000), self.refresh_periodic)
+        self.load_stats()
+
+    def load_stats(self):
+        if self.instantane.connexion is None:
+            self.refresh()
+            return
+        choix = self.combo.get()
+        try:
+            if choix in self.RAPPORTS:
+                colonnes, lignes = self.instantane.rapport(self.RAPPORTS[choix][DB_NAME == BDD])
+            else:
+                colonnes, lignes = lire_agregats(DB_NAME, self.AGREGATS[choix], instantane=self.instantane)
+        except Exception as e:
+            messagebox.showerror("Erreur", str(e))
+            return
+        self.date_label.config(text=f"Instantané du {self.instantane.date:%H:%M:%S}")
+        self.tree.delete(*self.tree.get_children())
+        self.tree['columns'] = colonnes
+        for col in colonnes:
+            self.tree.heading(col, text=col.capitalize())
+            self.tree.column(col, width=90, anchor='center')
+        for ligne in lignes:
+            self.tree.insert('', 'end', values=[f"{v:.2f}" if isinstance(v, float) else v for v in ligne])
+
 class SimulationTab(ttk.Frame):
     def __init__(self, container):
         super().__init__(container)
         
         self.entries = {}
-        fields = ['Nom', 'Masse (kg)', 'Coeff_frottement', 'Angle (°)', 'Vitesse initiale (m/s)']
+        fields = ['Nom', 'Masse (kg)', 'Coeff_frottement', 'Angle (°)', 'Vitesse initiale (m/s)',
+                  'Condition (id, facultatif)']
         
         form_frame = ttk.Frame(self)
         form_frame.pack(pady=20)
@@ -182,49 +363,38 @@ class SimulationTab(ttk.Frame):
         
         ttk.Button(self, text="Lancer Simulation", command=self.launch_simulation).pack(pady=10)
 
-    def runge_kutta_4(self, f, t0, y0, h, n):
-        t, y = t0, y0
-        ts, ys = [t0], [y0]
-        for _ in range(n):
-            k1 = f(t, y)
-            k2 = f(t + h/2, [y[i] + h/2 * k1[i] for i in range(len(y))])
-            k3 = f(t + h/2, [y[i] + h/2 * k2[i] for i in range(len(y))])
-            k4 = f(t + h, [y[i] + h * k3[i] for i in range(len(y))])
-            y = [y[i] + h/6 * (k1[i] + 2*k2[i] + 2*k3[i] + k4[i]) for i in range(len(y))]
-            t += h
-            ts.append(t)
-            ys.append(y)
-        return ts, ys
+    # Simulation (moteur.py : RK4, pas de 0.01 s, arrêt au sol). Le coefficient de frottement k (force k·v²)
+    # est traduit en rayon et coefficient de traînée (k = ½·ρ_sol·Cd·S avec S = SECTION_DEFAUT) ; une condition
+    # (id de Condition, ou de conditions dans simulations.db) apporte l'atmosphère (masse volumique selon l'altitude, vent) et sa gravité.
+    # Renvoie distance_max, vitesse_max et la trajectoire.
+    def simulate(self, masse, coeff_frottement, angle_deg, vitesse_init, condition_id=None):
+        options = {} if condition_id is None else charger_condition(condition_id, DB_NAME, table_condition())
+        if 'atmosphere' in options:
+            densite_sol = float(options['atmosphere'].valeur('densite', 0.0))
+        else:
+            densite_sol = moteur.MASSE_VOLUMIQUE_AIR
+        options['coefficient_trainee'] = 2 * coeff_frottement / (densite_sol * SECTION_DEFAUT)
+        distance_max, _, xs, ys = moteur.simuler(vitesse_init, angle_deg, masse, math.sqrt(SECTION_DEFAUT / math.pi),
+                                                 **options)
+        # Vitesse moyenne par pas (la vitesse initiale reste le maximum sans vent arrière)
+        vitesse_max = max(vitesse_init, float(np.hypot(np.diff(xs), np.diff(ys)).max(initial=0)) / moteur.PAS_TEMPS)
+        return distance_max, vitesse_max, xs, ys
 
     def launch_simulation(self):
+        import matplotlib.pyplot as plt
+
         try:
             nom = self.entries['Nom'].get()
             masse = float(self.entries['Masse (kg)'].get())
             coeff_frottement = float(self.entries['Coeff_frottement'].get())
             angle_deg = float(self.entries['Angle (°)'].get())
             vitesse_init = float(self.entries['Vitesse initiale (m/s)'].get())
-            angle_rad = math.radians(angle_deg)
-            
-            vx0 = vitesse_init * math.cos(angle_rad)
-            vy0 = vitesse_init * math.sin(angle_rad)
-            g = 9.81
-
-            def equations(t, y):
-                x, y_pos, vx, vy = y
-                v = math.sqrt(vx**2 + vy**2)
-                fx = - coeff_frottement * v * vx / masse
-                fy = - masse * g - coeff_frottement * v * vy / masse
-                return [vx, vy, fx, fy]
-
-            y0 = [0, 0, vx0, vy0]
-            t0 = 0
-            h = 0.01
-            n = 1000
-
-            ts, ys_ = self.runge_kutta_4(equations, t0, y0, h, n)
+            condition = self.entries['Condition (id, facultatif)'].get().strip()
+            condition_id = int(condition) if condition else None
 
-            xs = [p[0] for p in ys_]
-            ys_positions = [p[1] for p in ys_]
+            distance_max, vitesse_max, xs, ys_positions = self.simulate(masse, coeff_frottement, angle_deg,
+                                                                        vitesse_init, condition_id)
+            hauteur_max = float(max(ys_positions))
 
             # Affichage du graphe
             plt.plot(xs, ys_positions)
@@ -235,55 +405,126 @@ class SimulationTab(ttk.Frame):
             plt.show()
 
             # Sauvegarde automatique dans la base
-            self.save_simulation(nom, masse, coeff_frottement, vitesse_init, max(xs), max([math.sqrt(p[2]**2 + p[3]**2) for p in ys_]))
+            self.save_simulation(nom, masse, coeff_frottement, vitesse_init, distance_max, vitesse_max, condition_id,
+                                 angle_deg, hauteur_max)
+            memoire.apres_lancement("launch_simulation")
 
         except Exception as e:
             messagebox.showerror("Erreur", str(e))
 
-    def save_simulation(self, nom, masse, coeff_frottement, vitesse_init, distance_max, vitesse_max):
+    # Cache mémoire des identifiants déjà internés : (table, clé) -> id
+    id_cache = {}
+
+    # Retourne l'id de la ligne identifiée par values, en la créant au besoin. Un id en cache est
+    # revérifié (une lecture par clé primaire) : la ligne a pu être supprimée, fusionnée ou modifiée ailleurs.
+    def get_or_create(self, cursor, table, fields, values, conflict):
+        key = (table, tuple(values))
+        where = ' AND '.join(f"{f} = ?" for f in conflict)
+        identite = [values[fields.index(f)] for f in conflict]
+        if key in self.id_cache:
+            cursor.execute(f"SELECT 1 FROM {table} WHERE id = ? AND {where}", [self.id_cache[key]] + identite)
+            if cursor.fetchone():
+                return self.id_cache[key]
+            del self.id_cache[key]
+        cursor.execute(f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))}) "
+                       f"ON CONFLICT({', '.join(conflict)}) DO NOTHING", values)
+        if cursor.rowcount:
+            self.id_cache[key] = cursor.lastrowid
+        else:
+            cursor.execute(f"SELECT id FROM {table} WHERE {where}", identite)
+            self.id_cache[key] = cursor.fetchone()[0]
+        return self.id_cache[key]
+
+    def save_simulation(self, nom, masse, coeff_frottement, vitesse_init, distance_max, vitesse_max, condition_id=None,
+                        angle_deg=None, hauteur_max=None):
+        with chrono("bdd.enregistrement"):
+            self.store_simulation(nom, masse, coeff_frottement, vitesse_init, distance_max, vitesse_max, condition_id,
+                                  angle_deg, hauteur_max)
+        messagebox.showinfo("Succès", "Simulation et Résultats sauvegardés avec succès !")
+
+    # Écrit la simulation (sans interface) et retourne son id : Simulation et Resultat dans
+    # projectile_simulation.db, session et simulation dans le schéma unifié de simulations.db
+    def store_simulation(self, nom, masse, coeff_frottement, vitesse_init, distance_max, vitesse_max, condition_id=None,
+                         angle_deg=None, hauteur_max=None):
+        unifiee = DB_NAME == BDD
+        condition_table = table_condition()
         conn = sqlite3.connect(DB_NAME)
         cursor = conn.cursor()
 
-        # Vérifier utilisateur par défaut
-        cursor.execute("SELECT id FROM Utilisateur WHERE nom='Default'")
-        user = cursor.fetchone()
-        if not user:
-            cursor.execute("INSERT INTO Utilisateur (nom, email) VALUES ('Default', 'default@example.com')")
-            conn.commit()
-            user_id = cursor.lastrowid
-        else:
-            user_id = user[0]
-
-        # Ajouter projectile
-        cursor.execute("INSERT INTO Projectile (nom, masse, section, coefficient_frottement) VALUES (?, ?, ?, ?)",
-                       (nom, masse, 0.01, coeff_frottement))
-        projectile_id = cursor.lastrowid
-
-        # Ajouter condition par défaut si vide
-        cursor.execute("SELECT id FROM Condition")
-        condition = cursor.fetchone()
-        if not condition:
-            cursor.execute("INSERT INTO Condition (temperature, vent, humidite) VALUES (20, 0, 50)")
-            conn.commit()
-            condition_id = cursor.lastrowid
-        else:
-            condition_id = condition[0]
+        try:
+            # Utilisateur par défaut (recherche par email, colonne UNIQUE)
+            user_id = self.get_or_create(cursor, 'Utilisateur', ['nom', 'email'],
+                                         ['Default', 'default@example.com'], ['email'])
 
-        # Ajouter simulation
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute("INSERT INTO Simulation (utilisateur_id, projectile_id, condition_id, date_lancement) VALUES (?, ?, ?, ?)",
-                       (user_id, projectile_id, condition_id, now))
-        simulation_id = cursor.lastrowid
+            # Projectile interné : un même projectile réutilise la même ligne (avec son rayon dans simulations.db)
+            identite = ['nom', 'masse', 'section', 'coefficient_frottement']
+            champs, valeurs = list(identite), [nom, masse, SECTION_DEFAUT, coeff_frottement]
+            if unifiee:
+                champs.append('rayon')
+                valeurs.append(math.sqrt(SECTION_DEFAUT / math.pi))
+            projectile_id = self.get_or_create(cursor, 'Projectile', champs, valeurs, identite)
 
-        # Ajouter résultat
-        cursor.execute("INSERT INTO Resultat (simulation_id, vitesse_max, distance_max) VALUES (?, ?, ?)",
-                       (simulation_id, vitesse_max, distance_max))
-        conn.commit()
-        conn.close()
+            # Condition : celle de la simulation, sinon la première existante, sinon une condition par défaut
+            # (id en cache revérifié)
+            if condition_id is None:
+                cle = (condition_table, None)
+                if cle in self.id_cache:
+                    cursor.execute(f"SELECT 1 FROM {condition_table} WHERE id = ?", (self.id_cache[cle],))
+                    if not cursor.fetchone():
+                        del self.id_cache[cle]
+                if cle not in self.id_cache:
+                    cursor.execute(f"SELECT id FROM {condition_table} ORDER BY id LIMIT 1")
+                    condition = cursor.fetchone()
+                    if condition:
+                        self.id_cache[cle] = condition[0]
+                    elif unifiee:
+                        cursor.execute("INSERT INTO conditions (gravite, masse_volumique_air, coefficient_trainee, "
+                                       "temperature, vent, humidite) VALUES (?, ?, ?, 20, 0, 50)", CONDITIONS_DEFAUT)
+                        self.id_cache[cle] = cursor.lastrowid
+                    else:
+                        cursor.execute("INSERT INTO Condition (temperature, vent, humidite) VALUES (20, 0, 50)")
+                        self.id_cache[cle] = cursor.lastrowid
+                condition_id = self.id_cache[cle]
 
-        messagebox.showinfo("Succès", "Simulation et Résultats sauvegardés avec succès !")
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if unifiee:
+                # Une session par lancer (comme simu_is.py), puis la simulation et ses résultats sur une ligne
+                cursor.execute("INSERT INTO session (utilisateur_id, date_session) VALUES (?, ?)", (user_id, now))
+                cursor.execute("""
+                    INSERT INTO simulation (vitesse_initiale, angle_deg, masse, rayon, date_simulation, distance_max,
+                                            hauteur_max, vitesse_max, session_id, projectile_id, condition_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                               (vitesse_init, angle_deg, masse, math.sqrt(SECTION_DEFAUT / math.pi), now, distance_max,
+                                hauteur_max, vitesse_max, cursor.lastrowid, projectile_id, condition_id))
+                simulation_id = cursor.lastrowid
+            else:
+                # Ajouter simulation
+                cursor.execute("INSERT INTO Simulation (utilisateur_id, projectile_id, condition_id, date_lancement, "
+                               "vitesse_initiale, angle_deg) VALUES (?, ?, ?, ?, ?, ?)",
+                               (user_id, projectile_id, condition_id, now, vitesse_init, angle_deg))
+                simulation_id = cursor.lastrowid
 
-if __name__ == "__main__":
+                # Ajouter résultat
+                cursor.execute("INSERT INTO Resultat (simulation_id, vitesse_max, distance_max) VALUES (?, ?, ?)",
+                               (simulation_id, vitesse_max, distance_max))
+            conn.commit()
+        except Exception:
+            # Des ids mis en cache pendant une transaction annulée seraient invalides
+            self.id_cache.clear()
+            raise
+        finally:
+            conn.close()
+        return simulation_id
+
+# Point d'entrée : schéma vérifié une seule fois au démarrage, puis interface
+def main():
+    choisir_base()
     create_tables()
     app = App()
+    memoire.sonde("figures ouvertes", memoire.figures_ouvertes)
+    memoire.surveiller(app)
     app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import gc
+import os
+import sys
+import tracemalloc
+from collections import Counter
+
+from journal import journaliser
+
+# Profilage mémoire désactivé par défaut : les appels des scripts ne coûtent alors qu'un test.
+# MINI_IS_MEMOIRE=1 l'active ; MINI_IS_MEMOIRE=<octets> fixe aussi le seuil de fuite par lancement.
+ACTIF = False
+
+NB_CADRES = 10          # profondeur des piles enregistrées par tracemalloc
+NB_SITES = 10           # sites d'allocation affichés par rapport
+NB_TYPES = 10           # types d'objets affichés par rapport
+SEUIL_FUITE = 256 * 1024  # croissance moyenne par lancement (octets) au-delà de laquelle on signale une fuite
+INTERVALLE_RAPPORT = 600  # rapport périodique (s) pour les sessions Tk
+
+etat = {"reference": None, "precedent": None, "types": Counter(), "lancements": 0, "seuil": SEUIL_FUITE}
+# nom -> fonction renvoyant une quantité à suivre (figures ouvertes, connexions...)
+sondes = {}
+
+
+def activer(seuil=SEUIL_FUITE, nb_cadres=NB_CADRES):
+    global ACTIF
+    ACTIF = True
+    etat["seuil"] = seuil
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(nb_cadres)
+    etat["reference"] = etat["precedent"] = None
+    etat["lancements"] = 0
+
+
+# Fonction pour fixer la référence (après un premier lancement : caches de matplotlib déjà remplis)
+def fixer_reference():
+    etat["reference"] = etat["precedent"] = prendre_instantane()
+    etat["types"] = compter_objets()
+    etat["lancements"] = 0
+
+
+def sonde(nom, fonction):
+    sondes[nom] = fonction
+
+
+def prendre_instantane():
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+
+
+# Sonde des figures matplotlib encore ouvertes (0 si pyplot n'a jamais été importé)
+def figures_ouvertes():
+    pyplot = sys.modules.get("matplotlib.pyplot")
+    return len(pyplot.get_fignums()) if pyplot else 0
+
+
+def compter_objets():
+    return Counter(type(objet).__name__ for objet in gc.get_objects())
+
+
+# Fonction pour comparer l'état courant au précédent : sites d'allocation et types en croissance
+def rapport(etiquette):
+    instantane = prendre_instantane()
+    types = compter_objets()
+    sites = instantane.compare_to(etat["precedent"], "traceback")[:NB_SITES]
+    croissance_types = (types - etat["types"]).most_common(NB_TYPES)
+    courant, pic = tracemalloc.get_traced_memory()
+    total = sum(stat.size for stat in instantane.statistics("filename"))
+    croissance = total - sum(stat.size for stat in etat["reference"].statistics("filename"))
+    par_lancement = croissance / etat["lancements"] if etat["lancements"] else 0.0
+    resultat = {
+        "etiquette": etiquette,
+        "lancements": etat["lancements"],
+        "memoire_tracee": courant,
+        "pic": pic,
+        "croissance_depuis_debut": croissance,
+        "croissance_par_lancement": par_lancement,
+        "fuite": par_lancement > etat["seuil"],
+        "sites": [{"site": str(stat.traceback[-1]), "delta": stat.size_diff, "blocs": stat.count_diff}
+                  for stat in sites if stat.size_diff],
+        "types": dict(croissance_types),
+        "sondes": {nom: fonction() for nom, fonction in sondes.items()},
+    }
+    etat["precedent"] = instantane
+    etat["types"] = types
+    afficher(resultat)
+    journaliser("memoire.rapport", **resultat)
+    return resultat
+
+
+def afficher(resultat):
+    print(f"[mémoire] {resultat['etiquette']} : {resultat['memoire_tracee'] / 1024:.0f} Kio tracés "
+          f"(pic {resultat['pic'] / 1024:.0f} Kio), +{resultat['croissance_par_lancement'] / 1024:.1f} Kio/lancement "
+          f"sur {resultat['lancements']} lancements", file=sys.stderr)
+    if resultat["fuite"]:
+        print(f"[mémoire] FUITE probable : plus de {etat['seuil'] / 1024:.0f} Kio conservés par lancement",
+              file=sys.stderr)
+    for site in resultat["sites"]:
+        print(f"[mémoire]   {site['delta'] / 1024:+9.1f} Kio {site['blocs']:+6d} blocs  {site['site']}", file=sys.stderr)
+    for nom, nombre in resultat["types"].items():
+        print(f"[mémoire]   +{nombre} objets {nom}", file=sys.stderr)
+    for nom, valeur in resultat["sondes"].items():
+        print(f"[mémoire]   {nom} = {valeur}", file=sys.stderr)
+
+
+# Fonction appelée par les scripts à la fin de chaque lancement
+def apres_lancement(etiquette="lancement"):
+    if not ACTIF:
+        return None
+    if etat["reference"] is None:
+        fixer_reference()
+        return None
+    etat["lancements"] += 1
+    return rapport(f"{etiquette} n°{etat['lancements']}")
+
+
+# Fonction pour programmer un rapport périodique dans la boucle Tk
+def surveiller(root, intervalle=INTERVALLE_RAPPORT):
+    if not ACTIF:
+        return
+
+    def rapport_periodique():
+        if etat["reference"] is not None:
+            rapport("périodique")
+        root.after(int(intervalle * 1000), rapport_periodique)
+
+    root.after(int(intervalle * 1000), rapport_periodique)
+
+
+if os.environ.get("MINI_IS_MEMOIRE"):
+    valeur = os.environ["MINI_IS_MEMOIRE"]
+    activer(int(valeur) if valeur.isdigit() and int(valeur) > 1 else SEUIL_FUITE)
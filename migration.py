@@ -0,0 +1,362 @@
+import argparse
+import math
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from agregats import installer_agregats
+
+# Version du schéma unifié, enregistrée dans PRAGMA user_version. À relever à chaque changement de SCHEMA,
+# COLONNES_AJOUTEES ou INDEX : bdd.initialiser_bdd ne fait rien sur une base déjà à cette version.
+# 2 : index d'identité des projectiles (projectiles internés par main2.py)
+# 3 : déclencheurs d'agrégats sur session et index de recalcul des maxima (agregats.py)
+VERSION_SCHEMA = 3
+
+# Nombre de lignes migrées par transaction
+TAILLE_LOT = 5000
+
+# Schéma unifié : union des tables utilisées par les scripts sur simulations.db
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS utilisateur (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nom TEXT NOT NULL,
+        email TEXT UNIQUE
+    )""",
+    """CREATE TABLE IF NOT EXISTS projectile (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nom TEXT NOT NULL,
+        masse REAL,
+        rayon REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS conditions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        gravite REAL,
+        masse_volumique_air REAL,
+        coefficient_trainee REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS session (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        utilisateur_id INTEGER,
+        date_session TEXT,
+        FOREIGN KEY(utilisateur_id) REFERENCES utilisateur(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS simulation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        vitesse_initiale REAL,
+        angle_deg REAL,
+        masse REAL,
+        rayon REAL,
+        date_simulation TEXT,
+        distance_max REAL,
+        hauteur_max REAL,
+        session_id INTEGER,
+        FOREIGN KEY(session_id) REFERENCES session(id)
+    )""",
+    # Tables de IS_simu.py
+    """CREATE TABLE IF NOT EXISTS utilisateurs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nom TEXT,
+        email TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS paramètres_simulation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        gravité REAL,
+        coefficient_traînée REAL,
+        masse_volumique_air REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS conditions_météo (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        vent_vitesse REAL,
+        vent_direction REAL,
+        température REAL,
+        pression REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message TEXT,
+        date TEXT
+    )""",
+    # Suivi de la migration (reprise après interruption)
+    """CREATE TABLE IF NOT EXISTS migration_progression (
+        etape TEXT PRIMARY KEY,
+        dernier_id INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS migration_correspondance (
+        table_source TEXT NOT NULL,
+        id_source INTEGER NOT NULL,
+        id_cible INTEGER NOT NULL,
+        PRIMARY KEY (table_source, id_source)
+    )""",
+]
+
+# Colonnes ajoutées aux tables existantes pour accueillir projectile_simulation.db
+COLONNES_AJOUTEES = {
+    "projectile": [("section", "REAL"), ("coefficient_frottement", "REAL")],
+    "conditions": [("temperature", "REAL"), ("vent", "REAL"), ("humidite", "REAL")],
+    "simulation": [("session_id", "INTEGER"), ("projectile_id", "INTEGER"),
+                   ("condition_id", "INTEGER"), ("vitesse_max", "REAL")],
+}
+
+# Index créés après les colonnes ajoutées
+INDEX = [
+    """CREATE UNIQUE INDEX IF NOT EXISTS idx_projectile_identite
+        ON projectile (nom, masse, section, coefficient_frottement)""",
+]
+
+# Les 5 lignes de test de IS.py, réinsérées à chaque démarrage sur une table vide avant bdd.py
+# (colonnes de COLONNES_DOUBLON) : seules lignes dédoublonnées par la migration
+SIMULATIONS_TEST = [
+    (50.0, 45.0, 1.0, 0.1, "2025-01-01", 127.8, 45.2),
+    (30.0, 30.0, 0.5, 0.05, "2025-01-02", 84.3, 22.1),
+    (70.0, 60.0, 2.0, 0.2, "2025-01-03", 215.6, 78.9),
+    (25.0, 15.0, 0.3, 0.03, "2025-01-04", 42.7, 5.8),
+    (100.0, 75.0, 5.0, 0.5, "2025-01-05", 320.1, 120.4),
+]
+COLONNES_DOUBLON = ["vitesse_initiale", "angle_deg", "masse", "rayon",
+                    "date_simulation", "distance_max", "hauteur_max"]
+
+# Tables des scripts graphiques (app.py, main.py, main2.py) dans le schéma unifié, et leurs champs :
+# Condition y devient conditions, Resultat est fondu dans simulation et l'utilisateur passe par la session
+TABLES_UNIFIEES = {
+    "projectile": ["nom", "masse", "section", "coefficient_frottement"],
+    "utilisateur": ["nom", "email"],
+    "conditions": ["temperature", "vent", "humidite"],
+    "simulation": ["session_id", "projectile_id", "condition_id", "date_simulation", "vitesse_initiale",
+                   "angle_deg", "vitesse_max", "distance_max", "hauteur_max"],
+}
+
+# Valeurs par défaut des conditions (celles de simu_is.py)
+CONDITIONS_DEFAUT = (9.81, 1.225, 0.47)
+
+
+# Fonction pour lire la version du schéma (une seule lecture de pragma)
+def version_schema(bdd="simulations.db"):
+    connexion = sqlite3.connect(bdd)
+    try:
+        return connexion.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        connexion.close()
+
+
+# Fonction utilisée au démarrage des scripts pour éviter de recréer le schéma
+def schema_a_jour(bdd="simulations.db"):
+    return os.path.exists(bdd) and version_schema(bdd) >= VERSION_SCHEMA
+
+
+# Fonction pour savoir si la base a été migrée (dans une version quelconque) : app.py, main.py et main2.py
+# écrivent alors dans son schéma unifié, et plus dans projectile_simulation.db
+def base_migree(bdd="simulations.db"):
+    return os.path.exists(bdd) and version_schema(bdd) > 0
+
+
+def creer_schema(connexion):
+    for instruction in SCHEMA:
+        connexion.execute(instruction)
+    for table, colonnes in COLONNES_AJOUTEES.items():
+        existantes = {ligne[1] for ligne in connexion.execute(f"PRAGMA table_info({table})")}
+        for nom, type_sql in colonnes:
+            if nom not in existantes:
+                connexion.execute(f"ALTER TABLE {table} ADD COLUMN {nom} {type_sql}")
+    for instruction in INDEX:
+        connexion.execute(instruction)
+
+
+def progression(connexion, etape):
+    ligne = connexion.execute("SELECT dernier_id FROM migration_progression WHERE etape = ?", (etape,)).fetchone()
+    return ligne[0] if ligne else 0
+
+
+# Fonction pour appliquer une étape par lots : chaque lot et sa progression sont validés ensemble
+def migrer_par_lots(connexion, etape, requete, traiter_lot, taille_lot):
+    total = 0
+    while True:
+        dernier = progression(connexion, etape)
+        lot = connexion.execute(requete, (dernier, taille_lot)).fetchall()
+        if not lot:
+            return total
+        connexion.execute("BEGIN IMMEDIATE")
+        try:
+            traiter_lot(lot)
+            connexion.execute("INSERT INTO migration_progression (etape, dernier_id) VALUES (?, ?) "
+                              "ON CONFLICT(etape) DO UPDATE SET dernier_id = excluded.dernier_id",
+                              (etape, lot[-1][0]))
+            connexion.execute("COMMIT")
+        except BaseException:
+            connexion.execute("ROLLBACK")
+            raise
+        total += len(lot)
+
+
+def correspondances(connexion, table_source):
+    return dict(connexion.execute("SELECT id_source, id_cible FROM migration_correspondance WHERE table_source = ?",
+                                  (table_source,)))
+
+
+def enregistrer_correspondances(connexion, table_source, paires):
+    connexion.executemany("INSERT OR REPLACE INTO migration_correspondance (table_source, id_source, id_cible) "
+                          "VALUES (?, ?, ?)", [(table_source, s, c) for s, c in paires])
+
+
+# Étape 1 : suppression des doublons des lignes de test de IS.py, en gardant la première occurrence
+# (deux lancers réels identiques, même à la seconde près, sont conservés)
+def dedoublonner_simulations(connexion, taille_lot):
+    colonnes = ", ".join(COLONNES_DOUBLON)
+    egalites = " AND ".join(f"d.{c} IS s.{c}" for c in COLONNES_DOUBLON)
+    lignes_test = ", ".join(["(" + ", ".join("?" * len(COLONNES_DOUBLON)) + ")"] * len(SIMULATIONS_TEST))
+    valeurs_test = [valeur for ligne in SIMULATIONS_TEST for valeur in ligne]
+    connexion.execute(f"CREATE INDEX IF NOT EXISTS migration_idx_doublon ON simulation ({colonnes}, id)")
+
+    def traiter_lot(lot):
+        connexion.execute(f"""
+            DELETE FROM simulation WHERE id IN (
+                SELECT s.id FROM simulation s
+                WHERE s.id BETWEEN ? AND ?
+                  AND ({", ".join(f"s.{c}" for c in COLONNES_DOUBLON)}) IN (VALUES {lignes_test})
+                  AND EXISTS (SELECT 1 FROM simulation d WHERE {egalites} AND d.id < s.id))
+        """, [lot[0][0], lot[-1][0]] + valeurs_test)
+
+    total = migrer_par_lots(connexion, "dedoublonnage",
+                            "SELECT id FROM simulation WHERE id > ? ORDER BY id LIMIT ?", traiter_lot, taille_lot)
+    connexion.execute("DROP INDEX IF EXISTS migration_idx_doublon")
+    return total
+
+
+# Étape 2 : utilisateurs de projectile_simulation.db, fusionnés par email
+def migrer_utilisateurs(connexion, taille_lot):
+    def traiter_lot(lot):
+        connexion.executemany("INSERT INTO utilisateur (nom, email) VALUES (?, ?) ON CONFLICT(email) DO NOTHING",
+                              [(nom, email) for _, nom, email in lot])
+        enregistrer_correspondances(connexion, "Utilisateur", [
+            (id_source, connexion.execute("SELECT id FROM utilisateur WHERE email = ?", (email,)).fetchone()[0])
+            for id_source, _, email in lot])
+
+    return migrer_par_lots(connexion, "utilisateurs",
+                           "SELECT id, nom, email FROM source.Utilisateur WHERE id > ? ORDER BY id LIMIT ?",
+                           traiter_lot, taille_lot)
+
+
+# Étape 3 : projectiles, en fusionnant les projectiles identiques (main2.py en crée un par lancer)
+def migrer_projectiles(connexion, taille_lot):
+    existants = {tuple(ligne[1:]): ligne[0] for ligne in connexion.execute(
+        "SELECT id, nom, masse, section, coefficient_frottement FROM projectile")}
+
+    def traiter_lot(lot):
+        paires = []
+        for id_source, nom, masse, section, coeff in lot:
+            cle = (nom, masse, section, coeff)
+            if cle not in existants:
+                rayon = math.sqrt(section / math.pi) if section else None
+                existants[cle] = connexion.execute(
+                    "INSERT INTO projectile (nom, masse, rayon, section, coefficient_frottement) VALUES (?, ?, ?, ?, ?)",
+                    (nom, masse, rayon, section, coeff)).lastrowid
+            paires.append((id_source, existants[cle]))
+        enregistrer_correspondances(connexion, "Projectile", paires)
+
+    return migrer_par_lots(connexion, "projectiles",
+                           "SELECT id, nom, masse, section, coefficient_frottement FROM source.Projectile "
+                           "WHERE id > ? ORDER BY id LIMIT ?", traiter_lot, taille_lot)
+
+
+# Étape 4 : conditions météo, complétées par les constantes physiques par défaut
+def migrer_conditions(connexion, taille_lot):
+    existants = {tuple(ligne[1:]): ligne[0] for ligne in connexion.execute(
+        "SELECT id, temperature, vent, humidite FROM conditions WHERE temperature IS NOT NULL "
+        "OR vent IS NOT NULL OR humidite IS NOT NULL")}
+
+    def traiter_lot(lot):
+        paires = []
+        for id_source, temperature, vent, humidite in lot:
+            cle = (temperature, vent, humidite)
+            if cle not in existants:
+                existants[cle] = connexion.execute(
+                    "INSERT INTO conditions (gravite, masse_volumique_air, coefficient_trainee, "
+                    "temperature, vent, humidite) VALUES (?, ?, ?, ?, ?, ?)",
+                    CONDITIONS_DEFAUT + cle).lastrowid
+            paires.append((id_source, existants[cle]))
+        enregistrer_correspondances(connexion, "Condition", paires)
+
+    return migrer_par_lots(connexion, "conditions",
+                           "SELECT id, temperature, vent, humidite FROM source.Condition "
+                           "WHERE id > ? ORDER BY id LIMIT ?", traiter_lot, taille_lot)
+
+
+# Étape 5 : Simulation ⋈ Resultat ⋈ Projectile -> simulation (une session de migration par utilisateur).
+# Vitesse initiale et angle : enregistrés par main2.py depuis la version 2, NULL pour les lancers antérieurs.
+def migrer_simulations(connexion, taille_lot):
+    colonnes_source = {ligne[1] for ligne in connexion.execute("PRAGMA source.table_info(Simulation)")}
+    lancement = ", ".join(f"s.{c}" if c in colonnes_source else "NULL" for c in ("vitesse_initiale", "angle_deg"))
+
+    def traiter_lot(lot):
+        utilisateurs = correspondances(connexion, "Utilisateur")
+        projectiles = correspondances(connexion, "Projectile")
+        conditions = correspondances(connexion, "Condition")
+        sessions = correspondances(connexion, "Session")
+        lignes = []
+        for (_, utilisateur_id, projectile_id, condition_id, date_lancement,
+             masse, section, vitesse_max, distance_max, vitesse_initiale, angle_deg) in lot:
+            utilisateur = utilisateurs.get(utilisateur_id)
+            if utilisateur is not None and utilisateur not in sessions:
+                sessions[utilisateur] = connexion.execute(
+                    "INSERT INTO session (utilisateur_id, date_session) VALUES (?, ?)",
+                    (utilisateur, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))).lastrowid
+                enregistrer_correspondances(connexion, "Session", [(utilisateur, sessions[utilisateur])])
+            rayon = math.sqrt(section / math.pi) if section else None
+            lignes.append((masse, rayon, date_lancement, distance_max, vitesse_max, sessions.get(utilisateur),
+                           projectiles.get(projectile_id), conditions.get(condition_id), vitesse_initiale, angle_deg))
+        connexion.executemany("""
+            INSERT INTO simulation (masse, rayon, date_simulation, distance_max, vitesse_max,
+                                    session_id, projectile_id, condition_id, vitesse_initiale, angle_deg)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, lignes)
+
+    return migrer_par_lots(connexion, "simulations", f"""
+        SELECT r.id, s.utilisateur_id, s.projectile_id, s.condition_id, s.date_lancement,
+               p.masse, p.section, r.vitesse_max, r.distance_max, {lancement}
+        FROM source.Resultat r
+        JOIN source.Simulation s ON s.id = r.simulation_id
+        LEFT JOIN source.Projectile p ON p.id = s.projectile_id
+        WHERE r.id > ? ORDER BY r.id LIMIT ?
+    """, traiter_lot, taille_lot)
+
+
+# Fonction principale : migration reprenable de simulations.db (+ projectile_simulation.db)
+def migrer(bdd="simulations.db", source="projectile_simulation.db", taille_lot=TAILLE_LOT, afficher=print):
+    connexion = sqlite3.connect(bdd, isolation_level=None)
+    try:
+        connexion.execute("BEGIN IMMEDIATE")
+        creer_schema(connexion)
+        connexion.execute("COMMIT")
+
+        etapes = [("Dédoublonnage de simulation", dedoublonner_simulations)]
+        if source and os.path.exists(source):
+            connexion.execute("ATTACH DATABASE ? AS source", (source,))
+            etapes += [("Utilisateurs", migrer_utilisateurs), ("Projectiles", migrer_projectiles),
+                       ("Conditions", migrer_conditions), ("Simulations", migrer_simulations)]
+        for nom, etape in etapes:
+            debut = time.perf_counter()
+            total = etape(connexion, taille_lot)
+            afficher(f"{nom} : {total} lignes traitées en {time.perf_counter() - debut:.2f} s")
+        if source and os.path.exists(source):
+            connexion.execute("DETACH DATABASE source")
+
+        connexion.execute(f"PRAGMA user_version = {VERSION_SCHEMA}")
+    finally:
+        connexion.close()
+    # Agrégats manquants (ex. stats_utilisateur une fois session_id présent)
+    installer_agregats(bdd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migration vers le schéma unifié de simulations.db")
+    parser.add_argument("--bdd", default="simulations.db", help="Base cible")
+    parser.add_argument("--source", default="projectile_simulation.db", help="Base à fusionner (si présente)")
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT)
+    args = parser.parse_args(argv)
+
+    migrer(args.bdd, args.source, args.taille_lot)
+    print(f"Schéma en version {version_schema(args.bdd)}")
+
+
+if __name__ == "__main__":
+    main()
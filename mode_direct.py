@@ -0,0 +1,123 @@
+import queue
+import threading
+
+import moteur
+from instrumentation import chrono
+
+# Affinage progressif : tracé grossier pendant le mouvement d'un curseur, trajectoire précise à l'arrêt
+PAS_GROSSIER = 0.05            # s (quelques ms de calcul, RK4 reste à moins de 1 % de la portée)
+PAS_PRECIS = moteur.PAS_TEMPS  # pas des scripts
+INTERVALLE_IMAGE = 33          # ms minimum entre deux tracés grossiers (~30 images/s)
+DELAI_AFFINAGE = 250           # ms sans mouvement avant le calcul précis
+
+# Curseurs : nom, libellé, minimum, maximum, résolution, valeur initiale
+CURSEURS = (
+    ("vitesse", "Vitesse initiale (m/s)", 1, 150, 0.5, 50),
+    ("angle", "Angle de lancement (°)", 1, 89, 0.5, 45),
+    ("masse", "Masse du projectile (kg)", 0.01, 20, 0.01, 1),
+    ("rayon", "Rayon du projectile (m)", 0.005, 0.5, 0.005, 0.1),
+)
+
+
+# Fenêtre de réglage en direct : la trajectoire suit les curseurs, rien n'est écrit en base avant
+# « Enregistrer », qui appelle enregistrer(vitesse, angle, masse, rayon, distance_max, hauteur_max)
+# avec le résultat précis. Le calcul précis se fait dans un fil d'arrière-plan ; son résultat revient
+# par une file lue par after, et il est ignoré si les curseurs ont bougé entre-temps.
+class ModeDirect:
+    def __init__(self, parent, enregistrer, titre="Mode direct"):
+        import tkinter as tk
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.enregistrer = enregistrer
+        self.fenetre = tk.Toplevel(parent) if parent is not None else tk.Tk()
+        self.fenetre.title(titre)
+        self.variables = {}
+        for ligne, (nom, libelle, minimum, maximum, resolution, initiale) in enumerate(CURSEURS):
+            self.variables[nom] = tk.DoubleVar(value=initiale)
+            tk.Label(self.fenetre, text=libelle).grid(row=ligne, column=0, sticky="w")
+            tk.Scale(self.fenetre, from_=minimum, to=maximum, resolution=resolution, orient=tk.HORIZONTAL,
+                     length=300, variable=self.variables[nom], command=self.deplacement).grid(row=ligne, column=1)
+
+        figure = Figure(figsize=(7, 4))
+        self.axes = figure.add_subplot()
+        self.axes.set_xlabel("Distance (m)")
+        self.axes.set_ylabel("Hauteur (m)")
+        self.axes.grid(True)
+        self.axes.axhline(0, color='black', linewidth=0.5)
+        self.ligne, = self.axes.plot([], [])
+        self.canevas = FigureCanvasTkAgg(figure, master=self.fenetre)
+        self.canevas.get_tk_widget().grid(row=len(CURSEURS), column=0, columnspan=2)
+
+        self.etiquette = tk.Label(self.fenetre, text="")
+        self.etiquette.grid(row=len(CURSEURS) + 1, column=0, columnspan=2)
+        tk.Button(self.fenetre, text="Enregistrer", command=self.valider).grid(row=len(CURSEURS) + 2, column=0, pady=10)
+        tk.Button(self.fenetre, text="Fermer", command=self.fenetre.destroy).grid(row=len(CURSEURS) + 2, column=1, pady=10)
+
+        self.resultats = queue.Queue()
+        self.generation = 0
+        self.image_prevue = None
+        self.affinage = None
+        self.precis = None
+        self.deplacement()
+
+    def parametres(self):
+        return tuple(self.variables[nom].get() for nom, *_ in CURSEURS)
+
+    # Appelé à chaque mouvement d'un curseur : au plus un tracé grossier par INTERVALLE_IMAGE,
+    # et l'affinage repoussé jusqu'à DELAI_AFFINAGE ms après le dernier mouvement
+    def deplacement(self, _valeur=None):
+        self.generation += 1
+        self.precis = None
+        if self.image_prevue is None:
+            self.image_prevue = self.fenetre.after(INTERVALLE_IMAGE, self.tracer_grossier)
+        if self.affinage is not None:
+            self.fenetre.after_cancel(self.affinage)
+        self.affinage = self.fenetre.after(DELAI_AFFINAGE, self.affiner)
+
+    def tracer_grossier(self):
+        self.image_prevue = None
+        if self.precis is not None:
+            return
+        with chrono("direct.grossier"):
+            distance_max, hauteur_max, x, y = moteur.simuler(*self.parametres(), pas_temps=PAS_GROSSIER)
+        self.tracer(x, y, f"≈ distance {distance_max:.1f} m, hauteur {hauteur_max:.1f} m", "--")
+
+    def affiner(self):
+        self.affinage = None
+        generation, parametres = self.generation, self.parametres()
+
+        def calculer():
+            self.resultats.put((generation, parametres) + moteur.simuler(*parametres, pas_temps=PAS_PRECIS))
+        threading.Thread(target=calculer, name="affinage", daemon=True).start()
+        self.fenetre.after(20, self.recevoir)
+
+    def recevoir(self):
+        try:
+            generation, parametres, distance_max, hauteur_max, x, y = self.resultats.get_nowait()
+        except queue.Empty:
+            self.fenetre.after(20, self.recevoir)
+            return
+        if generation != self.generation:
+            return
+        self.precis = (parametres, distance_max, hauteur_max)
+        self.tracer(x, y, f"Distance max = {distance_max:.2f} m | Hauteur max = {hauteur_max:.2f} m", "-")
+
+    def tracer(self, x, y, texte, style):
+        self.ligne.set_data(x, y)
+        self.ligne.set_linestyle(style)
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.canevas.draw_idle()
+        self.etiquette.config(text=texte)
+
+    # Enregistrement explicite : toujours avec le résultat précis (calculé ici s'il n'est pas encore arrivé)
+    def valider(self):
+        if self.precis is None:
+            parametres = self.parametres()
+            distance_max, hauteur_max, _, _ = moteur.simuler(*parametres, pas_temps=PAS_PRECIS)
+            self.precis = (parametres, distance_max, hauteur_max)
+        parametres, distance_max, hauteur_max = self.precis
+        with chrono("bdd.enregistrement"):
+            self.enregistrer(*parametres, distance_max, hauteur_max)
+        self.etiquette.config(text=f"Enregistré : distance max = {distance_max:.2f} m | hauteur max = {hauteur_max:.2f} m")
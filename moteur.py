@@ -0,0 +1,465 @@
+import numpy as np
+
+import instrumentation
+from instrumentation import chrono, compter
+
+# Paramètres physiques par défaut (ceux des scripts)
+GRAVITE = 9.81
+MASSE_VOLUMIQUE_AIR = 1.225
+COEFFICIENT_TRAINEE = 0.47
+
+# Paramètres d'intégration par défaut
+PAS_TEMPS = 0.01
+TEMPS_MAX = 10
+
+# Contact avec le sol (simuler_lot_rebonds)
+RESTITUTION = 0.5       # rapport des vitesses normales après/avant l'impact
+FROTTEMENT = 0.3        # frottement de Coulomb pendant l'impact
+ROULEMENT = 0.05        # coefficient de résistance au roulement (0 : arrêt sur place)
+VITESSE_MIN = 0.1       # vitesse (m/s) du rebond en dessous de laquelle le projectile ne rebondit plus
+REBONDS_MAX = 50
+
+
+# Fonction pour calculer le coefficient de résistance de l'air d'une sphère de rayon donné
+def coefficient_resistance(rayon, masse_volumique_air=MASSE_VOLUMIQUE_AIR, coefficient_trainee=COEFFICIENT_TRAINEE):
+    section_transversale = np.pi * np.asarray(rayon, dtype=float)**2
+    return 0.5 * masse_volumique_air * coefficient_trainee * section_transversale
+
+
+# Fonction RK4 (fonctionne aussi bien sur un état (4,) que sur un lot d'états (4, n))
+def pas_rk4(fonction, t, état, pas_temps):
+    k1 = fonction(t, état)
+    k2 = fonction(t + pas_temps/2, état + pas_temps/2 * k1)
+    k3 = fonction(t + pas_temps/2, état + pas_temps/2 * k2)
+    k4 = fonction(t + pas_temps, état + pas_temps * k3)
+    return état + pas_temps/6 * (k1 + 2*k2 + 2*k3 + k4)
+
+
+# Fonction d'Euler explicite (schéma de simuler_projectile dans IS_simu.py)
+def pas_euler(fonction, t, état, pas_temps):
+    return état + pas_temps * fonction(t, état)
+
+
+# Fonction ln(1 + z) / z, sans annulation pour z petit
+def log1p_sur(z):
+    petit = z < 1e-6
+    z_sur = np.where(petit, 1.0, z)
+    return np.where(petit, 1 - z/2, np.log1p(z_sur) / z_sur)
+
+
+# Pas semi-implicite pour les régimes très freinés : la traînée est traitée implicitement
+# avec la vitesse du début du pas, v' = (v + g·h) / (1 + k|v|h).
+# Inconditionnellement stable, exact pour la traînée seule (v / (1 + k v t)) et à la vitesse
+# limite (|v| = √(g/k) reste fixe) ; le déplacement suit la loi exacte de la traînée seule.
+def pas_semi_implicite(fonction, t, état, pas_temps):
+    k = fonction.resistance_sur_masse
+    dimension = len(état) // 2
+    position, vitesse = état[:dimension], état[dimension:]
+    gravité = np.zeros_like(vitesse)
+    gravité[1] = -fonction.gravité
+    z = k * np.sqrt(np.sum(vitesse**2, axis=0)) * pas_temps
+    return np.concatenate([position + pas_temps * (vitesse * log1p_sur(z) + gravité * pas_temps/2),
+                           (vitesse + gravité * pas_temps) / (1 + z)])
+
+
+# Schémas d'intégration disponibles pour simuler_lot
+INTEGRATEURS = {"rk4": pas_rk4, "euler": pas_euler, "semi_implicite": pas_semi_implicite}
+# Évaluations du modèle par pas (compteur simulation.evaluations)
+EVALUATIONS_PAR_PAS = {"rk4": 4, "euler": 1, "semi_implicite": 1}
+
+# Régime raide : k|v|·pas au-delà duquel RK4 perd sa précision (il devient instable vers 2.8)
+SEUIL_RAIDEUR = 0.5
+
+
+# Fonction pour détecter les lancers raides : k|v| est maximal à max(v0, vitesse limite)
+def lancers_raides(vitesses, resistance_sur_masse, pas_temps=PAS_TEMPS, gravité=GRAVITE):
+    vitesse_limite = np.sqrt(gravité / resistance_sur_masse)
+    return resistance_sur_masse * np.maximum(np.asarray(vitesses, dtype=float), vitesse_limite) * pas_temps > SEUIL_RAIDEUR
+
+
+# Modèle physique du projectile (celui des scripts) pour un seul lancer : état (x, y, vx, vy)
+def modèle_projectile(resistance_sur_masse, gravité=GRAVITE):
+    def modèle(t, état):
+        x, y, vx, vy = état
+        vitesse = np.sqrt(vx**2 + vy**2)
+        return np.array([vx, vy,
+                         -resistance_sur_masse * vx * vitesse,
+                         -gravité - resistance_sur_masse * vy * vitesse])
+    return modèle
+
+
+# Modèle physique du projectile pour un lot : état en structure de tableaux (x, y, vx, vy) x n
+def modèle_projectile_lot(resistance_sur_masse, gravité=GRAVITE):
+    def modèle(t, état):
+        x, y, vx, vy = état
+        vitesse = np.sqrt(vx**2 + vy**2)
+        return np.stack([vx, vy,
+                         -resistance_sur_masse * vx * vitesse,
+                         -gravité - resistance_sur_masse * vy * vitesse])
+    # Paramètres lus par pas_semi_implicite, qui traite la traînée à part
+    modèle.resistance_sur_masse = resistance_sur_masse
+    modèle.gravité = gravité
+    return modèle
+
+
+# Modèle avec atmosphère (voir atmosphere.py) : masse volumique et vent lus dans des tables
+# précalculées selon l'altitude, la traînée s'appliquant à la vitesse relative à l'air.
+# Les coefficients des tables sont lus une fois par pas (modèle.préparer, appelé par intégrer_lot) :
+# chaque évaluation ne coûte plus qu'un a + b·y par champ.
+def modèle_projectile_atmosphere(resistance_unitaire, atmosphere, gravité=GRAVITE):
+    nb_champs = 2 if atmosphere.avec_vent else 1
+    cellules = {}
+
+    def préparer(état):
+        cellules["coefficients"] = atmosphere.coefficients(état[1], nb_champs)
+
+    def modèle(t, état):
+        x, y, vx, vy = état
+        ordonnees, pentes = cellules["coefficients"] if cellules else atmosphere.coefficients(y, nb_champs)
+        valeurs = ordonnees + pentes * y
+        resistance_sur_masse = resistance_unitaire * valeurs[0]
+        vx_air = vx - valeurs[1] if nb_champs == 2 else vx
+        vitesse = np.sqrt(vx_air**2 + vy**2)
+        return np.stack([vx, vy,
+                         -resistance_sur_masse * vx_air * vitesse,
+                         -gravité - resistance_sur_masse * vy * vitesse])
+    modèle.préparer = préparer
+    return modèle
+
+
+# Modèle 3-D pour un lot : état (x, y, z, vx, vy, vz) x n, y vertical, z latéral (vers la droite du tireur).
+# Sans atmosphère, resistance est k = résistance/masse ; avec, c'est la résistance par unité de
+# masse volumique et le vent (x, z) s'ajoute à la vitesse de l'air (tables lues une fois par pas).
+def modèle_projectile_3d(resistance, gravité=GRAVITE, atmosphere=None):
+    cellules = {}
+
+    def préparer(état):
+        cellules["coefficients"] = atmosphere.coefficients(état[1])
+
+    def modèle(t, état):
+        x, y, z, vx, vy, vz = état
+        if atmosphere is None:
+            resistance_sur_masse, vx_air, vz_air = resistance, vx, vz
+        else:
+            ordonnees, pentes = cellules["coefficients"] if cellules else atmosphere.coefficients(y)
+            densite, vent_x, vent_z = ordonnees + pentes * y
+            resistance_sur_masse = resistance * densite
+            vx_air = vx - vent_x
+            vz_air = vz - vent_z
+        vitesse = np.sqrt(vx_air**2 + vy**2 + vz_air**2)
+        return np.stack([vx, vy, vz,
+                         -resistance_sur_masse * vx_air * vitesse,
+                         -gravité - resistance_sur_masse * vy * vitesse,
+                         -resistance_sur_masse * vz_air * vitesse])
+    modèle.resistance_sur_masse = resistance
+    modèle.gravité = gravité
+    if atmosphere is not None:
+        modèle.préparer = préparer
+    return modèle
+
+
+# Fonction pour préparer l'état initial (4, n) d'un lot de lancers
+def état_initial_lot(vitesses, angles_deg):
+    vitesses, angles_deg = np.broadcast_arrays(np.asarray(vitesses, dtype=float), np.asarray(angles_deg, dtype=float))
+    angles_rad = np.radians(angles_deg)
+    return np.stack([np.zeros_like(vitesses), np.zeros_like(vitesses),
+                     vitesses * np.cos(angles_rad), vitesses * np.sin(angles_rad)])
+
+
+# Fonction pour préparer l'état initial 3-D (6, n) : azimut en degrés depuis l'axe x, vers +z
+def état_initial_lot_3d(vitesses, angles_deg, azimuts_deg=0.0):
+    vitesses, angles_deg, azimuts_deg = np.broadcast_arrays(*(np.asarray(c, dtype=float)
+                                                              for c in (vitesses, angles_deg, azimuts_deg)))
+    angles_rad, azimuts_rad = np.radians(angles_deg), np.radians(azimuts_deg)
+    horizontale = vitesses * np.cos(angles_rad)
+    zéros = np.zeros_like(vitesses)
+    return np.stack([zéros, zéros, zéros,
+                     horizontale * np.cos(azimuts_rad), vitesses * np.sin(angles_rad),
+                     horizontale * np.sin(azimuts_rad)])
+
+
+# Simulation vectorisée d'un lot de lancers, même schéma que les scripts :
+# pas fixe (RK4, Euler, semi-implicite ou "auto" selon le régime), arrêt (et y ramené à 0) au premier pas où y < 0,
+# ou au point d'impact sur un terrain (profil 1-D, voir terrain.py)
+def simuler_lot(vitesses, angles_deg, masses, rayons, pas_temps=PAS_TEMPS, temps_max=TEMPS_MAX,
+                trajectoires=False, gravité=GRAVITE, masse_volumique_air=MASSE_VOLUMIQUE_AIR,
+                coefficient_trainee=COEFFICIENT_TRAINEE, méthode="rk4", atmosphere=None, terrain=None):
+    if atmosphere is not None and méthode not in ("rk4", "euler"):
+        raise ValueError("L'atmosphère (masse volumique variable, vent) demande la méthode rk4 ou euler")
+    if méthode == "auto":
+        return simuler_lot_auto(vitesses, angles_deg, masses, rayons, pas_temps, temps_max, trajectoires,
+                                gravité, masse_volumique_air, coefficient_trainee, terrain)
+    pas = INTEGRATEURS[méthode]
+    état = état_initial_lot(vitesses, angles_deg)
+    n = état.shape[1]
+    if atmosphere is None:
+        resistance_sur_masse = np.broadcast_to(
+            coefficient_resistance(rayons, masse_volumique_air, coefficient_trainee) / np.asarray(masses, dtype=float),
+            (n,))
+        modèle = modèle_projectile_lot(resistance_sur_masse, gravité)
+    else:
+        resistance_unitaire = np.broadcast_to(
+            coefficient_resistance(rayons, 1.0, coefficient_trainee) / np.asarray(masses, dtype=float), (n,))
+        modèle = modèle_projectile_atmosphere(resistance_unitaire, atmosphere, gravité)
+
+    distance_max, hauteur_max, état, chemins = intégrer_lot(pas, modèle, état, pas_temps, temps_max,
+                                                           (0, 1) if trajectoires else (),
+                                                           EVALUATIONS_PAR_PAS[méthode], terrain)
+
+    if trajectoires:
+        return (distance_max, hauteur_max) + chemins
+    return distance_max, hauteur_max
+
+
+# Boucle d'intégration commune (état 2-D (x, y, vx, vy) ou 3-D (x, y, z, vx, vy, vz), y vertical) :
+# pas fixe, arrêt (et y ramené à 0) au premier pas où y < 0, l'état des lancers arrêtés restant figé.
+# Avec un terrain (voir terrain.py), l'arrêt a lieu au premier pas sous le terrain, au point d'impact interpolé.
+# Renvoie les maxima de x (ou, en 3-D avec direction = (cos, sin) de l'azimut, de la distance parcourue
+# selon la direction du tir) et de y, l'état final et les trajectoires des lignes demandées.
+def intégrer_lot(pas, modèle, état, pas_temps, temps_max, lignes_suivies=(), évaluations_par_pas=4, terrain=None,
+                 direction=None):
+    n = état.shape[1]
+    steps = int(temps_max / pas_temps)
+    temps = np.linspace(0, temps_max, steps)
+
+    def portée(état):
+        return état[0] if direction is None else état[0] * direction[0] + état[2] * direction[1]
+
+    distance_max = portée(état).copy()
+    hauteur_max = état[1].copy()
+    actifs = np.ones(n, dtype=bool)
+    pas_total = 0
+    chemins = [np.full((steps, n), np.nan) for _ in lignes_suivies]
+    for chemin, ligne in zip(chemins, lignes_suivies):
+        chemin[0] = état[ligne]
+
+    préparer = getattr(modèle, "préparer", None)
+    with chrono("simulation.integration"):
+        for i in range(1, steps):
+            if préparer is not None:
+                préparer(état)
+            nouvel = pas(modèle, temps[i-1], état, pas_temps)
+            if terrain is None:
+                au_sol = actifs & (nouvel[1] < 0)
+                nouvel[1, au_sol] = 0
+            else:
+                au_sol = np.zeros(n, dtype=bool)
+                au_sol[actifs] = terrain.sous_le_sol(état[:, actifs], nouvel[:, actifs])
+                if au_sol.any():
+                    nouvel[:, au_sol] = terrain.impact(état[:, au_sol], nouvel[:, au_sol])
+            état = np.where(actifs, nouvel, état)
+            np.maximum(distance_max, np.where(actifs, portée(état), -np.inf), out=distance_max)
+            np.maximum(hauteur_max, np.where(actifs, état[1], -np.inf), out=hauteur_max)
+            for chemin, ligne in zip(chemins, lignes_suivies):
+                chemin[i, actifs] = état[ligne, actifs]
+            if instrumentation.ACTIF:
+                pas_total += int(actifs.sum())
+            actifs &= ~au_sol
+            if not actifs.any():
+                break
+
+    compter("simulation.lancers", n)
+    compter("simulation.pas", pas_total)
+    compter("simulation.evaluations", pas_total * évaluations_par_pas)
+    return distance_max, hauteur_max, état, tuple(chemin[:i+1] for chemin in chemins)
+
+
+# Simulation 3-D d'un lot (vent traversier, azimut) : mêmes schémas et même arrêt au sol que simuler_lot
+# (terrain : profil 1-D selon x ou carte 2-D selon x et z).
+# Renvoie distance_max et déviation latérale à l'impact dans le repère du tir (selon la direction de l'azimut
+# et sa normale vers la droite du tireur, +z pour un azimut nul), hauteur_max (+ xs, ys, zs dans le repère fixe).
+def simuler_lot_3d(vitesses, angles_deg, masses, rayons, azimuts_deg=0.0, pas_temps=PAS_TEMPS,
+                   temps_max=TEMPS_MAX, trajectoires=False, gravité=GRAVITE,
+                   masse_volumique_air=MASSE_VOLUMIQUE_AIR, coefficient_trainee=COEFFICIENT_TRAINEE,
+                   méthode="rk4", atmosphere=None, terrain=None):
+    if atmosphere is not None and méthode not in ("rk4", "euler"):
+        raise ValueError("L'atmosphère (masse volumique variable, vent) demande la méthode rk4 ou euler")
+    état = état_initial_lot_3d(vitesses, angles_deg, azimuts_deg)
+    n = état.shape[1]
+    densite = 1.0 if atmosphere is not None else masse_volumique_air
+    resistance = np.broadcast_to(
+        coefficient_resistance(rayons, densite, coefficient_trainee) / np.asarray(masses, dtype=float), (n,))
+    modèle = modèle_projectile_3d(resistance, gravité, atmosphere)
+
+    azimuts_rad = np.broadcast_to(np.radians(np.asarray(azimuts_deg, dtype=float)), (n,))
+    cosinus, sinus = np.cos(azimuts_rad), np.sin(azimuts_rad)
+    distance_max, hauteur_max, état, chemins = intégrer_lot(INTEGRATEURS[méthode], modèle, état, pas_temps,
+                                                           temps_max, (0, 1, 2) if trajectoires else (),
+                                                           EVALUATIONS_PAR_PAS[méthode], terrain, (cosinus, sinus))
+    deviation = état[2] * cosinus - état[0] * sinus
+    if trajectoires:
+        return (distance_max, hauteur_max, deviation) + chemins
+    return distance_max, hauteur_max, deviation
+
+
+# Fonction pour réfléchir sur le sol (y = 0) un lot d'états à l'impact (2-D ou 3-D, y vertical) :
+# vitesse normale inversée et multipliée par la restitution, vitesse tangentielle réduite par
+# l'impulsion de frottement μ(1 + e)|vy| sans changer de sens.
+def rebondir(état, restitution=RESTITUTION, frottement=FROTTEMENT):
+    dimension = len(état) // 2
+    état = état.copy()
+    vitesse = état[dimension:]
+    normale = np.abs(vitesse[1])
+    tangentielle = np.sqrt(np.sum(vitesse**2, axis=0) - normale**2)
+    réduction = np.maximum(tangentielle - frottement * (1 + restitution) * normale, 0) \
+        / np.where(tangentielle > 0, tangentielle, 1.0)
+    vitesse *= réduction
+    vitesse[1] = restitution * normale
+    état[1] = 0
+    return état
+
+
+# Simulation d'un lot avec rebonds et roulement, par événements : chaque impact est localisé dans
+# son pas (interpolation linéaire), la vitesse y est réfléchie (rebondir) et l'intégration repart
+# de ce point, chaque lancer ayant son propre temps. Quand la vitesse verticale du rebond passe sous
+# vitesse_min (seuil indépendant de la masse), quand le rebond n'avance plus le temps (impact au début
+# du pas, vy < g·pas), ou après rebonds_max rebonds, le projectile roule jusqu'à l'arrêt avec une décélération
+# ROULEMENT·g (traînée négligée, distance v²/2μg calculée directement).
+# Les lancers terminés sont retirés du lot, qui reste vectorisé jusqu'au dernier rebond.
+# temps_max borne la phase de vol et de rebonds. Renvoie distance_max (point d'arrêt compris),
+# hauteur_max, nombre de rebonds et temps d'arrêt (nan si temps_max atteint), + xs, ys par pas.
+def simuler_lot_rebonds(vitesses, angles_deg, masses, rayons, restitution=RESTITUTION, frottement=FROTTEMENT,
+                        roulement=ROULEMENT, vitesse_min=VITESSE_MIN, rebonds_max=REBONDS_MAX,
+                        pas_temps=PAS_TEMPS, temps_max=TEMPS_MAX, trajectoires=False, gravité=GRAVITE,
+                        masse_volumique_air=MASSE_VOLUMIQUE_AIR, coefficient_trainee=COEFFICIENT_TRAINEE,
+                        méthode="rk4"):
+    vitesses, angles_deg, masses, rayons, restitution, frottement, roulement = np.broadcast_arrays(
+        *(np.asarray(c, dtype=float).ravel()
+          for c in (vitesses, angles_deg, masses, rayons, restitution, frottement, roulement)))
+    n = len(vitesses)
+    pas = INTEGRATEURS[méthode]
+    resistance_sur_masse = coefficient_resistance(rayons, masse_volumique_air, coefficient_trainee) / masses
+
+    état = état_initial_lot(vitesses, angles_deg)
+    distance_max, hauteur_max = état[0].copy(), état[1].copy()
+    nb_rebonds = np.zeros(n, dtype=int)
+    temps_arret = np.full(n, np.nan)
+    # Lancers encore en vol ou en rebond : indices dans le lot, état et temps propre
+    indices = np.arange(n)
+    temps = np.zeros(n)
+    modèle = modèle_projectile_lot(resistance_sur_masse, gravité)
+    chemins = ([état[0].copy()], [état[1].copy()]) if trajectoires else ()
+    pas_total = 0
+
+    with chrono("simulation.integration"):
+        while len(indices):
+            nouvel = pas(modèle, temps, état, pas_temps)
+            durée = np.full(len(indices), pas_temps)
+            pas_total += len(indices)
+            arrêt = np.zeros(len(indices), dtype=bool)
+
+            impact = nouvel[1] < 0
+            if impact.any():
+                avant, après = état[:, impact], nouvel[:, impact]
+                θ = avant[1] / (avant[1] - après[1])
+                lancers = indices[impact]
+                point = rebondir(avant + θ * (après - avant), restitution[lancers], frottement[lancers])
+                durée[impact] = θ * pas_temps
+                nb_rebonds[lancers] += 1
+
+                # Fin des rebonds : roulement jusqu'à l'arrêt
+                fin = (point[3] < vitesse_min) | ((θ == 0) & (point[3] < gravité * pas_temps)) \
+                    | (nb_rebonds[lancers] >= rebonds_max)
+                décélération = roulement[lancers] * gravité
+                roule = fin & (décélération > 0)
+                vx = point[2]
+                point[0, roule] += np.sign(vx[roule]) * vx[roule]**2 / (2 * décélération[roule])
+                durée[np.flatnonzero(impact)[roule]] += np.abs(vx[roule]) / décélération[roule]
+                point[2:, fin] = 0
+                point[1, fin] = 0
+                nouvel[:, impact] = point
+                arrêt[impact] = fin
+
+            état = nouvel
+            temps += durée
+            distance_max[indices] = np.maximum(distance_max[indices], état[0])
+            hauteur_max[indices] = np.maximum(hauteur_max[indices], état[1])
+            temps_arret[indices[arrêt]] = temps[arrêt]
+            for chemin, ligne in zip(chemins, (0, 1)):
+                rang = np.full(n, np.nan)
+                rang[indices] = état[ligne]
+                chemin.append(rang)
+
+            # Lancers arrêtés ou hors délai retirés du lot
+            restants = ~arrêt & (temps < temps_max)
+            if not restants.all():
+                indices, état, temps = indices[restants], état[:, restants], temps[restants]
+                modèle = modèle_projectile_lot(resistance_sur_masse[indices], gravité)
+
+    compter("simulation.lancers", n)
+    compter("simulation.pas", pas_total)
+    compter("simulation.evaluations", pas_total * EVALUATIONS_PAR_PAS[méthode])
+    compter("simulation.rebonds", int(nb_rebonds.sum()))
+    if trajectoires:
+        return distance_max, hauteur_max, nb_rebonds, temps_arret, np.array(chemins[0]), np.array(chemins[1])
+    return distance_max, hauteur_max, nb_rebonds, temps_arret
+
+
+# Méthode "auto" : RK4 pour les lancers peu freinés, pas semi-implicite pour les lancers raides
+# (petits projectiles légers), chaque sous-lot restant vectorisé
+def simuler_lot_auto(vitesses, angles_deg, masses, rayons, pas_temps=PAS_TEMPS, temps_max=TEMPS_MAX,
+                     trajectoires=False, gravité=GRAVITE, masse_volumique_air=MASSE_VOLUMIQUE_AIR,
+                     coefficient_trainee=COEFFICIENT_TRAINEE, terrain=None):
+    vitesses, angles_deg, masses, rayons = np.broadcast_arrays(*(np.asarray(c, dtype=float).ravel()
+                                                                 for c in (vitesses, angles_deg, masses, rayons)))
+    resistance_sur_masse = coefficient_resistance(rayons, masse_volumique_air, coefficient_trainee) / masses
+    raides = lancers_raides(vitesses, resistance_sur_masse, pas_temps, gravité)
+    options = dict(pas_temps=pas_temps, temps_max=temps_max, trajectoires=trajectoires, gravité=gravité,
+                   masse_volumique_air=masse_volumique_air, coefficient_trainee=coefficient_trainee,
+                   terrain=terrain)
+    if raides.all() or not raides.any():
+        return simuler_lot(vitesses, angles_deg, masses, rayons,
+                           méthode="semi_implicite" if raides.all() else "rk4", **options)
+
+    n = len(vitesses)
+    sous_lots = (~raides, raides)
+    resultats = [simuler_lot(vitesses[sous_lot], angles_deg[sous_lot], masses[sous_lot], rayons[sous_lot],
+                             méthode=méthode, **options)
+                 for sous_lot, méthode in zip(sous_lots, ("rk4", "semi_implicite"))]
+    distance_max, hauteur_max = np.empty(n), np.empty(n)
+    for sous_lot, resultat in zip(sous_lots, resultats):
+        distance_max[sous_lot], hauteur_max[sous_lot] = resultat[0], resultat[1]
+    if not trajectoires:
+        return distance_max, hauteur_max
+    longueur = max(len(resultat[2]) for resultat in resultats)
+    xs, ys = np.full((longueur, n), np.nan), np.full((longueur, n), np.nan)
+    for sous_lot, resultat in zip(sous_lots, resultats):
+        xs[:len(resultat[2]), sous_lot] = resultat[2]
+        ys[:len(resultat[3]), sous_lot] = resultat[3]
+    return distance_max, hauteur_max, xs, ys
+
+
+# Simulation d'un seul lancer : renvoie (distance_max, hauteur_max, x, y) comme simuler_projectile.
+# Cas des scripts (RK4 ou Euler, sans atmosphère ni terrain) : boucle des scripts sur un état (4,),
+# environ trois fois plus rapide qu'un lot de taille 1 ; mêmes pas et même arrêt au sol que simuler_lot.
+def simuler(vitesse, angle_deg, masse, rayon, pas_temps=PAS_TEMPS, temps_max=TEMPS_MAX, gravité=GRAVITE,
+            masse_volumique_air=MASSE_VOLUMIQUE_AIR, coefficient_trainee=COEFFICIENT_TRAINEE, méthode="rk4",
+            **options):
+    if options or méthode not in ("rk4", "euler"):
+        distance_max, hauteur_max, xs, ys = simuler_lot(
+            [vitesse], [angle_deg], [masse], [rayon], pas_temps, temps_max, trajectoires=True, gravité=gravité,
+            masse_volumique_air=masse_volumique_air, coefficient_trainee=coefficient_trainee, méthode=méthode,
+            **options)
+        x = xs[:, 0][~np.isnan(xs[:, 0])]
+        y = ys[:, 0][~np.isnan(ys[:, 0])]
+        return float(distance_max[0]), float(hauteur_max[0]), x, y
+
+    pas = INTEGRATEURS[méthode]
+    resistance_sur_masse = float(coefficient_resistance(rayon, masse_volumique_air, coefficient_trainee)) / masse
+    modèle = modèle_projectile(resistance_sur_masse, gravité)
+    steps = int(temps_max / pas_temps)
+    temps = np.linspace(0, temps_max, steps)
+    états = np.zeros((steps, 4))
+    états[0] = état_initial_lot([vitesse], [angle_deg])[:, 0]
+    i = 0
+    with chrono("simulation.integration"):
+        for i in range(1, steps):
+            états[i] = pas(modèle, temps[i-1], états[i-1], pas_temps)
+            if états[i, 1] < 0:
+                états[i, 1] = 0
+                break
+    compter("simulation.lancers", 1)
+    compter("simulation.pas", i)
+    compter("simulation.evaluations", i * EVALUATIONS_PAR_PAS[méthode])
+    x, y = états[:i+1, 0], états[:i+1, 1]
+    return float(x.max()), float(y.max()), x, y
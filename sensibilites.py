@@ -0,0 +1,145 @@
+import numpy as np
+
+import moteur
+
+# Paramètres dont on calcule les dérivées (angle en degrés, comme en entrée)
+PARAMETRES = ("vitesse", "angle", "masse", "rayon", "coefficient_trainee", "masse_volumique_air", "gravité")
+
+
+# Directions de base intégrées : conditions initiales (vx0, vy0), k = résistance/masse et gravité.
+# masse, rayon, coefficient_trainee et masse_volumique_air n'agissent qu'à travers k :
+# leurs dérivées s'en déduisent en fin de calcul, sans équation supplémentaire.
+DIRECTIONS = ("vx0", "vy0", "k", "gravité")
+
+
+# Modèle étendu : état (x, y, vx, vy) suivi des sensibilités S = d(état)/d(direction), rangées (4, D, n).
+# Équations variationnelles : dS/dt = J(état) S + ∂f/∂p, intégrées dans le même pas RK4 que l'état.
+def modèle_variationnel(resistance_sur_masse, gravité):
+    nb_directions = len(DIRECTIONS)
+    i_k, i_g = DIRECTIONS.index("k"), DIRECTIONS.index("gravité")
+
+    def modèle(t, état):
+        vx, vy = état[2], état[3]
+        S = état[4:].reshape(4, nb_directions, -1)
+        vitesse = np.sqrt(vx**2 + vy**2)
+        vitesse_sure = np.where(vitesse > 0, vitesse, 1.0)
+        traînée_x = resistance_sur_masse * vx * vitesse
+        traînée_y = resistance_sur_masse * vy * vitesse
+        # Jacobienne de la traînée -k v |v| par rapport à (vx, vy)
+        j_xx = -resistance_sur_masse * (vitesse + vx * vx / vitesse_sure)
+        j_xy = -resistance_sur_masse * vx * vy / vitesse_sure
+        j_yy = -resistance_sur_masse * (vitesse + vy * vy / vitesse_sure)
+        dérivée = np.empty_like(état)
+        dérivée[0] = vx
+        dérivée[1] = vy
+        dérivée[2] = -traînée_x
+        dérivée[3] = -gravité - traînée_y
+        dS = dérivée[4:].reshape(4, nb_directions, -1)
+        dS[0] = S[2]
+        dS[1] = S[3]
+        dS[2] = j_xx * S[2] + j_xy * S[3]
+        dS[3] = j_xy * S[2] + j_yy * S[3]
+        # ∂f/∂k = -v |v| (écrit sans diviser par k, nul pour un rayon nul)
+        dS[2, i_k] -= vx * vitesse
+        dS[3, i_k] -= vy * vitesse
+        dS[3, i_g] -= 1.0
+        return dérivée
+    return modèle
+
+
+# Dérivée de a + θ (b - a) avec θ = u0 / (u0 - u1) : valeur interpolée là où u s'annule
+def derivee_interpolation(a0, a1, u0, u1, da0, da1, du0, du1):
+    θ = u0 / (u0 - u1)
+    dθ = (u0 * du1 - u1 * du0) / (u0 - u1)**2
+    return da0 + θ * (da1 - da0) + dθ * (a1 - a0)
+
+
+# Portée et hauteur maximale d'un lot de lancers avec leurs gradients, à peu près au coût d'une
+# intégration étendue (quatre directions de sensibilité au lieu de deux intégrations par paramètre).
+# La portée est prise à l'impact interpolé (y = 0) et la hauteur au sommet interpolé (vy = 0), et non
+# au premier pas sous le sol : ces valeurs sont dérivables, et les gradients renvoyés sont ceux,
+# exacts, des valeurs calculées.
+# Renvoie distance, hauteur (n,) et gradients (P, n) dans l'ordre de PARAMETRES ; un lancer qui n'a pas
+# atteint le sol (ou son sommet) avant temps_max a distance (ou hauteur) et gradients à NaN.
+def simuler_lot_sensibilites(vitesses, angles_deg, masses, rayons, pas_temps=moteur.PAS_TEMPS,
+                             temps_max=moteur.TEMPS_MAX, gravité=moteur.GRAVITE,
+                             masse_volumique_air=moteur.MASSE_VOLUMIQUE_AIR,
+                             coefficient_trainee=moteur.COEFFICIENT_TRAINEE):
+    vitesses, angles_deg, masses, rayons = np.broadcast_arrays(*(np.asarray(c, dtype=float).ravel()
+                                                                 for c in (vitesses, angles_deg, masses, rayons)))
+    n, nb_directions = len(vitesses), len(DIRECTIONS)
+    k = moteur.coefficient_resistance(rayons, masse_volumique_air, coefficient_trainee) / masses
+    modèle = modèle_variationnel(k, gravité)
+
+    état = np.zeros((4 + 4 * nb_directions, n))
+    état[:4] = moteur.état_initial_lot(vitesses, angles_deg)
+    S = état[4:].reshape(4, nb_directions, n)
+    S[2, DIRECTIONS.index("vx0")] = 1.0
+    S[3, DIRECTIONS.index("vy0")] = 1.0
+
+    distance, hauteur = np.full(n, np.nan), np.full(n, np.nan)
+    d_distance, d_hauteur = np.full((nb_directions, n), np.nan), np.full((nb_directions, n), np.nan)
+    actifs = np.ones(n, dtype=bool)
+    montée = état[3] > 0
+    for i in range(1, int(temps_max / pas_temps)):
+        nouvel = moteur.pas_rk4(modèle, (i - 1) * pas_temps, état, pas_temps)
+
+        # Sommet : vy change de signe pendant le pas ; H = y0 + vy0 θ h / 2 (vy linéaire sur le pas)
+        sommet = actifs & montée & (nouvel[3] <= 0)
+        if sommet.any():
+            avant, après = état[:, sommet], nouvel[:, sommet]
+            S0, S1 = avant[4:].reshape(4, nb_directions, -1), après[4:].reshape(4, nb_directions, -1)
+            θ = avant[3] / (avant[3] - après[3])
+            dθ = (avant[3] * S1[3] - après[3] * S0[3]) / (avant[3] - après[3])**2
+            hauteur[sommet] = avant[1] + avant[3] * θ * pas_temps / 2
+            d_hauteur[:, sommet] = S0[1] + (S0[3] * θ + avant[3] * dθ) * pas_temps / 2
+            montée &= ~sommet
+
+        # Impact : y passe sous 0 pendant le pas, x interpolé linéairement
+        impact = actifs & (nouvel[1] < 0)
+        if impact.any():
+            avant, après = état[:, impact], nouvel[:, impact]
+            S0, S1 = avant[4:].reshape(4, nb_directions, -1), après[4:].reshape(4, nb_directions, -1)
+            θ = avant[1] / (avant[1] - après[1])
+            distance[impact] = avant[0] + θ * (après[0] - avant[0])
+            d_distance[:, impact] = derivee_interpolation(avant[0], après[0], avant[1], après[1],
+                                                          S0[0], S1[0], S0[1], S1[1])
+            actifs &= ~impact
+
+        état = np.where(actifs, nouvel, état)
+        if not actifs.any():
+            break
+
+    return distance, hauteur, vers_parametres(d_distance, vitesses, angles_deg, masses, rayons, k,
+                                              masse_volumique_air, coefficient_trainee), \
+        vers_parametres(d_hauteur, vitesses, angles_deg, masses, rayons, k, masse_volumique_air, coefficient_trainee)
+
+
+# Règle de la chaîne : dérivées selon les directions de base -> dérivées selon PARAMETRES.
+# k = c ρ Cd r² / m : les dérivées de k sont écrites sans division par k, r, Cd ou ρ (nuls admis).
+def vers_parametres(d, vitesses, angles_deg, masses, rayons, k, masse_volumique_air, coefficient_trainee):
+    d_vx0, d_vy0, d_k, d_gravité = (d[DIRECTIONS.index(nom)] for nom in DIRECTIONS)
+    c = moteur.coefficient_resistance(1.0, 1.0, 1.0)
+    angles_rad = np.radians(angles_deg)
+    cos, sin = np.cos(angles_rad), np.sin(angles_rad)
+    return np.stack([
+        cos * d_vx0 + sin * d_vy0,                                    # vitesse
+        vitesses * (cos * d_vy0 - sin * d_vx0) * np.pi / 180,         # angle (par degré)
+        -k / masses * d_k,                                            # masse
+        2 * c * masse_volumique_air * coefficient_trainee * rayons / masses * d_k,   # rayon
+        c * masse_volumique_air * rayons**2 / masses * d_k,                          # coefficient_trainee
+        c * coefficient_trainee * rayons**2 / masses * d_k,                          # masse_volumique_air
+        d_gravité,                                                    # gravité
+    ])
+
+
+# Gradients d'un seul lancer sous forme de dictionnaires {paramètre: dérivée}
+# (ValueError si le lancer n'a pas atteint le sol avant temps_max)
+def sensibilites(vitesse, angle_deg, masse, rayon, **options):
+    distance, hauteur, gradient_distance, gradient_hauteur = simuler_lot_sensibilites(
+        [vitesse], [angle_deg], [masse], [rayon], **options)
+    if np.isnan(distance[0]) or np.isnan(hauteur[0]):
+        raise ValueError("le lancer n'atteint pas le sol avant temps_max : portée et gradients indéfinis")
+    return (float(distance[0]), float(hauteur[0]),
+            dict(zip(PARAMETRES, gradient_distance[:, 0].tolist())),
+            dict(zip(PARAMETRES, gradient_hauteur[:, 0].tolist())))
@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from bdd import enregistrer_simulations, initialiser_bdd, obtenir_historique
+from atmosphere import TABLES_CONDITIONS, charger_condition
+from moteur import simuler_lot, simuler_lot_3d
+from sensibilites import sensibilites
+
+# Durée pendant laquelle les requêtes simultanées sont regroupées en un seul lot (s)
+FENETRE_REGROUPEMENT = 0.002
+TAILLE_MAX_LOT = 4096
+TAILLE_MAX_BALAYAGE = 100000
+
+RAISONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+# Regroupe les requêtes /simuler arrivées dans la même fenêtre en une intégration vectorisée
+class Regroupeur:
+    def __init__(self, bdd, fenetre=FENETRE_REGROUPEMENT, taille_max=TAILLE_MAX_LOT):
+        self.bdd = bdd
+        self.fenetre = fenetre
+        self.taille_max = taille_max
+        self.file = asyncio.Queue()
+        self.nb_lots = 0
+        self.nb_requetes = 0
+
+    async def simuler(self, parametres):
+        futur = asyncio.get_running_loop().create_future()
+        await self.file.put((parametres, futur))
+        return await futur
+
+    async def boucle(self):
+        while True:
+            lot = [await self.file.get()]
+            await asyncio.sleep(self.fenetre)
+            while len(lot) < self.taille_max and not self.file.empty():
+                lot.append(self.file.get_nowait())
+            await self.traiter(lot)
+
+    async def traiter(self, lot):
+        boucle = asyncio.get_running_loop()
+        parametres = [p for p, _ in lot]
+        try:
+            colonnes = [np.array([p[c] for p in parametres], dtype=float)
+                        for c in ("vitesse", "angle", "masse", "rayon")]
+            distances, hauteurs = await boucle.run_in_executor(None, simuler_lot, *colonnes)
+            a_enregistrer = [(p["vitesse"], p["angle"], p["masse"], p["rayon"], float(d), float(h), None)
+                             for p, d, h in zip(parametres, distances, hauteurs) if p["enregistrer"]]
+            if a_enregistrer:
+                await boucle.run_in_executor(None, enregistrer_simulations, a_enregistrer, self.bdd)
+        except Exception as e:
+            for _, futur in lot:
+                futur.set_exception(e)
+            return
+        self.nb_lots += 1
+        self.nb_requetes += len(lot)
+        for (_, futur), d, h in zip(lot, distances, hauteurs):
+            futur.set_result({"distance_max": float(d), "hauteur_max": float(h)})
+
+
+def lire_parametres(corps):
+    donnees = json.loads(corps or b"{}")
+    parametres = {cle: float(donnees[cle]) for cle in ("vitesse", "angle", "masse", "rayon")}
+    if parametres["masse"] <= 0 or parametres["rayon"] < 0:
+        raise ValueError("masse doit être > 0 et rayon >= 0")
+    parametres["enregistrer"] = bool(donnees.get("enregistrer", True))
+    return parametres
+
+
+class Service:
+    def __init__(self, bdd="simulations.db", fenetre=FENETRE_REGROUPEMENT):
+        self.bdd = bdd
+        self.regroupeur = Regroupeur(bdd, fenetre)
+
+    async def router(self, methode, chemin, corps):
+        url = urlsplit(chemin)
+        boucle = asyncio.get_running_loop()
+        if methode == "POST" and url.path == "/simuler":
+            return 200, await self.regroupeur.simuler(lire_parametres(corps))
+        if methode == "POST" and url.path == "/balayage":
+            donnees = json.loads(corps or b"{}")
+            vitesses, angles = np.meshgrid(np.asarray(donnees["vitesses"], dtype=float),
+                                           np.asarray(donnees["angles"], dtype=float), indexing="ij")
+            if vitesses.size > TAILLE_MAX_BALAYAGE:
+                raise ValueError(f"balayage limité à {TAILLE_MAX_BALAYAGE} lancers")
+            condition = None
+            if donnees.get("condition_id") is not None:
+                table = donnees.get("table_conditions", "conditions")
+                if table not in TABLES_CONDITIONS:
+                    raise ValueError(f"table_conditions doit être l'une de : {', '.join(sorted(TABLES_CONDITIONS))}")
+                condition = await boucle.run_in_executor(None, charger_condition, int(donnees["condition_id"]),
+                                                         self.bdd, table)
+            # Avec une condition (vent possiblement traversier) : moteur 3-D et déviation latérale
+            if condition is not None:
+                distances, hauteurs, deviations = await boucle.run_in_executor(
+                    None, partial(simuler_lot_3d, vitesses.ravel(), angles.ravel(), float(donnees["masse"]),
+                                  float(donnees["rayon"]), azimuts_deg=float(donnees.get("azimut", 0)),
+                                  **condition))
+            else:
+                distances, hauteurs = await boucle.run_in_executor(
+                    None, simuler_lot, vitesses.ravel(), angles.ravel(), float(donnees["masse"]), float(donnees["rayon"]))
+                deviations = None
+            resultats = [{"vitesse": float(v), "angle": float(a), "distance_max": float(d), "hauteur_max": float(h)}
+                         for v, a, d, h in zip(vitesses.ravel(), angles.ravel(), distances, hauteurs)]
+            if deviations is not None:
+                for resultat, deviation in zip(resultats, deviations):
+                    resultat["deviation_laterale"] = float(deviation)
+            if donnees.get("enregistrer", False):
+                await boucle.run_in_executor(None, enregistrer_simulations, [
+                    (r["vitesse"], r["angle"], float(donnees["masse"]), float(donnees["rayon"]),
+                     r["distance_max"], r["hauteur_max"], None) for r in resultats], self.bdd)
+            return 200, resultats
+        if methode == "POST" and url.path == "/sensibilites":
+            p = lire_parametres(corps)
+            distance, hauteur, gradient_distance, gradient_hauteur = await boucle.run_in_executor(
+                None, sensibilites, p["vitesse"], p["angle"], p["masse"], p["rayon"])
+            return 200, {"distance": distance, "hauteur": hauteur,
+                         "gradient_distance": gradient_distance, "gradient_hauteur": gradient_hauteur}
+        if methode == "GET" and url.path == "/historique":
+            limite = int(parse_qs(url.query).get("limite", ["100"])[0])
+            lignes = await boucle.run_in_executor(None, obtenir_historique, limite, self.bdd)
+            colonnes = ["id", "vitesse_initiale", "angle_deg", "masse", "rayon",
+                        "date_simulation", "distance_max", "hauteur_max"]
+            return 200, [dict(zip(colonnes, ligne)) for ligne in lignes]
+        if methode == "GET" and url.path == "/statistiques":
+            lots = self.regroupeur.nb_lots
+            return 200, {"lots": lots, "requetes": self.regroupeur.nb_requetes,
+                         "taille_moyenne_lot": self.regroupeur.nb_requetes / lots if lots else 0}
+        return 404, {"erreur": f"{methode} {url.path} inconnu"}
+
+    async def traiter_connexion(self, lecteur, ecrivain):
+        try:
+            while True:
+                ligne = await lecteur.readline()
+                if not ligne.strip():
+                    break
+                methode, chemin, _ = ligne.decode("latin-1").split(" ", 2)
+                entetes = {}
+                while True:
+                    ligne = await lecteur.readline()
+                    if ligne in (b"\r\n", b"\n", b""):
+                        break
+                    cle, valeur = ligne.decode("latin-1").split(":", 1)
+                    entetes[cle.strip().lower()] = valeur.strip()
+                corps = await lecteur.readexactly(int(entetes.get("content-length", 0)))
+                try:
+                    statut, reponse = await self.router(methode, chemin, corps)
+                except KeyError as e:
+                    statut, reponse = 400, {"erreur": f"paramètre manquant : {e}"}
+                except (ValueError, TypeError) as e:
+                    statut, reponse = 400, {"erreur": str(e)}
+                except Exception as e:
+                    statut, reponse = 500, {"erreur": str(e)}
+                donnees = json.dumps(reponse).encode()
+                ecrivain.write(f"HTTP/1.1 {statut} {RAISONS[statut]}\r\nContent-Type: application/json\r\n"
+                               f"Content-Length: {len(donnees)}\r\n\r\n".encode() + donnees)
+                await ecrivain.drain()
+                if entetes.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            ecrivain.close()
+
+    async def servir(self, hote, port):
+        initialiser_bdd(self.bdd)
+        tache = asyncio.create_task(self.regroupeur.boucle())
+        serveur = await asyncio.start_server(self.traiter_connexion, hote, port)
+        print(f"Service de simulation sur http://{hote}:{port}")
+        try:
+            async with serveur:
+                await serveur.serve_forever()
+        finally:
+            tache.cancel()
+
+
+# Générateur de charge local : connexions persistantes, latences p50/p99 et débit
+async def generer_charge(hote, port, requetes, concurrence, enregistrer=False):
+    rng = np.random.default_rng(0)
+    latences = []
+    restantes = [requetes]
+
+    async def client():
+        lecteur, ecrivain = await asyncio.open_connection(hote, port)
+        try:
+            while restantes[0] > 0:
+                restantes[0] -= 1
+                corps = json.dumps({"vitesse": rng.uniform(5, 100), "angle": rng.uniform(5, 85),
+                                    "masse": rng.uniform(0.1, 5), "rayon": rng.uniform(0.01, 0.3),
+                                    "enregistrer": enregistrer}).encode()
+                debut = time.perf_counter()
+                ecrivain.write(f"POST /simuler HTTP/1.1\r\nHost: {hote}\r\nContent-Type: application/json\r\n"
+                               f"Content-Length: {len(corps)}\r\n\r\n".encode() + corps)
+                await ecrivain.drain()
+                longueur = 0
+                statut = (await lecteur.readline()).split(b" ")[1]
+                while True:
+                    ligne = await lecteur.readline()
+                    if ligne in (b"\r\n", b""):
+                        break
+                    if ligne.lower().startswith(b"content-length:"):
+                        longueur = int(ligne.split(b":")[1])
+                await lecteur.readexactly(longueur)
+                if statut != b"200":
+                    raise RuntimeError(f"Réponse HTTP {statut.decode()}")
+                latences.append(time.perf_counter() - debut)
+        finally:
+            ecrivain.close()
+
+    debut = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrence)))
+    duree = time.perf_counter() - debut
+    latences_ms = np.array(latences) * 1000
+    return {"requetes": len(latences), "duree_s": duree, "debit_req_s": len(latences) / duree,
+            "p50_ms": float(np.percentile(latences_ms, 50)), "p99_ms": float(np.percentile(latences_ms, 99))}
+
+
+async def attendre_port(hote, port, delai=10):
+    echeance = time.monotonic() + delai
+    while True:
+        try:
+            _, ecrivain = await asyncio.open_connection(hote, port)
+            ecrivain.close()
+            return
+        except OSError:
+            if time.monotonic() > echeance:
+                raise
+            await asyncio.sleep(0.05)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON local de simulation")
+    sous = parser.add_subparsers(dest="commande", required=True)
+    p_serveur = sous.add_parser("serveur", help="Démarrer le service")
+    p_charge = sous.add_parser("charge", help="Mesurer latences et débit du service")
+    for p in (p_serveur, p_charge):
+        p.add_argument("--hote", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8765)
+    p_serveur.add_argument("--bdd", default="simulations.db")
+    p_serveur.add_argument("--fenetre", type=float, default=FENETRE_REGROUPEMENT,
+                           help="Fenêtre de regroupement des requêtes (s)")
+    p_charge.add_argument("--requetes", type=int, default=2000)
+    p_charge.add_argument("--concurrence", type=int, default=32)
+    p_charge.add_argument("--enregistrer", action="store_true", help="Enregistrer les lancers en base")
+    p_charge.add_argument("--demarrer", action="store_true", help="Démarrer un serveur local le temps de la mesure")
+    args = parser.parse_args(argv)
+
+    if args.commande == "serveur":
+        try:
+            asyncio.run(Service(args.bdd, args.fenetre).servir(args.hote, args.port))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    processus = None
+    if args.demarrer:
+        processus = subprocess.Popen([sys.executable, __file__, "serveur", "--hote", args.hote,
+                                      "--port", str(args.port)], stdout=subprocess.DEVNULL)
+    try:
+        if processus:
+            asyncio.run(attendre_port(args.hote, args.port))
+        resultats = asyncio.run(generer_charge(args.hote, args.port, args.requetes, args.concurrence,
+                                               args.enregistrer))
+    finally:
+        if processus:
+            processus.terminate()
+            processus.wait()
+    print(f"{resultats['requetes']} requêtes en {resultats['duree_s']:.2f} s : "
+          f"{resultats['debit_req_s']:.0f} req/s, p50 = {resultats['p50_ms']:.1f} ms, "
+          f"p99 = {resultats['p99_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,16 @@
-import numpy as np
-import matplotlib.pyplot as plt
 import sqlite3
+import time
 from datetime import datetime
-import tkinter as tk
-from tkinter import messagebox, ttk
-
-# Fonction pour initialiser la base de données
+import bdd
+import moteur
+from atmosphere import charger_condition
+from instrumentation import chrono, demarrer
+from journal import demarrer_journal, journaliser
+import memoire
+
+# Fonction pour initialiser la base de données (schéma partagé, voir bdd.py)
 def initialiser_bdd():
-    connexion = sqlite3.connect("simulations.db")
-    curseur = connexion.cursor()
-
-    # Table utilisateur
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS utilisateur (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nom TEXT NOT NULL,
-            email TEXT UNIQUE
-        )
-    """)
-
-    # Table projectile
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS projectile (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nom TEXT NOT NULL,
-            masse REAL,
-            rayon REAL
-        )
-    """)
-
-    # Table conditions
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS conditions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            gravite REAL,
-            masse_volumique_air REAL,
-            coefficient_trainee REAL
-        )
-    """)
-
-    # Table session
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS session (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            utilisateur_id INTEGER,
-            date_session TEXT,
-            FOREIGN KEY(utilisateur_id) REFERENCES utilisateur(id)
-        )
-    """)
-
-    # Table simulation
-    curseur.execute("""
-        CREATE TABLE IF NOT EXISTS simulation (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            vitesse_initiale REAL,
-            angle_deg REAL,
-            masse REAL,
-            rayon REAL,
-            date_simulation TEXT,
-            distance_max REAL,
-            hauteur_max REAL,
-            session_id INTEGER,
-            FOREIGN KEY(session_id) REFERENCES session(id)
-        )
-    """)
-
-    connexion.commit()
-    connexion.close()
+    bdd.initialiser_bdd("simulations.db")
 
 # Fonction pour ajouter un utilisateur de test
 def ajouter_utilisateur_test():
@@ -92,26 +36,72 @@ def ajouter_conditions_test():
     connexion.commit()
     connexion.close()
 
-# Fonction RK4
-def pas_rk4(fonction, t, etat, pas_temps):
-    k1 = fonction(t, etat)
-    k2 = fonction(t + pas_temps/2, etat + pas_temps/2 * k1)
-    k3 = fonction(t + pas_temps/2, etat + pas_temps/2 * k2)
-    k4 = fonction(t + pas_temps, etat + pas_temps * k3)
-    return etat + pas_temps/6 * (k1 + 2*k2 + 2*k3 + k4)
-
-# Modèle physique du projectile
-def modele_projectile(t, etat, masse):
-    x, y, vx, vy = etat
-    vitesse = np.sqrt(vx**2 + vy**2)
-    dxdt = vx
-    dydt = vy
-    dvxdt = -(coeff_resistance / masse) * vx * vitesse
-    dvydt = -gravite - (coeff_resistance / masse) * vy * vitesse
-    return np.array([dxdt, dydt, dvxdt, dvydt])
+# Connexion persistante de l'interface
+connexion_bdd = None
+
+# Cache des données de référence (projectiles, conditions, utilisateurs)
+cache_reference = {"data_version": None, "version": None}
+
+# Compteur de version des données de référence, incrémenté par déclencheur à chaque modification de
+# projectile, conditions ou utilisateur (quelle que soit la connexion). Les écritures de logs et de
+# simulation, fréquentes, ne le touchent pas.
+SCHEMA_VERSION_REFERENCE = [
+    "CREATE TABLE IF NOT EXISTS reference_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO reference_version (id, version) VALUES (1, 0)",
+] + [f"CREATE TRIGGER IF NOT EXISTS {table}_version_{operation.lower()} AFTER {operation} ON {table} "
+     f"BEGIN UPDATE reference_version SET version = version + 1 WHERE id = 1; END"
+     for table in ("projectile", "conditions", "utilisateur") for operation in ("INSERT", "UPDATE", "DELETE")]
+
+def obtenir_connexion():
+    global connexion_bdd
+    if connexion_bdd is None:
+        connexion_bdd = sqlite3.connect("simulations.db")
+        with connexion_bdd:
+            for instruction in SCHEMA_VERSION_REFERENCE:
+                connexion_bdd.execute(instruction)
+    return connexion_bdd
+
+# Fonction pour (re)charger le cache si les données de référence ont changé : PRAGMA data_version
+# (sans lecture du fichier) écarte le cas courant où rien n'a été écrit, puis le compteur de
+# reference_version décide (une écriture de logs ou de simulation ne recharge rien). Cette connexion
+# n'écrit que session et simulation : ses propres écritures n'ont pas à changer data_version.
+def charger_reference():
+    connexion = obtenir_connexion()
+    data_version = connexion.execute("PRAGMA data_version").fetchone()[0]
+    if cache_reference["data_version"] == data_version:
+        return False
+    cache_reference["data_version"] = data_version
+    version = connexion.execute("SELECT version FROM reference_version WHERE id = 1").fetchone()[0]
+    if cache_reference["version"] == version:
+        return False
+    cache_reference["projectiles"] = {ligne[0]: ligne[1:] for ligne in connexion.execute(
+        "SELECT id, nom, masse, rayon FROM projectile ORDER BY id")}
+    # Conditions sous forme d'options du moteur (atmosphère, gravité, coefficient de traînée)
+    cache_reference["conditions"] = {ligne[0]: charger_condition(ligne[0], "simulations.db") for ligne in connexion.execute(
+        "SELECT id FROM conditions ORDER BY id").fetchall()}
+    cache_reference["utilisateurs"] = {ligne[0]: ligne[1:] for ligne in connexion.execute(
+        "SELECT id, nom FROM utilisateur ORDER BY id")}
+    cache_reference["version"] = version
+    return True
+
+# Fonction pour mettre à jour les listes déroulantes à partir du cache
+def rafraichir_listes():
+    global utilisateurs_ids, projectiles_ids
+    if not charger_reference() and combo_utilisateur["values"]:
+        return
+    utilisateurs_ids = list(cache_reference["utilisateurs"])
+    projectiles_ids = list(cache_reference["projectiles"])
+    combo_utilisateur["values"] = [u[0] for u in cache_reference["utilisateurs"].values()]
+    combo_projectile["values"] = [p[0] for p in cache_reference["projectiles"].values()]
 
 # Lancer simulation
 def lancer_simulation():
+    import matplotlib.pyplot as plt
+    from tkinter import messagebox
+
+    # Latence perçue : du clic jusqu'à l'affichage des résultats
+    rappel = demarrer("tk.lancer_simulation")
+    debut = time.perf_counter()
     try:
         utilisateur_id = utilisateurs_ids[combo_utilisateur.current()]
         projectile_id = projectiles_ids[combo_projectile.current()]
@@ -119,130 +109,101 @@ def lancer_simulation():
         vitesse_initiale = float(entry_vitesse.get())
         angle_deg = float(entry_angle.get())
 
-        # Récupérer projectile choisi
-        connexion = sqlite3.connect("simulations.db")
-        curseur = connexion.cursor()
-        curseur.execute("SELECT masse, rayon FROM projectile WHERE id = ?", (projectile_id,))
-        masse_projectile, rayon_projectile = curseur.fetchone()
-
-        # Récupérer conditions environnementales
-        curseur.execute("SELECT gravite, masse_volumique_air, coefficient_trainee FROM conditions WHERE id = 1")
-        global gravite, masse_volumique_air, coefficient_trainee
-        gravite, masse_volumique_air, coefficient_trainee = curseur.fetchone()
-
-        connexion.commit()
-        connexion.close()
-
-        # Créer une session
-        connexion = sqlite3.connect("simulations.db")
-        curseur = connexion.cursor()
+        # Données de référence lues dans le cache (aucune requête si la base n'a pas changé)
+        rafraichir_listes()
+        _, masse_projectile, rayon_projectile = cache_reference["projectiles"][projectile_id]
+        condition_id = 1
+        options = cache_reference["conditions"][condition_id]
         date_now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        curseur.execute("INSERT INTO session (utilisateur_id, date_session) VALUES (?, ?)", (utilisateur_id, date_now))
-        session_id = curseur.lastrowid
-        connexion.commit()
-        connexion.close()
-
-        # Préparation de la simulation
-        angle_rad = np.radians(angle_deg)
-        section_transversale = np.pi * rayon_projectile**2
-        global coeff_resistance
-        coeff_resistance = 0.5 * masse_volumique_air * coefficient_trainee * section_transversale
-        vx0 = vitesse_initiale * np.cos(angle_rad)
-        vy0 = vitesse_initiale * np.sin(angle_rad)
-        etat_initial = np.array([0, 0, vx0, vy0])
-
-        pas_temps = 0.01
-        temps_max = 10
-        steps = int(temps_max / pas_temps)
-        temps = np.linspace(0, temps_max, steps)
-        etats = np.zeros((steps, 4))
-        etats[0] = etat_initial
-
-        for i in range(1, steps):
-            etats[i] = pas_rk4(lambda t, e: modele_projectile(t, e, masse_projectile), temps[i-1], etats[i-1], pas_temps)
-            if etats[i, 1] < 0:
-                etats[i, 1] = 0
-                break
-
-        x = etats[:i+1, 0]
-        y = etats[:i+1, 1]
-        distance_max = max(x)
-        hauteur_max = max(y)
-
-        # Enregistrement simulation
-        connexion = sqlite3.connect("simulations.db")
-        curseur = connexion.cursor()
-        curseur.execute("""
-            INSERT INTO simulation (vitesse_initiale, angle_deg, masse, rayon, date_simulation, distance_max, hauteur_max, session_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (vitesse_initiale, angle_deg, masse_projectile, rayon_projectile, date_now, distance_max, hauteur_max, session_id))
-        connexion.commit()
-        connexion.close()
-
+        journaliser("simulation.lancement", utilisateur_id=utilisateur_id, projectile_id=projectile_id,
+                    vitesse=vitesse_initiale, angle=angle_deg)
+
+        # Simulation (moteur.py : RK4, pas de 0.01 s, arrêt au sol) dans la condition enregistrée
+        distance_max, hauteur_max, x, y = moteur.simuler(vitesse_initiale, angle_deg, masse_projectile, rayon_projectile,
+                                                         **options)
+
+        # Enregistrement session + simulation : une seule transaction
+        connexion = obtenir_connexion()
+        with chrono("bdd.enregistrement"), connexion:
+            curseur = connexion.execute("INSERT INTO session (utilisateur_id, date_session) VALUES (?, ?)",
+                                        (utilisateur_id, date_now))
+            session_id = curseur.lastrowid
+            simulation_id = connexion.execute("""
+                INSERT INTO simulation (vitesse_initiale, angle_deg, masse, rayon, date_simulation, distance_max, hauteur_max, session_id, condition_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (vitesse_initiale, angle_deg, masse_projectile, rayon_projectile, date_now, distance_max, hauteur_max, session_id, condition_id)).lastrowid
+
+        rappel.arreter()
+        journaliser("simulation.resultat", simulation_id=simulation_id, distance_max=float(distance_max),
+                    hauteur_max=float(hauteur_max), pas=len(x) - 1, duree_s=time.perf_counter() - debut)
         messagebox.showinfo("Résultats", f"Distance max = {distance_max:.2f} m\nHauteur max = {hauteur_max:.2f} m")
 
-        plt.figure(figsize=(10, 6))
-        plt.plot(x, y, label=f"Vitesse = {vitesse_initiale} m/s, Angle = {angle_deg}°")
-        plt.title("Trajectoire d'un projectile")
-        plt.xlabel("Distance (m)")
-        plt.ylabel("Hauteur (m)")
-        plt.grid(True)
-        plt.legend()
-        plt.axhline(0, color='black', linewidth=0.5)
+        with chrono("trace"):
+            plt.figure(figsize=(10, 6))
+            plt.plot(x, y, label=f"Vitesse = {vitesse_initiale} m/s, Angle = {angle_deg}°")
+            plt.title("Trajectoire d'un projectile")
+            plt.xlabel("Distance (m)")
+            plt.ylabel("Hauteur (m)")
+            plt.grid(True)
+            plt.legend()
+            plt.axhline(0, color='black', linewidth=0.5)
         plt.show()
+        memoire.apres_lancement("lancer_simulation")
 
     except Exception as e:
+        journaliser("simulation.erreur", erreur=repr(e))
         messagebox.showerror("Erreur", str(e))
 
-# Initialiser la base de données
-initialiser_bdd()
-ajouter_utilisateur_test()
-ajouter_projectile_test()
-ajouter_conditions_test()
-
-# Interface graphique
-root = tk.Tk()
-root.title("Simulation Avancée de Projectile")
-
-# Choix utilisateur
-tk.Label(root, text="Sélectionner Utilisateur:").grid(row=0, column=0)
-connexion = sqlite3.connect("simulations.db")
-curseur = connexion.cursor()
-curseur.execute("SELECT id, nom FROM utilisateur")
-utilisateurs = curseur.fetchall()
-utilisateurs_noms = [u[1] for u in utilisateurs]
-utilisateurs_ids = [u[0] for u in utilisateurs]
-connexion.close()
-combo_utilisateur = ttk.Combobox(root, values=utilisateurs_noms)
-combo_utilisateur.grid(row=0, column=1)
-combo_utilisateur.current(0)
-
-# Choix projectile
-tk.Label(root, text="Sélectionner Projectile:").grid(row=1, column=0)
-connexion = sqlite3.connect("simulations.db")
-curseur = connexion.cursor()
-curseur.execute("SELECT id, nom FROM projectile")
-projectiles = curseur.fetchall()
-projectiles_noms = [p[1] for p in projectiles]
-projectiles_ids = [p[0] for p in projectiles]
-connexion.close()
-combo_projectile = ttk.Combobox(root, values=projectiles_noms)
-combo_projectile.grid(row=1, column=1)
-combo_projectile.current(0)
-
-# Vitesse et angle
-tk.Label(root, text="Vitesse initiale (m/s)").grid(row=2, column=0)
-entry_vitesse = tk.Entry(root)
-entry_vitesse.grid(row=2, column=1)
-
-
-
-tk.Label(root, text="Angle de lancement (°)").grid(row=3, column=0)
-entry_angle = tk.Entry(root)
-entry_angle.grid(row=3, column=1)
-
-# Boutons
-tk.Button(root, text="Lancer Simulation", command=lancer_simulation).grid(row=4, column=0, pady=10)
-tk.Button(root, text="Quitter", command=root.quit).grid(row=4, column=1, pady=10)
-
-root.mainloop()
+# Point d'entrée : interface Tk (tkinter et matplotlib ne sont importés qu'à l'usage)
+def main():
+    global root, combo_utilisateur, combo_projectile, entry_vitesse, entry_angle
+    import tkinter as tk
+    from tkinter import ttk
+
+    # Initialiser la base de données
+    initialiser_bdd()
+    demarrer_journal("simulations.db")
+    ajouter_utilisateur_test()
+    ajouter_projectile_test()
+    ajouter_conditions_test()
+
+    # Interface graphique
+    root = tk.Tk()
+    root.title("Simulation Avancée de Projectile")
+    memoire.sonde("figures ouvertes", memoire.figures_ouvertes)
+    memoire.surveiller(root)
+
+    # Choix utilisateur (listes rechargées à l'ouverture si la base a changé)
+    tk.Label(root, text="Sélectionner Utilisateur:").grid(row=0, column=0)
+    combo_utilisateur = ttk.Combobox(root, postcommand=rafraichir_listes)
+    combo_utilisateur.grid(row=0, column=1)
+
+    # Choix projectile
+    tk.Label(root, text="Sélectionner Projectile:").grid(row=1, column=0)
+    combo_projectile = ttk.Combobox(root, postcommand=rafraichir_listes)
+    combo_projectile.grid(row=1, column=1)
+
+    rafraichir_listes()
+    combo_utilisateur.current(0)
+    combo_projectile.current(0)
+
+    # Vitesse et angle
+    tk.Label(root, text="Vitesse initiale (m/s)").grid(row=2, column=0)
+    entry_vitesse = tk.Entry(root)
+    entry_vitesse.grid(row=2, column=1)
+
+
+
+    tk.Label(root, text="Angle de lancement (°)").grid(row=3, column=0)
+    entry_angle = tk.Entry(root)
+    entry_angle.grid(row=3, column=1)
+
+    # Boutons
+    tk.Button(root, text="Lancer Simulation", command=lancer_simulation).grid(row=4, column=0, pady=10)
+    tk.Button(root, text="Quitter", command=root.quit).grid(row=4, column=1, pady=10)
+
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import queue
+import sqlite3
+import threading
+from itertools import combinations_with_replacement
+
+import numpy as np
+
+import moteur
+
+# Modèle de substitution : régression polynomiale, ajustée sur l'historique et mise à jour à chaque
+# nouvelle ligne. Par analyse dimensionnelle, d = v²/g · F(β, θ) avec β = (k/m)·v²/g : on ajuste
+# ln(d / d_vide) et ln(h / h_vide) (écarts à la portée et à la hauteur sans air) sur (ln β, θ).
+DEGRE = 8
+REGULARISATION = 1e-10
+LIGNES_MIN = 100        # en dessous, pas d'estimation (ou amorçage par des lancers simulés)
+NIVEAU = 2.0            # largeur de la bande d'incertitude, en écarts-types
+TAILLE_LOT = 10000      # lignes lues par fetchmany
+# Durée simulée : celle des scripts (moteur.simuler, IS2.py) pour l'amorçage, la confirmation et l'historique.
+# Seuls les lancers retombés avant TEMPS_MAX sont appris : un lancer encore en vol a une portée tronquée.
+TEMPS_MAX = moteur.TEMPS_MAX
+
+# Centrage fixe des variables (indépendant des données : les sommes cumulées restent valables)
+CENTRES = np.array([0.0, 45.0])
+ECHELLES = np.array([3.0, 45.0])
+
+
+class Substitut:
+    def __init__(self, degre=DEGRE, regularisation=REGULARISATION):
+        self.exposants = [combinaison for d in range(degre + 1)
+                          for combinaison in combinations_with_replacement(range(2), d)]
+        p = len(self.exposants)
+        self.regularisation = regularisation
+        # Statistiques suffisantes des moindres carrés : XᵀX, Xᵀy, yᵀy (cibles : ln d/d_vide, ln h/h_vide)
+        self.xtx = np.zeros((p, p))
+        self.xty = np.zeros((p, 2))
+        self.yty = np.zeros(2)
+        self.nb_lignes = 0
+        self.dernier_id = 0
+        # (coefficients, (XᵀX + λI)⁻¹, variance résiduelle), remplacé d'un bloc à chaque ajustement
+        self.ajustement = None
+        self.verrou = threading.Lock()
+        self.lecture = threading.Lock()
+
+    def caracteristiques(self, vitesses, angles_deg, masses, rayons):
+        resistance_sur_masse = moteur.coefficient_resistance(rayons) / np.asarray(masses, dtype=float)
+        beta = resistance_sur_masse * np.asarray(vitesses, dtype=float)**2 / moteur.GRAVITE
+        variables = (np.stack([np.log(beta), np.asarray(angles_deg, dtype=float)], axis=-1) - CENTRES) / ECHELLES
+        colonnes = [np.ones(len(variables))]
+        for combinaison in self.exposants[1:]:
+            colonnes.append(np.prod(variables[:, list(combinaison)], axis=1))
+        return np.stack(colonnes, axis=1)
+
+    # Portée et hauteur sans air : v² sin 2θ / g et v² sin² θ / 2g
+    def vide(self, vitesses, angles_deg):
+        angles_rad = np.radians(angles_deg)
+        echelle = np.asarray(vitesses, dtype=float)**2 / moteur.GRAVITE
+        return np.stack([echelle * np.sin(2 * angles_rad), echelle * np.sin(angles_rad)**2 / 2], axis=-1)
+
+    # Fonction pour ajouter des lancers et réajuster (coût O(p²) par ligne puis une résolution p x p).
+    # au_sol : lancers retombés avant TEMPS_MAX ; à défaut (lignes de l'historique, qui ne le disent pas),
+    # seuls les lancers dont la durée de vol sans air 2v·sin θ/g tient dans TEMPS_MAX sont retenus
+    # (la traînée ne fait que raccourcir le vol ; marge de deux pas pour la détection de l'impact).
+    def ajouter(self, vitesses, angles_deg, masses, rayons, distances, hauteurs, au_sol=None):
+        colonnes = [np.asarray(c, dtype=float).ravel() for c in (vitesses, angles_deg, masses, rayons, distances, hauteurs)]
+        valides = np.all([np.isfinite(c) for c in colonnes], axis=0)
+        for c in (colonnes[0], colonnes[2], colonnes[3], colonnes[4], colonnes[5]):
+            valides &= np.where(np.isfinite(c), c, 0) > 0
+        valides &= (colonnes[1] > 0) & (colonnes[1] < 90)
+        if au_sol is None:
+            duree_vide = 2 * colonnes[0] * np.sin(np.radians(colonnes[1])) / moteur.GRAVITE
+            valides &= np.where(valides, duree_vide, np.inf) <= TEMPS_MAX - 2 * moteur.PAS_TEMPS
+        else:
+            valides &= np.asarray(au_sol, dtype=bool).ravel()
+        if not valides.any():
+            return
+        vitesses, angles_deg, masses, rayons, distances, hauteurs = (c[valides] for c in colonnes)
+        X = self.caracteristiques(vitesses, angles_deg, masses, rayons)
+        Y = np.log(np.stack([distances, hauteurs], axis=1) / self.vide(vitesses, angles_deg))
+        with self.verrou:
+            self.xtx += X.T @ X
+            self.xty += X.T @ Y
+            self.yty += np.sum(Y**2, axis=0)
+            self.nb_lignes += len(Y)
+            self.ajuster()
+
+    def ajuster(self):
+        p = len(self.exposants)
+        if self.nb_lignes < max(LIGNES_MIN, 2 * p):
+            return
+        inverse = np.linalg.inv(self.xtx + self.regularisation * self.nb_lignes * np.eye(p))
+        coefficients = inverse @ self.xty
+        residus = self.yty - 2 * np.sum(coefficients * self.xty, axis=0) \
+            + np.sum(coefficients * (self.xtx @ coefficients), axis=0)
+        variance = np.maximum(residus, 0) / (self.nb_lignes - p)
+        self.ajustement = (coefficients, inverse, variance)
+
+    def pret(self):
+        return self.ajustement is not None
+
+    # Estimation avec bande d'incertitude : intervalle de prédiction σ²(1 + xᵀ(XᵀX)⁻¹x) en log,
+    # qui s'élargit hors du domaine couvert par l'historique.
+    # Renvoie distance, hauteur, (bas, haut) de chacune (tableaux), ou None si le modèle n'est pas prêt.
+    def predire(self, vitesses, angles_deg, masses, rayons, niveau=NIVEAU):
+        if self.ajustement is None:
+            return None
+        coefficients, inverse, variance = self.ajustement
+        vitesses, angles_deg, masses, rayons = np.broadcast_arrays(*(np.atleast_1d(np.asarray(c, dtype=float))
+                                                                     for c in (vitesses, angles_deg, masses, rayons)))
+        X = self.caracteristiques(vitesses, angles_deg, masses, rayons)
+        logs = X @ coefficients + np.log(self.vide(vitesses, angles_deg))
+        levier = np.einsum("ij,jk,ik->i", X, inverse, X)
+        ecart = niveau * np.sqrt(variance * (1 + levier[:, None]))
+        centre, bas, haut = np.exp(logs), np.exp(logs - ecart), np.exp(logs + ecart)
+        return centre[:, 0], centre[:, 1], (bas[:, 0], haut[:, 0]), (bas[:, 1], haut[:, 1])
+
+    # Fonction pour intégrer les lignes de l'historique arrivées depuis la dernière mise à jour
+    # (sans effet si une lecture est déjà en cours : la suivante reprendra après dernier_id)
+    def mettre_a_jour(self, bdd="simulations.db"):
+        if not self.lecture.acquire(blocking=False):
+            return 0
+        connexion = sqlite3.connect(bdd)
+        try:
+            curseur = connexion.execute("SELECT id, vitesse_initiale, angle_deg, masse, rayon, distance_max, hauteur_max "
+                                        "FROM simulation WHERE id > ? ORDER BY id", (self.dernier_id,))
+            nb = 0
+            while True:
+                lignes = curseur.fetchmany(TAILLE_LOT)
+                if not lignes:
+                    break
+                colonnes = np.array(lignes, dtype=float).T
+                self.ajouter(*colonnes[1:])
+                self.dernier_id = int(colonnes[0, -1])
+                nb += len(lignes)
+        finally:
+            connexion.close()
+            self.lecture.release()
+        return nb
+
+    # Fonction pour amorcer le modèle par des lancers simulés (historique trop court), avec les réglages
+    # de l'interface (RK4, pas et durée de moteur.simuler) ; les lancers encore en vol sont écartés
+    def amorcer(self, nb=2000, graine=0):
+        generateur = np.random.default_rng(graine)
+        vitesses = generateur.uniform(5, 150, nb)
+        angles = generateur.uniform(5, 85, nb)
+        masses = np.exp(generateur.uniform(np.log(0.01), np.log(50), nb))
+        rayons = np.exp(generateur.uniform(np.log(0.005), np.log(0.5), nb))
+        distances, hauteurs, _, ys = moteur.simuler_lot(vitesses, angles, masses, rayons, temps_max=TEMPS_MAX,
+                                                        trajectoires=True)
+        self.ajouter(vitesses, angles, masses, rayons, distances, hauteurs, retombes(ys))
+
+
+# Fonction pour repérer les lancers retombés d'après leurs trajectoires (simuler_lot, trajectoires=True) :
+# le dernier point suivi est l'impact (y ramené à 0), les pas suivants valent NaN
+def retombes(ys):
+    nb_points = np.sum(~np.isnan(ys), axis=0)
+    return (nb_points > 1) & (ys[np.maximum(nb_points - 1, 0), np.arange(ys.shape[1])] == 0)
+
+
+# Aperçu instantané pour une interface Tk : l'estimation s'affiche à chaque frappe, puis, après
+# delai ms sans saisie, l'intégration complète (moteur.simuler) la confirme dans un fil d'arrière-plan.
+# Le résultat revient par une file lue par root.after (Tk n'est appelé que depuis son fil).
+class Apercu:
+    def __init__(self, root, etiquette, lire_parametres, substitut=None, bdd="simulations.db", delai=300):
+        self.root = root
+        self.etiquette = etiquette
+        self.lire_parametres = lire_parametres
+        self.substitut = substitut or Substitut()
+        self.bdd = bdd
+        self.delai = delai
+        self.resultats = queue.Queue()
+        self.generation = 0
+        self.confirmation = None
+        self.estimation = None
+        self.parametres = None
+
+    # Chargement de l'historique en arrière-plan (amorçage si l'historique est trop court)
+    def demarrer(self):
+        def charger():
+            self.substitut.mettre_a_jour(self.bdd)
+            if not self.substitut.pret():
+                self.substitut.amorcer()
+        threading.Thread(target=charger, name="substitut", daemon=True).start()
+        return self
+
+    # Fonction pour intégrer en arrière-plan les nouvelles lignes (après un enregistrement)
+    def rafraichir(self):
+        threading.Thread(target=self.substitut.mettre_a_jour, args=(self.bdd,), name="substitut", daemon=True).start()
+
+    def actualiser(self, evenement=None):
+        try:
+            parametres = self.lire_parametres()
+        except ValueError:
+            parametres = None
+        # Domaine du modèle (le même que celui des lignes retenues par ajouter) : hors de là, pas d'estimation
+        if parametres is not None and (min(parametres[0], parametres[2], parametres[3]) <= 0
+                                       or not 0 < parametres[1] < 90):
+            parametres = None
+        # Touches sans effet sur la saisie (tabulation, flèches) : rien à recalculer
+        if parametres == self.parametres and parametres is not None:
+            return
+        self.parametres = parametres
+        self.generation += 1
+        if self.confirmation is not None:
+            self.root.after_cancel(self.confirmation)
+            self.confirmation = None
+        if parametres is None:
+            self.etiquette.config(text="")
+            return
+        estimation = self.substitut.predire(*parametres)
+        if estimation is None:
+            self.estimation = None
+            self.etiquette.config(text="Estimation : modèle en préparation…")
+        else:
+            distance, hauteur, bande_distance, bande_hauteur = estimation
+            distance, hauteur = float(distance[0]), float(hauteur[0])
+            (d_bas, d_haut), (h_bas, h_haut) = ((float(bas[0]), float(haut[0]))
+                                                for bas, haut in (bande_distance, bande_hauteur))
+            self.estimation = distance
+            self.etiquette.config(text=f"Estimation : distance ≈ {distance:.1f} m [{d_bas:.1f} – {d_haut:.1f}], "
+                                       f"hauteur ≈ {hauteur:.1f} m [{h_bas:.1f} – {h_haut:.1f}]")
+        self.confirmation = self.root.after(self.delai, self.confirmer, self.generation, parametres)
+
+    def confirmer(self, generation, parametres):
+        self.confirmation = None
+
+        def calculer():
+            distance, hauteur, _, y = moteur.simuler(*parametres, temps_max=TEMPS_MAX)
+            self.resultats.put((generation, parametres, distance, hauteur, len(y) > 1 and y[-1] == 0))
+        threading.Thread(target=calculer, name="confirmation", daemon=True).start()
+        self.root.after(50, self.recevoir)
+
+    def recevoir(self):
+        try:
+            generation, parametres, distance, hauteur, au_sol = self.resultats.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self.recevoir)
+            return
+        # Le lancer confirmé n'est pas ajouté au modèle : s'il est enregistré, mettre_a_jour le lira en base
+        if generation != self.generation:
+            return
+        # Encore en vol à TEMPS_MAX : portée tronquée, sans rapport avec l'estimation (apprise sur des lancers retombés)
+        if not au_sol:
+            self.etiquette.config(text=f"Confirmé : encore en vol à {TEMPS_MAX} s (distance = {distance:.2f} m, "
+                                       f"hauteur = {hauteur:.2f} m)")
+            return
+        ecart = f" (estimation à {100 * (self.estimation / distance - 1):+.1f} %)" if self.estimation and distance else ""
+        self.etiquette.config(text=f"Confirmé : distance = {distance:.2f} m, hauteur = {hauteur:.2f} m{ecart}")
@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+
+
+# Fonction pour réduire une grille d'un niveau : maximum par blocs de 2 points selon chaque axe
+def reduire(niveau):
+    for axe in range(niveau.ndim):
+        if niveau.shape[axe] > 1:
+            if niveau.shape[axe] % 2:
+                niveau = np.concatenate([niveau, np.take(niveau, [-1], axis=axe)], axis=axe)
+            pairs = [slice(None)] * niveau.ndim
+            impairs = [slice(None)] * niveau.ndim
+            pairs[axe], impairs[axe] = slice(0, None, 2), slice(1, None, 2)
+            niveau = np.maximum(niveau[tuple(pairs)], niveau[tuple(impairs)])
+    return niveau
+
+
+# Terrain : profil 1-D (hauteur selon x) ou carte d'altitude 2-D (hauteur selon x et z), sur une grille
+# régulière (pas, origine), ou profil 1-D à abscisses croissantes quelconques. Les hauteurs sont
+# dans le repère du tir (le lancer part de (0, 0)) et interpolées linéairement entre les points ;
+# au-delà des bords, la hauteur du bord est conservée.
+# Les hauteurs ne sont pas copiées (une carte ouverte en mémoire projetée le reste) ; seule la
+# pyramide des maxima (niveau l : maximum par blocs de 2^l points, moins de la moitié de la
+# taille de la carte en 1-D, du tiers en 2-D) est calculée, une fois, à la construction.
+class Terrain:
+    def __init__(self, hauteurs, pas=1.0, origine=0.0, abscisses=None):
+        if hauteurs.ndim not in (1, 2) or min(hauteurs.shape) < 2:
+            raise ValueError("Le terrain doit être un profil 1-D ou une carte 2-D d'au moins 2 points par axe")
+        if abscisses is not None and (hauteurs.ndim != 1 or len(abscisses) != len(hauteurs)):
+            raise ValueError("Les abscisses ne s'appliquent qu'à un profil 1-D de même longueur")
+        self.hauteurs = hauteurs
+        self.dimension = hauteurs.ndim
+        self.pas = np.broadcast_to(np.asarray(pas, dtype=float), (self.dimension,))
+        self.origine = np.broadcast_to(np.asarray(origine, dtype=float), (self.dimension,))
+        self.abscisses = None if abscisses is None else np.asarray(abscisses, dtype=float)
+        self.pyramide = [hauteurs]
+        while max(self.pyramide[-1].shape) > 1:
+            self.pyramide.append(reduire(self.pyramide[-1]))
+
+    # Fonction pour convertir une coordonnée en position (fractionnaire) dans la grille :
+    # calcul direct sur une grille régulière, recherche dichotomique (O(log n)) sur des abscisses quelconques
+    def position(self, coordonnees, axe=0):
+        dernier = self.hauteurs.shape[axe] - 1
+        if axe == 0 and self.abscisses is not None:
+            i = np.clip(np.searchsorted(self.abscisses, coordonnees) - 1, 0, dernier - 1)
+            debut, fin = self.abscisses[i], self.abscisses[i + 1]
+            return i + np.clip((coordonnees - debut) / (fin - debut), 0, 1)
+        return np.clip((coordonnees - self.origine[axe]) / self.pas[axe], 0, dernier)
+
+    # Hauteur du terrain en x (profil) ou en (x, z) (carte, interpolation bilinéaire)
+    def hauteur(self, x, z=None):
+        u = self.position(x, 0)
+        i = np.minimum(u.astype(np.intp), self.hauteurs.shape[0] - 2)
+        fx = u - i
+        if self.dimension == 1:
+            return self.hauteurs[i] * (1 - fx) + self.hauteurs[i + 1] * fx
+        v = self.position(np.zeros_like(x) if z is None else z, 1)
+        j = np.minimum(v.astype(np.intp), self.hauteurs.shape[1] - 2)
+        fz = v - j
+        h = self.hauteurs
+        return ((h[i, j] * (1 - fz) + h[i, j + 1] * fz) * (1 - fx)
+                + (h[i + 1, j] * (1 - fz) + h[i + 1, j + 1] * fz) * fx)
+
+    # Majorant de la hauteur du terrain sur la zone balayée de (x0, z0) à (x1, z1) : l'intervalle
+    # de points [a, b] tient dans au plus deux blocs (par axe) du niveau l où b - a < 2^l,
+    # soit deux (ou quatre) lectures dans la pyramide quelle que soit la longueur de l'intervalle.
+    def maximum(self, x0, x1, z0=None, z1=None):
+        bornes = [(self.position(np.minimum(x0, x1), 0), self.position(np.maximum(x0, x1), 0))]
+        if self.dimension == 2:
+            z0 = np.zeros_like(x0) if z0 is None else z0
+            z1 = np.zeros_like(x1) if z1 is None else z1
+            bornes.append((self.position(np.minimum(z0, z1), 1), self.position(np.maximum(z0, z1), 1)))
+        bornes = [(np.floor(a).astype(np.intp), np.ceil(b).astype(np.intp)) for a, b in bornes]
+        étendue = np.max([b - a for a, b in bornes], axis=0)
+        niveaux = np.minimum(np.ceil(np.log2(étendue + 1)).astype(np.intp), len(self.pyramide) - 1)
+        resultat = np.empty(np.shape(x0))
+        for niveau in np.flatnonzero(np.bincount(niveaux)):
+            lancers = niveaux == niveau
+            grille = self.pyramide[niveau]
+            blocs = [(np.minimum(a[lancers] >> niveau, taille - 1), np.minimum(b[lancers] >> niveau, taille - 1))
+                     for (a, b), taille in zip(bornes, grille.shape)]
+            if self.dimension == 1:
+                (ia, ib), = blocs
+                resultat[lancers] = np.maximum(grille[ia], grille[ib])
+            else:
+                (ia, ib), (ja, jb) = blocs
+                resultat[lancers] = np.maximum(np.maximum(grille[ia, ja], grille[ia, jb]),
+                                               np.maximum(grille[ib, ja], grille[ib, jb]))
+        return resultat
+
+    # Coordonnées horizontales d'un lot d'états (x, y, vx, vy) ou (x, y, z, vx, vy, vz)
+    def horizontales(self, état):
+        if len(état) == 6:
+            return état[0], état[2]
+        if self.dimension == 2:
+            raise ValueError("Une carte 2-D demande des trajectoires 3-D (simuler_lot_3d)")
+        return état[0], None
+
+    # Fonction pour repérer les lancers passés sous le terrain pendant le pas avant -> après.
+    # Les lancers dont le point le plus bas du pas reste au-dessus du majorant de la zone balayée
+    # sont écartés sans interpolation ; pour les autres, la fin du pas est comparée au terrain.
+    # Exact tant qu'un pas ne franchit pas plus d'une maille (|v|·pas_temps < pas de la grille) :
+    # une crête plus étroite qu'un pas peut sinon être traversée.
+    def sous_le_sol(self, avant, après):
+        x0, z0 = self.horizontales(avant)
+        x1, z1 = self.horizontales(après)
+        plus_bas = np.minimum(avant[1], après[1])
+        sous = np.zeros(len(après[1]), dtype=bool)
+        # Sommet du terrain (dernier niveau de la pyramide) : aucun lancer plus haut ne peut toucher
+        candidats = plus_bas <= self.pyramide[-1].flat[0]
+        if candidats.any():
+            zones = [None if c is None else c[candidats] for c in (x0, x1, z0, z1)]
+            candidats[candidats] = plus_bas[candidats] <= self.maximum(*zones)
+        if candidats.any():
+            sous[candidats] = après[1, candidats] < self.hauteur(x1[candidats],
+                                                                  None if z1 is None else z1[candidats])
+        return sous
+
+    # Fonction pour placer les lancers au point d'impact : interpolation linéaire de l'écart au terrain
+    def impact(self, avant, après):
+        x0, z0 = self.horizontales(avant)
+        x1, z1 = self.horizontales(après)
+        écart_avant = avant[1] - self.hauteur(x0, z0)
+        écart_après = après[1] - self.hauteur(x1, z1)
+        θ = np.clip(écart_avant / (écart_avant - écart_après), 0, 1)
+        point = avant + θ * (après - avant)
+        x, z = self.horizontales(point)
+        point[1] = self.hauteur(x, z)
+        return point
+
+
+# Fonction pour charger un terrain :
+# - .npy : profil (n,) ou carte (nx, nz) de hauteurs, ouvert en mémoire projetée (mmap) ;
+# - texte (.csv, .txt) : une colonne de hauteurs (grille régulière) ou deux colonnes x, hauteur.
+def charger_terrain(chemin, pas=1.0, origine=0.0):
+    extension = os.path.splitext(chemin)[1].lower()
+    if extension == ".npy":
+        return Terrain(np.load(chemin, mmap_mode="r"), pas, origine)
+    donnees = np.loadtxt(chemin, delimiter="," if extension == ".csv" else None, ndmin=1)
+    if donnees.ndim == 2 and donnees.shape[1] == 2:
+        return Terrain(np.ascontiguousarray(donnees[:, 1]), abscisses=donnees[:, 0])
+    return Terrain(donnees, pas, origine)